@@ -0,0 +1,125 @@
+"""
+Benchmark the per-request overhead of PrometheusMiddleware.
+
+Drives ASGI apps directly (no sockets, no HTTP parsing) so the only difference
+between the bare and instrumented runs is the middleware itself: timing, the
+send wrapper, the in-flight gauge and one histogram observation. Runs both a
+minimal ASGI app and a FastAPI app with a templated route, and reports the added
+microseconds per request.
+
+Usage:
+    python benchmarks/metrics_middleware.py
+    python benchmarks/metrics_middleware.py --requests 200000 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi import FastAPI  # noqa: E402
+
+from src.metrics import MetricsRegistry, PrometheusMiddleware  # noqa: E402
+
+
+async def bare_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def fastapi_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/stations/{station_id}")
+    async def get_station(station_id: int):
+        return {"station_id": station_id}
+
+    return app
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message) -> None:
+    pass
+
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+
+
+async def _time(app, path: str, requests: int) -> float:
+    """Mean seconds per request (fresh scope per request, like a server)."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(_scope(path), _receive, _send)
+    return (time.perf_counter() - started) / requests
+
+
+async def bench(requests: int, rounds: int) -> list[dict]:
+    targets = {
+        "bare_asgi": (lambda: bare_app, "/"),
+        "fastapi": (fastapi_app, "/stations/7"),
+    }
+    results = []
+    for name, (factory, path) in targets.items():
+        plain = factory()
+        instrumented = PrometheusMiddleware(factory(), registry=MetricsRegistry())
+        # Warm up both paths (route compilation, dict growth) before timing
+        await _time(plain, path, 1_000)
+        await _time(instrumented, path, 1_000)
+        # Interleave the runs and keep the best of each to dampen noise
+        base = min([await _time(plain, path, requests) for _ in range(rounds)])
+        with_metrics = min(
+            [await _time(instrumented, path, requests) for _ in range(rounds)]
+        )
+        results.append(
+            {
+                "app": name,
+                "requests": requests,
+                "baseline_us": base * 1e6,
+                "instrumented_us": with_metrics * 1e6,
+                "overhead_us": (with_metrics - base) * 1e6,
+            }
+        )
+    return results
+
+
+def main(requests: int, rounds: int) -> None:
+    results = asyncio.run(bench(requests, rounds))
+    print(
+        f"{'app':<10} {'baseline µs':>12} {'instrumented µs':>16} {'overhead µs':>12}"
+    )
+    for row in results:
+        print(
+            f"{row['app']:<10} {row['baseline_us']:>12.2f} {row['instrumented_us']:>16.2f} "
+            f"{row['overhead_us']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    main(args.requests, args.rounds)
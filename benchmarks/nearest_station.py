@@ -0,0 +1,159 @@
+"""
+Benchmark nearest-station lookups: full-scan SQL vs. the R*Tree vs. the in-memory KD-tree.
+
+Builds a throwaway SQLite database per size with synthetic stations spread over
+the Tel Aviv area, then times the same random query points against each strategy.
+
+Usage:
+    python benchmarks/nearest_station.py
+    python benchmarks/nearest_station.py --sizes 1000 10000 --queries 200 --json results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiosqlite
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from db.migrations import apply_migrations  # noqa: E402
+from src.models.station_index import get_station_index  # noqa: E402
+from src.repositories.stations_repository import StationsRepository  # noqa: E402
+
+LAT_RANGE = (32.00, 32.20)
+LON_RANGE = (34.70, 34.90)
+
+# The query get_nearest issued before the spatial indexes existed
+FULL_SCAN_SQL = """
+    SELECT station_id, ((lat - ?) * (lat - ?) + (lon - ?) * (lon - ?)) AS distance
+    FROM stations
+    ORDER BY distance ASC
+    LIMIT 1
+"""
+
+
+async def _seed(db: aiosqlite.Connection, size: int, rng: random.Random) -> None:
+    await apply_migrations(db)
+    await db.executemany(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                station_id,
+                f"Station {station_id}",
+                rng.uniform(*LAT_RANGE),
+                rng.uniform(*LON_RANGE),
+                20,
+            )
+            for station_id in range(1, size + 1)
+        ),
+    )
+    await db.commit()
+
+
+async def _full_scan(db, lon: float, lat: float) -> int:
+    cursor = await db.execute(FULL_SCAN_SQL, (lat, lat, lon, lon))
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+async def _time(label: str, lookup, points) -> tuple[dict, list[int]]:
+    samples = []
+    found = []
+    for lon, lat in points:
+        started = time.perf_counter()
+        found.append(await lookup(lon, lat))
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    stats = {
+        "strategy": label,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+    return stats, found
+
+
+async def bench_size(size: int, queries: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    repo = StationsRepository()
+    index = get_station_index()
+    points = [
+        (rng.uniform(*LON_RANGE), rng.uniform(*LAT_RANGE)) for _ in range(queries)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = await aiosqlite.connect(Path(tmp) / "bench.db")
+        try:
+            await _seed(db, size, rng)
+
+            async def rtree(lon, lat):
+                return (await repo._rtree_k_nearest(db, lon, lat, 1))[0][0]
+
+            async def kd_tree(lon, lat):
+                return index.nearest(lon, lat)[0]
+
+            build_started = time.perf_counter()
+            await index.rebuild(db)
+            build_ms = (time.perf_counter() - build_started) * 1000
+
+            results = []
+            baseline = None
+            for label, lookup in (
+                ("full_scan", lambda lon, lat: _full_scan(db, lon, lat)),
+                ("rtree", rtree),
+                ("kd_tree", kd_tree),
+            ):
+                stats, found = await _time(label, lookup, points)
+                if baseline is None:
+                    baseline = found
+                elif found != baseline:
+                    raise AssertionError(f"{label} disagrees with the full scan")
+                stats["stations"] = size
+                results.append(stats)
+            results[-1]["build_ms"] = build_ms
+            return results
+        finally:
+            index.invalidate()
+            await db.close()
+
+
+async def main(sizes: list[int], queries: int, seed: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        results.extend(await bench_size(size, queries, seed))
+
+    print(
+        f"{'stations':>9} {'strategy':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}"
+    )
+    for row in results:
+        print(
+            f"{row['stations']:>9} {row['strategy']:<10} "
+            f"{row['mean_ms']:>9.3f} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args.sizes, args.queries, args.seed))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
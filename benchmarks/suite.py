@@ -0,0 +1,588 @@
+"""
+Benchmark repository methods and service flows on the seeded dataset.
+
+Builds a throwaway SQLite database per scale from ``data/*.csv``: scale 1 is
+the dataset as shipped (1k stations, 18.7k vehicles); scale N adds N - 1
+jittered copies of every station with its vehicles, as a denser deployment of
+the same city would look, plus 1,000 synthetic users per scale.
+
+Every benchmark is timed on its own: setup (e.g. renting a vehicle before
+timing ``dock_vehicle``) runs untimed, and benchmarks that write run inside a
+transaction that is rolled back afterwards, so each iteration sees the same
+data. Services join that transaction instead of committing (see UnitOfWork).
+
+Results (p50/p95/p99 per benchmark and scale) can be written as JSON and
+compared against a stored run; ``--baseline`` exits non-zero on regressions.
+
+Usage:
+    python benchmarks/suite.py
+    python benchmarks/suite.py --scales 1 5 --iterations 500 --output baseline.json
+    python benchmarks/suite.py --baseline baseline.json --output current.json
+    python benchmarks/suite.py --compare current.json baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import aiosqlite
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from db.migrations import apply_migrations  # noqa: E402
+from src.db_pool import DEFAULT_PRAGMAS  # noqa: E402
+from src.models.active_ride_index import get_active_ride_index  # noqa: E402
+from src.models.availability_cache import get_availability_cache  # noqa: E402
+from src.models.station_catalog import get_station_catalog  # noqa: E402
+from src.models.vehicle import VehicleType  # noqa: E402
+from src.repositories.rides_repository import RidesRepository  # noqa: E402
+from src.repositories.stations_repository import StationsRepository  # noqa: E402
+from src.repositories.vehicles_repository import VehiclesRepository  # noqa: E402
+from src.services.rides_service import RideService  # noqa: E402
+from src.services.vehicles_service import VehiclesService  # noqa: E402
+
+DATA_DIR = PROJECT_ROOT / "data"
+USERS_PER_SCALE = 1_000
+# Standard deviation (degrees, ~500 m) of the jitter applied to station copies
+COPY_JITTER = 0.005
+# A benchmark regresses when p50 or p95 grows by more than this fraction...
+DEFAULT_THRESHOLD = 0.20
+# ...and by more than this many milliseconds (sub-noise deltas are ignored)
+DEFAULT_MIN_DELTA_MS = 0.05
+
+
+def _read_csv(name: str) -> list[dict]:
+    # utf-8-sig: some of the exported files start with a byte order mark
+    with open(DATA_DIR / name, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+async def build_database(path: Path, scale: int, seed: int) -> dict:
+    """Create the database at ``path`` from the CSVs, ``scale`` times over."""
+    rng = random.Random(seed)
+    stations = _read_csv("stations.csv")
+    vehicles = _read_csv("vehicles.csv")
+    users = _read_csv("users.csv")
+    rides = _read_csv("rides.csv")
+    id_offset = max(int(row["station_id"]) for row in stations)
+
+    db = await aiosqlite.connect(path)
+    try:
+        for pragma in DEFAULT_PRAGMAS:
+            await db.execute(pragma)
+        await apply_migrations(db)
+        await db.execute("BEGIN")
+        for copy in range(scale):
+            jitter = COPY_JITTER if copy else 0.0
+            await db.executemany(
+                "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(row["station_id"]) + copy * id_offset,
+                        row["name"] if not copy else f"{row['name']}-{copy}",
+                        float(row["lat"]) + rng.gauss(0, jitter),
+                        float(row["lon"]) + rng.gauss(0, jitter),
+                        int(row["max_capacity"]),
+                    )
+                    for row in stations
+                ],
+            )
+            copied = [
+                (
+                    row["vehicle_id"] if not copy else f"{row['vehicle_id']}-{copy}",
+                    int(row["station_id"]) + copy * id_offset,
+                    row["vehicle_type"],
+                    row["status"],
+                    int(row["rides_since_last_treated"]),
+                    row["last_treated_date"] or None,
+                )
+                for row in vehicles
+            ]
+            await db.executemany(
+                "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                copied,
+            )
+            for vehicle_type, table in (
+                (VehicleType.electric_bicycle.value, "electric_bicycles"),
+                (VehicleType.scooter.value, "scooters"),
+            ):
+                await db.executemany(
+                    f"INSERT INTO {table} (vehicle_id, battery) VALUES (?, 100)",
+                    [(row[0],) for row in copied if row[2] == vehicle_type],
+                )
+        await db.executemany(
+            "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    u["user_id"],
+                    u["first_name"],
+                    u["last_name"],
+                    u["email"],
+                    u["payment_token"],
+                )
+                for u in users
+            ]
+            + [
+                (f"BENCH{i:06d}", "Bench", "User", f"bench{i}@example.com", "tok_bench")
+                for i in range(USERS_PER_SCALE * scale)
+            ],
+        )
+        await db.executemany(
+            "INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, end_station_id, is_degraded_report, start_time, end_time) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    r["ride_id"],
+                    r["user_id"],
+                    r["vehicle_id"],
+                    int(r["start_station_id"]),
+                    int(r["end_station_id"]) if r["end_station_id"] else None,
+                    int(r["is_degraded_report"]),
+                    r["start_time"],
+                    r["end_time"] or None,
+                )
+                for r in rides
+            ],
+        )
+        await db.commit()
+        await db.execute("ANALYZE")
+        return {
+            "stations": len(stations) * scale,
+            "vehicles": len(vehicles) * scale,
+            "users": len(users) + USERS_PER_SCALE * scale,
+        }
+    finally:
+        await db.close()
+
+
+@dataclass
+class Context:
+    """What a benchmark needs: the connection, fixtures drawn from the data and a seeded RNG."""
+
+    db: aiosqlite.Connection
+    rng: random.Random
+    station_ids: list[int]
+    coordinates: list[tuple[float, float]]
+    available_vehicle_ids: list[str]
+    degraded_vehicle_ids: list[str]
+    user_ids: list[str]
+    stations: StationsRepository
+    vehicles: VehiclesRepository
+    rides: RidesRepository
+    ride_service: RideService
+    vehicle_service: VehiclesService
+
+    def point(self) -> tuple[float, float]:
+        """A (lon, lat) close to a random station."""
+        lon, lat = self.rng.choice(self.coordinates)
+        return lon + self.rng.gauss(0, 0.002), lat + self.rng.gauss(0, 0.002)
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    run: Callable[[Context], Awaitable[float]]
+    # Runs inside a transaction that is rolled back after every iteration
+    writes: bool
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, writes: bool = False):
+    """Register ``run(ctx) -> seconds``; ``run`` times only the operation under test."""
+
+    def register(run):
+        BENCHMARKS.append(Benchmark(name, run, writes))
+        return run
+
+    return register
+
+
+def _timed(coro_factory):
+    async def run(ctx: Context) -> float:
+        call = coro_factory(ctx)
+        started = time.perf_counter()
+        await call
+        return time.perf_counter() - started
+
+    return run
+
+
+benchmark("repo.stations.get_nearest")(
+    _timed(lambda ctx: ctx.stations.get_nearest(ctx.db, *ctx.point()))
+)
+benchmark("repo.stations.get_by_id")(
+    _timed(lambda ctx: ctx.stations.get_by_id(ctx.db, ctx.rng.choice(ctx.station_ids)))
+)
+benchmark("repo.stations.list_with_capacity")(
+    _timed(lambda ctx: ctx.stations.list_with_capacity(ctx.db))
+)
+benchmark("repo.stations.get_stations_with_available_vehicles")(
+    _timed(lambda ctx: ctx.stations.get_stations_with_available_vehicles(ctx.db))
+)
+benchmark("repo.stations.get_free_dock_capacities")(
+    _timed(
+        lambda ctx: ctx.stations.get_free_dock_capacities(
+            ctx.db, ctx.rng.sample(ctx.station_ids, 10)
+        )
+    )
+)
+benchmark("repo.vehicles.get_by_id")(
+    _timed(
+        lambda ctx: ctx.vehicles.get_by_id(
+            ctx.db, ctx.rng.choice(ctx.available_vehicle_ids)
+        )
+    )
+)
+benchmark("repo.vehicles.get_available_vehicles_by_station")(
+    _timed(
+        lambda ctx: ctx.vehicles.get_available_vehicles_by_station(
+            ctx.db, ctx.rng.choice(ctx.station_ids)
+        )
+    )
+)
+benchmark("repo.vehicles.get_best_rentable_vehicle")(
+    _timed(
+        lambda ctx: ctx.vehicles.get_best_rentable_vehicle(
+            ctx.db, ctx.rng.choice(ctx.station_ids)
+        )
+    )
+)
+benchmark("repo.rides.get_active_ride_by_user")(
+    _timed(
+        lambda ctx: ctx.rides.get_active_ride_by_user(
+            ctx.db, ctx.rng.choice(ctx.user_ids)
+        )
+    )
+)
+benchmark("repo.rides.get_active_users")(
+    _timed(lambda ctx: ctx.rides.get_active_users(ctx.db))
+)
+benchmark("repo.vehicles.mark_vehicle_as_rented", writes=True)(
+    _timed(
+        lambda ctx: ctx.vehicles.mark_vehicle_as_rented(
+            ctx.db, ctx.rng.choice(ctx.available_vehicle_ids)
+        )
+    )
+)
+
+
+@benchmark("repo.vehicles.dock_vehicle", writes=True)
+async def _dock_vehicle(ctx: Context) -> float:
+    vehicle = await ctx.vehicles.mark_vehicle_as_rented(
+        ctx.db, ctx.rng.choice(ctx.available_vehicle_ids)
+    )
+    free = await ctx.stations.get_free_dock_capacities(
+        ctx.db, ctx.rng.sample(ctx.station_ids, 50)
+    )
+    station_id = ctx.rng.choice(list(free))
+    started = time.perf_counter()
+    await ctx.vehicles.dock_vehicle(ctx.db, vehicle.vehicle_id, station_id)
+    return time.perf_counter() - started
+
+
+@benchmark("repo.stations.check_and_reserve_capacity", writes=True)
+async def _reserve_capacity(ctx: Context) -> float:
+    station_id = ctx.rng.choice(ctx.station_ids)
+    vehicle_id = ctx.rng.choice(ctx.available_vehicle_ids)
+    started = time.perf_counter()
+    await ctx.stations.check_and_reserve_capacity(ctx.db, station_id, vehicle_id)
+    return time.perf_counter() - started
+
+
+benchmark("service.rides.start_new_ride", writes=True)(
+    _timed(
+        lambda ctx: ctx.ride_service.start_new_ride(
+            ctx.db, ctx.rng.choice(ctx.user_ids), *ctx.point()
+        )
+    )
+)
+
+
+@benchmark("service.rides.end_ride", writes=True)
+async def _end_ride(ctx: Context) -> float:
+    ride = await ctx.ride_service.start_new_ride(
+        ctx.db, ctx.rng.choice(ctx.user_ids), *ctx.point()
+    )
+    lon, lat = ctx.point()
+    started = time.perf_counter()
+    await ctx.ride_service.end_ride(ctx.db, ride.ride_id, lon=lon, lat=lat)
+    return time.perf_counter() - started
+
+
+@benchmark("service.vehicles.report_vehicle_degraded", writes=True)
+async def _report_degraded(ctx: Context) -> float:
+    # Reported mid-ride, so the auto-completion of the ride is part of the flow
+    ride = await ctx.ride_service.start_new_ride(
+        ctx.db, ctx.rng.choice(ctx.user_ids), *ctx.point()
+    )
+    started = time.perf_counter()
+    await ctx.vehicle_service.report_vehicle_degraded(ctx.db, ride.vehicle_id)
+    return time.perf_counter() - started
+
+
+benchmark("service.vehicles.treat_vehicle", writes=True)(
+    _timed(
+        lambda ctx: ctx.vehicle_service.treat_vehicle(
+            ctx.db, ctx.rng.choice(ctx.degraded_vehicle_ids)
+        )
+    )
+)
+
+
+async def _column(db: aiosqlite.Connection, sql: str) -> list:
+    cursor = await db.execute(sql)
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return [row[0] for row in rows]
+
+
+def percentiles(samples_ms: list[float]) -> dict:
+    """Nearest-rank p50/p95/p99 plus mean, min and max of ``samples_ms``."""
+    ordered = sorted(samples_ms)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p * len(ordered)) - 1))]
+
+    return {
+        "iterations": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "min_ms": ordered[0],
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+async def bench_scale(
+    scale: int, iterations: int, warmup: int, seed: int, only: list[str]
+) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_started = time.perf_counter()
+        sizes = await build_database(path, scale, seed)
+        build_seconds = time.perf_counter() - build_started
+        print(
+            f"scale {scale}: {sizes['stations']:,} stations, {sizes['vehicles']:,} vehicles "
+            f"(built in {build_seconds:.1f}s)",
+            file=sys.stderr,
+        )
+
+        db = await aiosqlite.connect(path)
+        db.row_factory = aiosqlite.Row
+        catalog = get_station_catalog()
+        cache = get_availability_cache()
+        try:
+            for pragma in DEFAULT_PRAGMAS:
+                await db.execute(pragma)
+            # As at API startup: station metadata, the nearest-station index and
+            # the availability cache are served from memory, as are open rides
+            await catalog.reload(db)
+            await VehiclesRepository().warm_availability_cache(db)
+            await RidesRepository().rebuild_active_ride_index(db)
+            rows = await (
+                await db.execute("SELECT station_id, lon, lat FROM stations")
+            ).fetchall()
+            ctx = Context(
+                db=db,
+                rng=random.Random(seed),
+                station_ids=[row[0] for row in rows],
+                coordinates=[(row[1], row[2]) for row in rows],
+                available_vehicle_ids=await _column(
+                    db,
+                    "SELECT vehicle_id FROM vehicles WHERE status = 'available' AND vehicle_type = 'bicycle'",
+                ),
+                degraded_vehicle_ids=await _column(
+                    db, "SELECT vehicle_id FROM vehicles WHERE status = 'degraded'"
+                ),
+                user_ids=await _column(
+                    db, "SELECT user_id FROM users WHERE user_id LIKE 'BENCH%'"
+                ),
+                stations=StationsRepository(),
+                vehicles=VehiclesRepository(),
+                rides=RidesRepository(),
+                ride_service=RideService(),
+                vehicle_service=VehiclesService(),
+            )
+
+            results = []
+            for bench in BENCHMARKS:
+                if only and not any(pattern in bench.name for pattern in only):
+                    continue
+                samples = []
+                for i in range(warmup + iterations):
+                    if bench.writes:
+                        await db.execute("BEGIN")
+                    try:
+                        elapsed = await bench.run(ctx)
+                    finally:
+                        if bench.writes:
+                            await db.rollback()
+                    if i >= warmup:
+                        samples.append(elapsed * 1000)
+                results.append(
+                    {
+                        "name": bench.name,
+                        "scale": scale,
+                        **sizes,
+                        **percentiles(samples),
+                    }
+                )
+            return results
+        finally:
+            catalog.invalidate()
+            cache.clear()
+            get_active_ride_index().clear()
+            await db.close()
+
+
+def compare(
+    current: list[dict],
+    baseline: list[dict],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> list[dict]:
+    """
+    Match results by (name, scale) and classify each as ``regression``,
+    ``improvement``, ``ok``, ``new`` (not in the baseline) or ``missing``
+    (only in the baseline). p50 and p95 are checked; a change counts only if it
+    exceeds both ``threshold`` (relative) and ``min_delta_ms`` (absolute).
+    """
+    base = {(row["name"], row["scale"]): row for row in baseline}
+    seen = set()
+    report = []
+    for row in current:
+        key = (row["name"], row["scale"])
+        seen.add(key)
+        old = base.get(key)
+        entry = {"name": row["name"], "scale": row["scale"], "status": "new"}
+        if old is not None:
+            entry["status"] = "ok"
+            for metric in ("p50_ms", "p95_ms"):
+                delta = row[metric] - old[metric]
+                ratio = row[metric] / old[metric] if old[metric] else float("inf")
+                entry[metric] = {
+                    "baseline": old[metric],
+                    "current": row[metric],
+                    "ratio": ratio,
+                }
+                if abs(delta) <= min_delta_ms:
+                    continue
+                if ratio > 1 + threshold:
+                    entry["status"] = "regression"
+                elif ratio < 1 - threshold and entry["status"] == "ok":
+                    entry["status"] = "improvement"
+        report.append(entry)
+    for key in sorted(base.keys() - seen):
+        report.append({"name": key[0], "scale": key[1], "status": "missing"})
+    return report
+
+
+def _print_results(results: list[dict]) -> None:
+    print(f"{'benchmark':<52} {'scale':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(
+            f"{row['name']:<52} {row['scale']:>5} "
+            f"{row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f}"
+        )
+
+
+def _print_comparison(report: list[dict]) -> None:
+    print(
+        f"\n{'benchmark':<52} {'scale':>5} {'p50 ratio':>10} {'p95 ratio':>10}  status"
+    )
+    for entry in report:
+        ratios = [
+            f"{entry[metric]['ratio']:>10.2f}" if metric in entry else f"{'-':>10}"
+            for metric in ("p50_ms", "p95_ms")
+        ]
+        print(
+            f"{entry['name']:<52} {entry['scale']:>5} {ratios[0]} {ratios[1]}  {entry['status']}"
+        )
+
+
+def _load(path: Path) -> list[dict]:
+    return json.loads(path.read_text())["results"]
+
+
+async def run(
+    scales: list[int], iterations: int, warmup: int, seed: int, only: list[str]
+) -> dict:
+    results = []
+    for scale in scales:
+        results.extend(await bench_scale(scale, iterations, warmup, seed, only))
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        default=[],
+        help="Run benchmarks whose name contains any of these",
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Compare the run against this stored result file"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        type=Path,
+        metavar=("CURRENT", "BASELINE"),
+        help="Compare two stored result files without running anything",
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args()
+
+    if args.compare:
+        current, baseline = (_load(path) for path in args.compare)
+    else:
+        document = asyncio.run(
+            run(args.scales, args.iterations, args.warmup, args.seed, args.only)
+        )
+        _print_results(document["results"])
+        if args.output:
+            args.output.write_text(json.dumps(document, indent=2))
+        current = document["results"]
+        baseline = _load(args.baseline) if args.baseline else None
+
+    if baseline is not None:
+        report = compare(current, baseline, args.threshold, args.min_delta_ms)
+        _print_comparison(report)
+        if any(entry["status"] == "regression" for entry in report):
+            sys.exit(1)
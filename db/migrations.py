@@ -0,0 +1,461 @@
+"""Versioned schema migrations applied on top of the base schema in ``db.schema``.
+
+Each migration runs once, inside a single ``BEGIN IMMEDIATE`` transaction, and is
+recorded in the ``schema_version`` table. Migrations are applied by
+``scripts/init_db.py`` and at application startup.
+
+To change the schema, append a new ``Migration`` with the next version number.
+Never edit a migration that has already shipped.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import aiosqlite
+
+from db.schema import CREATE_SQL
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+SCHEMA_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+  version INTEGER PRIMARY KEY,
+  description TEXT NOT NULL,
+  applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "secondary indexes for station, status and open-ride lookups",
+        (
+            # Vehicles docked at a station, optionally filtered by status
+            "CREATE INDEX IF NOT EXISTS idx_vehicles_station_status ON vehicles(station_id, status)",
+            # Fleet-wide status filters (e.g. stations with available vehicles)
+            "CREATE INDEX IF NOT EXISTS idx_vehicles_status ON vehicles(status)",
+            # Open rides only: these stay tiny however large the ride history grows
+            "CREATE INDEX IF NOT EXISTS idx_rides_open_user ON rides(user_id) WHERE end_time IS NULL",
+            "CREATE INDEX IF NOT EXISTS idx_rides_open_vehicle ON rides(vehicle_id) WHERE end_time IS NULL",
+        ),
+    ),
+    Migration(
+        2,
+        "R*Tree spatial index over station coordinates",
+        (
+            # Stations are points, so each bounding box is degenerate (min == max).
+            # The R*Tree stores 32-bit floats rounded outward, so it is only used
+            # as a candidate filter; exact distances come from the stations table.
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS stations_rtree USING rtree(
+              station_id, min_lat, max_lat, min_lon, max_lon
+            )
+            """,
+            """
+            INSERT OR REPLACE INTO stations_rtree (station_id, min_lat, max_lat, min_lon, max_lon)
+            SELECT station_id, lat, lat, lon, lon FROM stations
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stations_rtree_insert AFTER INSERT ON stations
+            BEGIN
+              INSERT OR REPLACE INTO stations_rtree (station_id, min_lat, max_lat, min_lon, max_lon)
+              VALUES (NEW.station_id, NEW.lat, NEW.lat, NEW.lon, NEW.lon);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stations_rtree_update
+            AFTER UPDATE OF station_id, lat, lon ON stations
+            BEGIN
+              DELETE FROM stations_rtree WHERE station_id = OLD.station_id;
+              INSERT OR REPLACE INTO stations_rtree (station_id, min_lat, max_lat, min_lon, max_lon)
+              VALUES (NEW.station_id, NEW.lat, NEW.lat, NEW.lon, NEW.lon);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stations_rtree_delete AFTER DELETE ON stations
+            BEGIN
+              DELETE FROM stations_rtree WHERE station_id = OLD.station_id;
+            END
+            """,
+        ),
+    ),
+    Migration(
+        3,
+        "per-station docked and available counters maintained by triggers",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS station_stats (
+              station_id INTEGER PRIMARY KEY,
+              docked_count INTEGER NOT NULL DEFAULT 0,
+              available_bicycle INTEGER NOT NULL DEFAULT 0,
+              available_electric_bicycle INTEGER NOT NULL DEFAULT 0,
+              available_scooter INTEGER NOT NULL DEFAULT 0,
+              available_count INTEGER GENERATED ALWAYS AS (
+                available_bicycle + available_electric_bicycle + available_scooter
+              ) VIRTUAL,
+              FOREIGN KEY(station_id) REFERENCES stations(station_id) ON DELETE CASCADE
+            )
+            """,
+            # Stations with something to rent, kept small by only indexing those rows
+            """
+            CREATE INDEX IF NOT EXISTS idx_station_stats_available
+            ON station_stats(station_id) WHERE available_count > 0
+            """,
+            """
+            INSERT OR REPLACE INTO station_stats (
+              station_id, docked_count, available_bicycle, available_electric_bicycle, available_scooter
+            )
+            SELECT
+              s.station_id,
+              COUNT(v.vehicle_id),
+              COALESCE(SUM(v.status = 'available' AND v.vehicle_type = 'bicycle'), 0),
+              COALESCE(SUM(v.status = 'available' AND v.vehicle_type = 'electric_bicycle'), 0),
+              COALESCE(SUM(v.status = 'available' AND v.vehicle_type = 'scooter'), 0)
+            FROM stations s
+            LEFT JOIN vehicles v ON v.station_id = s.station_id
+            GROUP BY s.station_id
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_station_insert AFTER INSERT ON stations
+            BEGIN
+              INSERT OR IGNORE INTO station_stats (station_id) VALUES (NEW.station_id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_station_delete AFTER DELETE ON stations
+            BEGIN
+              DELETE FROM station_stats WHERE station_id = OLD.station_id;
+            END
+            """,
+            # A vehicle with a NULL station_id (rented) matches no row and counts nowhere
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_vehicle_insert AFTER INSERT ON vehicles
+            BEGIN
+              UPDATE station_stats SET
+                docked_count = docked_count + 1,
+                available_bicycle = available_bicycle
+                  + (NEW.status = 'available' AND NEW.vehicle_type = 'bicycle'),
+                available_electric_bicycle = available_electric_bicycle
+                  + (NEW.status = 'available' AND NEW.vehicle_type = 'electric_bicycle'),
+                available_scooter = available_scooter
+                  + (NEW.status = 'available' AND NEW.vehicle_type = 'scooter')
+              WHERE station_id = NEW.station_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_vehicle_delete AFTER DELETE ON vehicles
+            BEGIN
+              UPDATE station_stats SET
+                docked_count = docked_count - 1,
+                available_bicycle = available_bicycle
+                  - (OLD.status = 'available' AND OLD.vehicle_type = 'bicycle'),
+                available_electric_bicycle = available_electric_bicycle
+                  - (OLD.status = 'available' AND OLD.vehicle_type = 'electric_bicycle'),
+                available_scooter = available_scooter
+                  - (OLD.status = 'available' AND OLD.vehicle_type = 'scooter')
+              WHERE station_id = OLD.station_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_vehicle_update
+            AFTER UPDATE OF station_id, status, vehicle_type ON vehicles
+            BEGIN
+              UPDATE station_stats SET
+                docked_count = docked_count - 1,
+                available_bicycle = available_bicycle
+                  - (OLD.status = 'available' AND OLD.vehicle_type = 'bicycle'),
+                available_electric_bicycle = available_electric_bicycle
+                  - (OLD.status = 'available' AND OLD.vehicle_type = 'electric_bicycle'),
+                available_scooter = available_scooter
+                  - (OLD.status = 'available' AND OLD.vehicle_type = 'scooter')
+              WHERE station_id = OLD.station_id;
+              UPDATE station_stats SET
+                docked_count = docked_count + 1,
+                available_bicycle = available_bicycle
+                  + (NEW.status = 'available' AND NEW.vehicle_type = 'bicycle'),
+                available_electric_bicycle = available_electric_bicycle
+                  + (NEW.status = 'available' AND NEW.vehicle_type = 'electric_bicycle'),
+                available_scooter = available_scooter
+                  + (NEW.status = 'available' AND NEW.vehicle_type = 'scooter')
+              WHERE station_id = NEW.station_id;
+            END
+            """,
+        ),
+    ),
+    Migration(
+        4,
+        "vehicle version column for compare-and-swap state transitions",
+        (
+            # Bumped by every write to a vehicle row; writers update
+            # "WHERE vehicle_id = ? AND version = ?" and retry when it moved
+            "ALTER TABLE vehicles ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        ),
+    ),
+    Migration(
+        5,
+        "ride and dock invariants enforced by SQLite for multi-worker deployments",
+        (
+            # At most one open ride per user and per vehicle, whichever process
+            # inserts it; these replace the plain open-ride indexes from v1
+            "DROP INDEX IF EXISTS idx_rides_open_user",
+            "DROP INDEX IF EXISTS idx_rides_open_vehicle",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_rides_open_user ON rides(user_id) WHERE end_time IS NULL",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_rides_open_vehicle ON rides(vehicle_id) WHERE end_time IS NULL",
+            # Never dock a vehicle at a full station. Only moves between stations
+            # are checked, so updating a vehicle that stays put is always allowed.
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_vehicles_dock_capacity
+            BEFORE UPDATE OF station_id ON vehicles
+            WHEN NEW.station_id IS NOT NULL AND NEW.station_id IS NOT OLD.station_id
+            BEGIN
+              SELECT RAISE(ABORT, 'station_full')
+              WHERE (
+                SELECT st.docked_count >= s.max_capacity
+                FROM stations s JOIN station_stats st ON st.station_id = s.station_id
+                WHERE s.station_id = NEW.station_id
+              );
+            END
+            """,
+        ),
+    ),
+    Migration(
+        6,
+        "dock reservations with a TTL, counted against station capacity",
+        (
+            # One hold per vehicle on its way to a dock. expires_at is a Unix
+            # timestamp; expired rows are purged lazily by whoever reserves next.
+            """
+            CREATE TABLE IF NOT EXISTS dock_reservations (
+              reservation_id TEXT PRIMARY KEY,
+              station_id INTEGER NOT NULL,
+              vehicle_id TEXT NOT NULL UNIQUE,
+              expires_at REAL NOT NULL,
+              FOREIGN KEY(station_id) REFERENCES stations(station_id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_dock_reservations_expires ON dock_reservations(expires_at)",
+            "ALTER TABLE station_stats ADD COLUMN reserved_count INTEGER NOT NULL DEFAULT 0",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_reservation_insert
+            AFTER INSERT ON dock_reservations
+            BEGIN
+              UPDATE station_stats SET reserved_count = reserved_count + 1
+              WHERE station_id = NEW.station_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_stats_reservation_delete
+            AFTER DELETE ON dock_reservations
+            BEGIN
+              UPDATE station_stats SET reserved_count = reserved_count - 1
+              WHERE station_id = OLD.station_id;
+            END
+            """,
+            # Docking consumes the vehicle's hold in the same transaction
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_dock_reservations_consume
+            AFTER UPDATE OF station_id ON vehicles
+            WHEN NEW.station_id IS NOT NULL
+            BEGIN
+              DELETE FROM dock_reservations WHERE vehicle_id = NEW.vehicle_id;
+            END
+            """,
+            # Held docks are taken: only the vehicle holding one may use it
+            "DROP TRIGGER IF EXISTS trg_vehicles_dock_capacity",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_vehicles_dock_capacity
+            BEFORE UPDATE OF station_id ON vehicles
+            WHEN NEW.station_id IS NOT NULL AND NEW.station_id IS NOT OLD.station_id
+            BEGIN
+              SELECT RAISE(ABORT, 'station_full')
+              WHERE (
+                SELECT st.docked_count + st.reserved_count - EXISTS (
+                  SELECT 1 FROM dock_reservations r
+                  WHERE r.vehicle_id = NEW.vehicle_id AND r.station_id = NEW.station_id
+                ) >= s.max_capacity
+                FROM stations s JOIN station_stats st ON st.station_id = s.station_id
+                WHERE s.station_id = NEW.station_id
+              );
+            END
+            """,
+        ),
+    ),
+    Migration(
+        7,
+        "time-limited vehicle holds placed before a ride starts",
+        (
+            # A held vehicle has status 'reserved', so it drops out of every
+            # availability counter and query. One hold per user and per vehicle.
+            """
+            CREATE TABLE IF NOT EXISTS vehicle_holds (
+              hold_id TEXT PRIMARY KEY,
+              user_id TEXT NOT NULL UNIQUE,
+              vehicle_id TEXT NOT NULL UNIQUE,
+              station_id INTEGER NOT NULL,
+              expires_at REAL NOT NULL,
+              FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+              FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_vehicle_holds_expires ON vehicle_holds(expires_at)",
+            # Whatever moves a vehicle out of 'reserved' (renting it, the expiry
+            # sweeper, a degraded report) ends its hold in the same transaction
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_vehicle_holds_consume
+            AFTER UPDATE OF status ON vehicles
+            WHEN OLD.status = 'reserved' AND NEW.status != 'reserved'
+            BEGIN
+              DELETE FROM vehicle_holds WHERE vehicle_id = NEW.vehicle_id;
+            END
+            """,
+        ),
+    ),
+    Migration(
+        8,
+        "per-station vehicles version for validating in-process caches",
+        (
+            # Set to a fresh random value by every change to a vehicle docked at
+            # (or leaving) the station. A rolled-back change restores the old value
+            # and the next change draws a new one, so a value never comes back with
+            # different vehicles behind it: an in-process copy of a station's
+            # vehicles is current exactly while the stored value still matches.
+            "ALTER TABLE station_stats ADD COLUMN vehicles_version INTEGER NOT NULL DEFAULT 0",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_insert AFTER INSERT ON vehicles
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id = NEW.station_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_delete AFTER DELETE ON vehicles
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id = OLD.station_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_update AFTER UPDATE ON vehicles
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id IN (OLD.station_id, NEW.station_id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_electric_battery
+            AFTER UPDATE OF battery ON electric_bicycles
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id = (SELECT station_id FROM vehicles WHERE vehicle_id = NEW.vehicle_id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_scooter_battery
+            AFTER UPDATE OF battery ON scooters
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id = (SELECT station_id FROM vehicles WHERE vehicle_id = NEW.vehicle_id);
+            END
+            """,
+            # Battery rows are inserted after their vehicle row
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_electric_insert
+            AFTER INSERT ON electric_bicycles
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id = (SELECT station_id FROM vehicles WHERE vehicle_id = NEW.vehicle_id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_station_vehicles_version_scooter_insert
+            AFTER INSERT ON scooters
+            BEGIN
+              UPDATE station_stats SET vehicles_version = random()
+              WHERE station_id = (SELECT station_id FROM vehicles WHERE vehicle_id = NEW.vehicle_id);
+            END
+            """,
+        ),
+    ),
+    Migration(
+        9,
+        "open rides version for validating the in-process active ride index",
+        (
+            # One row. Set to a fresh random value whenever a ride opens, closes or
+            # changes hands, like station_stats.vehicles_version for vehicles.
+            """
+            CREATE TABLE IF NOT EXISTS open_rides_version (
+              id INTEGER PRIMARY KEY CHECK (id = 1),
+              version INTEGER NOT NULL
+            )
+            """,
+            "INSERT OR IGNORE INTO open_rides_version (id, version) VALUES (1, random())",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_open_rides_version_insert AFTER INSERT ON rides
+            BEGIN
+              UPDATE open_rides_version SET version = random() WHERE id = 1;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_open_rides_version_update
+            AFTER UPDATE OF user_id, vehicle_id, end_time ON rides
+            BEGIN
+              UPDATE open_rides_version SET version = random() WHERE id = 1;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_open_rides_version_delete AFTER DELETE ON rides
+            BEGIN
+              UPDATE open_rides_version SET version = random() WHERE id = 1;
+            END
+            """,
+        ),
+    ),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """Return the highest applied migration version (0 when none)."""
+    cursor = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+async def apply_migrations(db: aiosqlite.Connection) -> list[int]:
+    """
+    Create the base schema if needed and apply every pending migration.
+
+    Safe to call concurrently from several processes: the version is re-read
+    after taking the write lock, so each migration is applied exactly once.
+
+    Returns: the versions applied by this call
+    """
+    await db.executescript(CREATE_SQL + SCHEMA_VERSION_SQL)
+
+    applied: list[int] = []
+    for migration in MIGRATIONS:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            if await get_schema_version(db) >= migration.version:
+                await db.rollback()
+                continue
+            for statement in migration.statements:
+                await db.execute(statement)
+            await db.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (migration.version, migration.description),
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        applied.append(migration.version)
+    return applied
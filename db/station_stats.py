@@ -0,0 +1,78 @@
+"""Consistency checks for the trigger-maintained ``station_stats`` counters."""
+
+from __future__ import annotations
+
+import aiosqlite
+
+COUNTER_COLUMNS = (
+    "docked_count",
+    "available_bicycle",
+    "available_electric_bicycle",
+    "available_scooter",
+    "reserved_count",
+)
+
+# Counters recomputed from scratch, one row per station
+RECOUNT_SQL = """
+    SELECT
+      s.station_id,
+      COUNT(v.vehicle_id) AS docked_count,
+      COALESCE(SUM(v.status = 'available' AND v.vehicle_type = 'bicycle'), 0) AS available_bicycle,
+      COALESCE(SUM(v.status = 'available' AND v.vehicle_type = 'electric_bicycle'), 0) AS available_electric_bicycle,
+      COALESCE(SUM(v.status = 'available' AND v.vehicle_type = 'scooter'), 0) AS available_scooter,
+      (SELECT COUNT(*) FROM dock_reservations r WHERE r.station_id = s.station_id) AS reserved_count
+    FROM stations s
+    LEFT JOIN vehicles v ON v.station_id = s.station_id
+    GROUP BY s.station_id
+"""
+
+
+async def find_station_stats_drift(db: aiosqlite.Connection) -> list[dict]:
+    """
+    Compare every station's stored counters with a full recount of ``vehicles``
+    and ``dock_reservations``.
+
+    Returns: one dict per station whose counters differ (or whose row is missing),
+    with ``station_id`` and ``{column: (stored, expected)}`` under ``mismatches``
+    """
+    cursor = await db.execute(
+        f"SELECT station_id, {', '.join(COUNTER_COLUMNS)} FROM station_stats"
+    )
+    stored = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+    await cursor.close()
+
+    cursor = await db.execute(RECOUNT_SQL)
+    expected = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+    await cursor.close()
+
+    drift = []
+    for station_id in sorted(stored.keys() | expected.keys()):
+        actual = stored.get(station_id)
+        wanted = expected.get(station_id)
+        if actual == wanted:
+            continue
+        mismatches = {
+            column: (
+                actual[i] if actual is not None else None,
+                wanted[i] if wanted is not None else None,
+            )
+            for i, column in enumerate(COUNTER_COLUMNS)
+            if actual is None or wanted is None or actual[i] != wanted[i]
+        }
+        drift.append({"station_id": station_id, "mismatches": mismatches})
+    return drift
+
+
+async def rebuild_station_stats(db: aiosqlite.Connection) -> int:
+    """Replace every counter with a full recount. Returns the number of stations."""
+    await db.execute("DELETE FROM station_stats")
+    # Fresh vehicles versions, so no cached copy of a station stays valid
+    cursor = await db.execute(
+        f"""
+        INSERT INTO station_stats (station_id, {', '.join(COUNTER_COLUMNS)}, vehicles_version)
+        SELECT recount.*, random() FROM ({RECOUNT_SQL}) AS recount
+        """
+    )
+    count = cursor.rowcount
+    await cursor.close()
+    return count
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+import aiosqlite
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+DB_PATH = PROJECT_ROOT / "data" / "app.db"
+
+
+async def check_station_stats(repair: bool = False) -> int:
+    """Verify station_stats against a full recount. Returns the number of drifted stations."""
+    from db.station_stats import find_station_stats_drift, rebuild_station_stats
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        drift = await find_station_stats_drift(db)
+        for entry in drift:
+            details = ", ".join(
+                f"{column}: stored={stored} expected={expected}"
+                for column, (stored, expected) in entry["mismatches"].items()
+            )
+            print(f"Station {entry['station_id']}: {details}")
+
+        if not drift:
+            print("station_stats is consistent with vehicles")
+        elif repair:
+            await db.execute("BEGIN IMMEDIATE")
+            rebuilt = await rebuild_station_stats(db)
+            await db.commit()
+            print(f"Rebuilt counters for {rebuilt} stations")
+        return len(drift)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the station_stats counters against a full recount of vehicles."
+    )
+    parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="Rebuild every counter from a full recount when drift is found.",
+    )
+    args = parser.parse_args()
+
+    drifted = asyncio.run(check_station_stats(repair=args.repair))
+    sys.exit(1 if drifted and not args.repair else 0)
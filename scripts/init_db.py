@@ -19,6 +19,7 @@ DB_PATH = PROJECT_ROOT / "data" / "app.db"
 
 
 async def init_db(reset_db: bool = False) -> None:
+    from db.migrations import apply_migrations
     from db.schema import CREATE_SQL
     from src.models.vehicle import VehicleType
 
@@ -28,11 +29,17 @@ async def init_db(reset_db: bool = False) -> None:
             print("Resetting and creating tables...")
             await db.executescript("""
                 DROP TABLE IF EXISTS rides;
+                DROP TABLE IF EXISTS open_rides_version;
                 DROP TABLE IF EXISTS electric_bicycles;
                 DROP TABLE IF EXISTS scooters;
                 DROP TABLE IF EXISTS users;
                 DROP TABLE IF EXISTS vehicles;
+                DROP TABLE IF EXISTS dock_reservations;
+                DROP TABLE IF EXISTS vehicle_holds;
+                DROP TABLE IF EXISTS station_stats;
+                DROP TABLE IF EXISTS stations_rtree;
                 DROP TABLE IF EXISTS stations;
+                DROP TABLE IF EXISTS schema_version;
                 """)
         else:
             print("Creating tables (without reset)...")
@@ -126,6 +133,10 @@ async def init_db(reset_db: bool = False) -> None:
         # 3. Commit the changes so they permanently save to the file!
         await db.commit()
 
+        print("Applying migrations...")
+        applied = await apply_migrations(db)
+        print(f"Applied migrations: {applied or 'none (schema up to date)'}")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
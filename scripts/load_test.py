@@ -0,0 +1,363 @@
+"""
+Replay register -> start ride -> end ride journeys against a running server.
+
+Journeys arrive as a Poisson process at ``--rate`` per second (an open model:
+arrivals do not wait for earlier journeys, so a saturated server shows up as
+growing latency and errors instead of being hidden by a slower client). Each
+journey registers a fresh user, starts a ride near a point drawn from the
+geographic distribution, rides for a random time and ends the ride near
+another point.
+
+Points are drawn around the stations in ``data/stations.csv``: ``stations``
+picks a station weighted by its capacity and adds Gaussian noise of
+``--spread`` degrees; ``uniform`` draws from the stations' bounding box.
+
+Several ``--rate`` values run as successive stages, which makes the saturation
+point visible as the stage where throughput stops following the arrival rate.
+Every stage reports throughput, status codes and latency percentiles per endpoint.
+
+Usage:
+    uvicorn src.main:app --workers 4
+    python scripts/load_test.py --url http://127.0.0.1:8000 --rate 20 50 100 --journeys 1000
+    python scripts/load_test.py --rate 50 --duration 60 --json load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import csv
+import itertools
+import json
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+STATIONS_CSV = PROJECT_ROOT / "data" / "stations.csv"
+
+REGISTER = "POST /users/register"
+START = "POST /rides/start"
+END = "POST /rides/end"
+ENDPOINTS = (REGISTER, START, END)
+
+
+class GeoDistribution:
+    """Draws (lon, lat) points around station coordinates."""
+
+    def __init__(
+        self,
+        stations: list[tuple[float, float, int]],
+        mode: str = "stations",
+        spread: float = 0.003,
+    ) -> None:
+        if not stations:
+            raise ValueError("At least one station is needed to seed the distribution")
+        if mode not in ("stations", "uniform"):
+            raise ValueError(f"Unknown distribution {mode!r}")
+        self.stations = stations
+        self.mode = mode
+        self.spread = spread
+        # Cumulative capacity weights: busy (large) stations see more riders
+        self._cumulative = list(itertools.accumulate(s[2] for s in stations))
+        lons = [s[0] for s in stations]
+        lats = [s[1] for s in stations]
+        self._box = (min(lons), max(lons), min(lats), max(lats))
+
+    @classmethod
+    def from_csv(cls, path: Path, mode: str = "stations", spread: float = 0.003):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            stations = [
+                (float(row["lon"]), float(row["lat"]), int(row["max_capacity"]))
+                for row in csv.DictReader(f)
+            ]
+        return cls(stations, mode, spread)
+
+    def point(self, rng: random.Random) -> tuple[float, float]:
+        if self.mode == "uniform":
+            min_lon, max_lon, min_lat, max_lat = self._box
+            return rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)
+        target = rng.random() * self._cumulative[-1]
+        lon, lat, _ = self.stations[bisect.bisect_right(self._cumulative, target)]
+        return lon + rng.gauss(0, self.spread), lat + rng.gauss(0, self.spread)
+
+
+@dataclass
+class StageStats:
+    """Outcomes of one stage, per endpoint."""
+
+    rate: float
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    journeys_started: int = 0
+    journeys_completed: int = 0
+    # Largest delay between a scheduled arrival and the moment it was sent
+    max_schedule_lag: float = 0.0
+    elapsed: float = 0.0
+
+    def record(self, endpoint: str, status: str, seconds: float) -> None:
+        self.statuses[endpoint][status] += 1
+        self.latencies[endpoint].append(seconds * 1000)
+
+    def summary(self) -> dict:
+        requests = sum(sum(counter.values()) for counter in self.statuses.values())
+        errors = sum(
+            count
+            for counter in self.statuses.values()
+            for status, count in counter.items()
+            if not status.startswith("2")
+        )
+        elapsed = self.elapsed or float("nan")
+        return {
+            "target_rate": self.rate,
+            "elapsed_s": self.elapsed,
+            "journeys_started": self.journeys_started,
+            "journeys_completed": self.journeys_completed,
+            "journeys_per_s": self.journeys_completed / elapsed,
+            "requests": requests,
+            "requests_per_s": requests / elapsed,
+            "error_rate": errors / requests if requests else 0.0,
+            "max_schedule_lag_ms": self.max_schedule_lag * 1000,
+            "endpoints": {
+                endpoint: {
+                    "statuses": dict(sorted(self.statuses[endpoint].items())),
+                    **latency_percentiles(self.latencies[endpoint]),
+                }
+                for endpoint in ENDPOINTS
+                if endpoint in self.statuses
+            },
+        }
+
+
+def latency_percentiles(samples_ms: list[float]) -> dict:
+    """Nearest-rank latency percentiles in milliseconds."""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p * len(ordered)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": rank(0.50),
+        "p90_ms": rank(0.90),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+async def _request(
+    client: httpx.AsyncClient, stats: StageStats, endpoint: str, url: str, payload: dict
+) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        response = await client.post(url, json=payload)
+    except httpx.HTTPError as e:
+        # Timeouts, refused or reset connections: the server is not answering
+        stats.record(
+            endpoint, f"error:{type(e).__name__}", time.perf_counter() - started
+        )
+        return None
+    stats.record(endpoint, str(response.status_code), time.perf_counter() - started)
+    return response
+
+
+async def journey(
+    client: httpx.AsyncClient,
+    stats: StageStats,
+    geo: GeoDistribution,
+    rng: random.Random,
+    user_id: str,
+    ride_seconds: float,
+) -> None:
+    """One user: register, start a ride, ride for a while, end it."""
+    stats.journeys_started += 1
+    response = await _request(
+        client,
+        stats,
+        REGISTER,
+        "/users/register",
+        {
+            "user_id": user_id,
+            "first_name": "Load",
+            "last_name": "Test",
+            "email": f"{user_id.lower()}@load.example.com",
+        },
+    )
+    if response is None or response.status_code not in (200, 201):
+        return
+
+    lon, lat = geo.point(rng)
+    response = await _request(
+        client,
+        stats,
+        START,
+        "/rides/start",
+        {"user_id": user_id, "lon": lon, "lat": lat},
+    )
+    if response is None or response.status_code != 200:
+        return
+    ride_id = response.json()["ride_id"]
+
+    if ride_seconds > 0:
+        await asyncio.sleep(rng.uniform(0, ride_seconds))
+
+    lon, lat = geo.point(rng)
+    response = await _request(
+        client, stats, END, "/rides/end", {"ride_id": ride_id, "lon": lon, "lat": lat}
+    )
+    if response is not None and response.status_code == 200:
+        stats.journeys_completed += 1
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    geo: GeoDistribution,
+    rate: float,
+    journeys: int | None = None,
+    duration: float | None = None,
+    ride_seconds: float = 0.0,
+    max_in_flight: int = 1000,
+    seed: int = 0,
+    run_id: str | None = None,
+) -> StageStats:
+    """
+    Launch journeys at ``rate`` per second until ``journeys`` were launched or
+    ``duration`` seconds passed, then wait for the launched ones to finish.
+    At most ``max_in_flight`` journeys run at once; arrivals beyond that wait,
+    which shows up as schedule lag.
+    """
+    if journeys is None and duration is None:
+        raise ValueError("Give a number of journeys or a duration")
+    rng = random.Random(seed)
+    run_id = run_id or uuid.uuid4().hex[:8]
+    stats = StageStats(rate=rate)
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks: set[asyncio.Task] = set()
+
+    async def launch(index: int) -> None:
+        try:
+            await journey(
+                client,
+                stats,
+                geo,
+                random.Random(rng.random()),
+                f"LOAD-{run_id}-{index}",
+                ride_seconds,
+            )
+        finally:
+            slots.release()
+
+    started = time.perf_counter()
+    scheduled = 0.0
+    for index in itertools.count():
+        if journeys is not None and index >= journeys:
+            break
+        scheduled += rng.expovariate(rate)
+        if duration is not None and scheduled > duration:
+            break
+        delay = started + scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        stats.max_schedule_lag = max(
+            stats.max_schedule_lag, time.perf_counter() - started - scheduled
+        )
+        task = asyncio.create_task(launch(index))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def print_summary(summary: dict) -> None:
+    print(
+        f"\nrate {summary['target_rate']:g}/s: {summary['journeys_completed']}/{summary['journeys_started']} "
+        f"journeys completed in {summary['elapsed_s']:.1f}s, {summary['journeys_per_s']:.1f} journeys/s, "
+        f"{summary['requests_per_s']:.1f} req/s, error rate {summary['error_rate']:.1%}, "
+        f"max schedule lag {summary['max_schedule_lag_ms']:.0f} ms"
+    )
+    print(
+        f"  {'endpoint':<22} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses"
+    )
+    for endpoint, data in summary["endpoints"].items():
+        statuses = ", ".join(f"{status}: {n}" for status, n in data["statuses"].items())
+        print(
+            f"  {endpoint:<22} {data['count']:>7} {data['p50_ms']:>9.1f} {data['p95_ms']:>9.1f} "
+            f"{data['p99_ms']:>9.1f} {data['max_ms']:>9.1f}  {statuses}"
+        )
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    geo = GeoDistribution.from_csv(args.stations_csv, args.distribution, args.spread)
+    limits = httpx.Limits(
+        max_connections=args.connections, max_keepalive_connections=args.connections
+    )
+    summaries = []
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=args.timeout
+    ) as client:
+        for stage, rate in enumerate(args.rate):
+            stats = await run_stage(
+                client,
+                geo,
+                rate,
+                journeys=args.journeys,
+                duration=args.duration,
+                ride_seconds=args.ride_seconds,
+                max_in_flight=args.max_in_flight,
+                seed=args.seed + stage,
+            )
+            summary = stats.summary()
+            print_summary(summary)
+            summaries.append(summary)
+    return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        nargs="+",
+        default=[10.0],
+        help="Journey arrivals per second; several values run as successive stages",
+    )
+    parser.add_argument("--journeys", type=int, help="Journeys per stage")
+    parser.add_argument("--duration", type=float, help="Seconds of arrivals per stage")
+    parser.add_argument(
+        "--ride-seconds",
+        type=float,
+        default=0.0,
+        help="Rides last a uniform random time up to this many seconds",
+    )
+    parser.add_argument(
+        "--distribution", choices=("stations", "uniform"), default="stations"
+    )
+    parser.add_argument(
+        "--spread", type=float, default=0.003, help="Degrees of noise around a station"
+    )
+    parser.add_argument("--stations-csv", type=Path, default=STATIONS_CSV)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the stage summaries here")
+    args = parser.parse_args()
+    if args.journeys is None and args.duration is None:
+        args.journeys = 1000
+
+    summaries = asyncio.run(main(args))
+    if args.json:
+        args.json.write_text(json.dumps(summaries, indent=2))
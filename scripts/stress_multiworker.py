@@ -0,0 +1,300 @@
+"""
+Stress the ride flows from several worker processes sharing one SQLite file.
+
+Each worker process plays the part of one ``uvicorn --workers N`` worker: it runs
+a few concurrent clients, each on its own connection, that start rides (directly
+or through a vehicle hold) and end them through ``RideService``. Clients draw from one shared pool of users and end
+whichever ride happens to be open, so workers keep racing for the same users,
+vehicles, rides and docks. Nothing in-process (locks, caches, indexes) is shared
+between workers; only SQLite keeps them honest. Afterwards the database is
+checked for invariant violations.
+
+Usage:
+    python scripts/stress_multiworker.py
+    python scripts/stress_multiworker.py --workers 8 --operations 500 --db /tmp/stress.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+import aiosqlite
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from db.migrations import apply_migrations  # noqa: E402
+from db.station_stats import find_station_stats_drift  # noqa: E402
+from src.db_pool import DEFAULT_PRAGMAS  # noqa: E402
+
+# Stations sit on a small grid around this point; ride requests land nearby
+ORIGIN_LON = 34.78
+ORIGIN_LAT = 32.08
+GRID_STEP = 0.01
+
+# SQL returning one row per violation of a ride/dock invariant
+INVARIANT_CHECKS: dict[str, str] = {
+    "user with several open rides": """
+        SELECT user_id FROM rides WHERE end_time IS NULL
+        GROUP BY user_id HAVING COUNT(*) > 1
+    """,
+    "vehicle with several open rides": """
+        SELECT vehicle_id FROM rides WHERE end_time IS NULL
+        GROUP BY vehicle_id HAVING COUNT(*) > 1
+    """,
+    "rented vehicle without an open ride": """
+        SELECT v.vehicle_id FROM vehicles v
+        WHERE v.status = 'rented'
+          AND NOT EXISTS (
+            SELECT 1 FROM rides r WHERE r.vehicle_id = v.vehicle_id AND r.end_time IS NULL
+          )
+    """,
+    "open ride on a vehicle that is not rented": """
+        SELECT r.ride_id FROM rides r JOIN vehicles v ON v.vehicle_id = r.vehicle_id
+        WHERE r.end_time IS NULL AND v.status != 'rented'
+    """,
+    "rented vehicle still docked": """
+        SELECT vehicle_id FROM vehicles WHERE status = 'rented' AND station_id IS NOT NULL
+    """,
+    "reserved vehicle without a hold": """
+        SELECT v.vehicle_id FROM vehicles v
+        WHERE v.status = 'reserved'
+          AND NOT EXISTS (SELECT 1 FROM vehicle_holds h WHERE h.vehicle_id = v.vehicle_id)
+    """,
+    "hold on a vehicle that is not reserved": """
+        SELECT h.hold_id FROM vehicle_holds h JOIN vehicles v ON v.vehicle_id = h.vehicle_id
+        WHERE v.status != 'reserved'
+    """,
+    "station over capacity": """
+        SELECT s.station_id FROM stations s JOIN vehicles v ON v.station_id = s.station_id
+        GROUP BY s.station_id HAVING COUNT(*) > s.max_capacity
+    """,
+}
+
+
+async def _connect(db_path: Path) -> aiosqlite.Connection:
+    db = await aiosqlite.connect(db_path)
+    db.row_factory = aiosqlite.Row
+    for pragma in DEFAULT_PRAGMAS:
+        await db.execute(pragma)
+    return db
+
+
+async def seed_database(
+    db_path: Path, stations: int, vehicles_per_station: int, users: int
+) -> None:
+    """Create a fresh database with half-full stations of bicycles and a pool of users."""
+    db = await _connect(db_path)
+    try:
+        await apply_migrations(db)
+        await db.execute("BEGIN IMMEDIATE")
+        await db.executemany(
+            "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    i + 1,
+                    f"Stress {i + 1}",
+                    ORIGIN_LAT + (i // 4) * GRID_STEP,
+                    ORIGIN_LON + (i % 4) * GRID_STEP,
+                    vehicles_per_station * 2,
+                )
+                for i in range(stations)
+            ],
+        )
+        await db.executemany(
+            "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+            "VALUES (?, ?, 'bicycle', 'available', 0, NULL)",
+            [
+                (f"SV{i + 1}-{j}", i + 1)
+                for i in range(stations)
+                for j in range(vehicles_per_station)
+            ],
+        )
+        await db.executemany(
+            "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES (?, 'Stress', 'User', ?, 'tok')",
+            [(f"SU{i}", f"su{i}@example.com") for i in range(users)],
+        )
+        await db.commit()
+    finally:
+        await db.close()
+
+
+async def _start_with_hold(service, db, user_id: str, lon: float, lat: float):
+    """POST /vehicles/reserve followed by POST /rides/start with the hold id."""
+    hold = await service.reserve_vehicle(db, user_id, lon=lon, lat=lat)
+    return await service.start_new_ride(db, user_id, hold_id=hold.hold_id)
+
+
+async def _client(
+    db_path: Path, rng: random.Random, operations: int, users: int, counts: Counter
+) -> None:
+    from fastapi import HTTPException
+
+    from src.services.rides_service import RideService
+
+    service = RideService()
+    db = await _connect(db_path)
+    try:
+        for _ in range(operations):
+            lon = ORIGIN_LON + rng.uniform(-0.01, 0.04)
+            lat = ORIGIN_LAT + rng.uniform(-0.01, 0.04)
+            user_id = f"SU{rng.randrange(users)}"
+            roll = rng.random()
+            if roll < 0.35:
+                action = "start"
+                call = service.start_new_ride(db, user_id, lon=lon, lat=lat)
+            elif roll < 0.5:
+                action = "hold_start"
+                call = _start_with_hold(service, db, user_id, lon, lat)
+            else:
+                action = "end"
+                cursor = await db.execute(
+                    "SELECT ride_id FROM rides WHERE end_time IS NULL ORDER BY random() LIMIT 1"
+                )
+                row = await cursor.fetchone()
+                await cursor.close()
+                if row is None:
+                    counts["end:none_open"] += 1
+                    continue
+                call = service.end_ride(db, row["ride_id"], lon=lon, lat=lat)
+            try:
+                await call
+                counts[f"{action}:200"] += 1
+            except HTTPException as e:
+                counts[f"{action}:{e.status_code}"] += 1
+            except Exception as e:
+                counts[f"{action}:error:{type(e).__name__}"] += 1
+    finally:
+        await db.close()
+
+
+async def _run_worker(
+    db_path: Path, worker_id: int, clients: int, operations: int, users: int, seed: int
+) -> Counter:
+    counts: Counter = Counter()
+    await asyncio.gather(
+        *(
+            _client(
+                db_path,
+                random.Random(seed * 1_000_003 + worker_id * 1_000 + client),
+                operations,
+                users,
+                counts,
+            )
+            for client in range(clients)
+        )
+    )
+    return counts
+
+
+def _worker(
+    db_path: Path, worker_id: int, clients: int, operations: int, users: int, seed: int
+) -> dict[str, int]:
+    """Entry point of one worker process."""
+    return dict(
+        asyncio.run(_run_worker(db_path, worker_id, clients, operations, users, seed))
+    )
+
+
+async def check_invariants(db: aiosqlite.Connection) -> list[str]:
+    """Return a human-readable line per invariant violation (empty when consistent)."""
+    violations = []
+    for name, sql in INVARIANT_CHECKS.items():
+        cursor = await db.execute(sql)
+        rows = await cursor.fetchall()
+        await cursor.close()
+        violations.extend(f"{name}: {row[0]}" for row in rows)
+    for entry in await find_station_stats_drift(db):
+        violations.append(
+            f"station_stats drift at station {entry['station_id']}: {entry['mismatches']}"
+        )
+    return violations
+
+
+async def _check(db_path: Path) -> list[str]:
+    db = await _connect(db_path)
+    try:
+        return await check_invariants(db)
+    finally:
+        await db.close()
+
+
+def run_stress(
+    db_path: Path,
+    workers: int = 4,
+    clients: int = 2,
+    operations: int = 100,
+    users: int = 8,
+    stations: int = 6,
+    vehicles_per_station: int = 4,
+    seed: int = 0,
+) -> dict:
+    """
+    Seed ``db_path``, hammer it from ``workers`` processes and check the invariants.
+
+    Returns: ``{"outcomes": {"start:200": n, "end:409": n, ...}, "violations": [...]}``
+    """
+    db_path = Path(db_path)
+    asyncio.run(seed_database(db_path, stations, vehicles_per_station, users))
+
+    # spawn, not fork: every worker starts from a clean interpreter, like uvicorn's
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers) as pool:
+        results = pool.starmap(
+            _worker,
+            [
+                (db_path, worker_id, clients, operations, users, seed)
+                for worker_id in range(workers)
+            ],
+        )
+
+    outcomes: Counter = Counter()
+    for result in results:
+        outcomes.update(result)
+    return {
+        "outcomes": dict(sorted(outcomes.items())),
+        "violations": asyncio.run(_check(db_path)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", type=Path, default=PROJECT_ROOT / "data" / "stress.db")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=2, help="clients per worker")
+    parser.add_argument(
+        "--operations", type=int, default=100, help="operations per client"
+    )
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--stations", type=int, default=6)
+    parser.add_argument("--vehicles-per-station", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{args.db}{suffix}").unlink(missing_ok=True)
+
+    report = run_stress(
+        args.db,
+        workers=args.workers,
+        clients=args.clients,
+        operations=args.operations,
+        users=args.users,
+        stations=args.stations,
+        vehicles_per_station=args.vehicles_per_station,
+        seed=args.seed,
+    )
+    for outcome, count in report["outcomes"].items():
+        print(f"{outcome:<24} {count:>8}")
+    if report["violations"]:
+        print(f"\n{len(report['violations'])} invariant violations:")
+        for violation in report["violations"]:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\nNo invariant violations")
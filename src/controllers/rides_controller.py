@@ -8,6 +8,7 @@ from src.services.rides_service import RideService
 # 3. Import your database connection dependency
 from src.db import (
     get_db,
+    get_read_db,
 )  # Adjust this import based on where your get_db function lives
 
 # Create the router
@@ -17,7 +18,9 @@ service = RideService()
 
 
 @router.get("/active-users", response_model=list[User])
-async def get_active_users(db: aiosqlite.Connection = Depends(get_db)) -> list[User]:
+async def get_active_users(
+    db: aiosqlite.Connection = Depends(get_read_db),
+) -> list[User]:
     """Return all users who are currently in the middle of a ride."""
     return await service.list_active_users(db)
 
@@ -33,6 +36,7 @@ async def start_ride(
             user_id=request.user_id,
             lon=request.lon,
             lat=request.lat,
+            hold_id=request.hold_id,
         )
 
         if not ride:
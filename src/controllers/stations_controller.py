@@ -4,8 +4,10 @@ import aiosqlite
 
 from fastapi import APIRouter, HTTPException, Query
 
-from src.db import get_db
+from src.db import get_db, get_read_db
+from src.models.nearest_station_cache import get_nearest_station_cache
 from src.models.station import Station, StationWithDistance
+from src.models.station_catalog import get_station_catalog
 from src.services.stations_service import StationsService
 
 router = APIRouter(prefix="/stations", tags=["stations"])
@@ -16,7 +18,7 @@ service = StationsService()
 async def get_nearest_station(
     lon: float = Query(..., description="Longitude"),
     lat: float = Query(..., description="Latitude"),
-    db: aiosqlite.Connection = Depends(get_db),
+    db: aiosqlite.Connection = Depends(get_read_db),
 ) -> StationWithDistance:
     station = await service.get_nearest_station(db, lon=lon, lat=lat)
 
@@ -26,9 +28,19 @@ async def get_nearest_station(
     return station
 
 
+@router.post("/catalog/reload")
+async def reload_station_catalog(
+    db: aiosqlite.Connection = Depends(get_db),
+) -> dict:
+    # Call after changing the stations table so reads stop serving old metadata
+    count = await get_station_catalog().reload(db)
+    get_nearest_station_cache().clear()
+    return {"stations": count}
+
+
 @router.get("/{station_id}", response_model=Station)
 async def get_station(
-    station_id: int, db: aiosqlite.Connection = Depends(get_db)
+    station_id: int, db: aiosqlite.Connection = Depends(get_read_db)
 ) -> Station:
 
     station = await service.get_station_by_id(db, station_id)
@@ -3,17 +3,34 @@ from fastapi import Depends
 import aiosqlite
 from fastapi import APIRouter, HTTPException, Query
 
-from src.db import get_db
+from src.db import get_db, get_read_db
 from src.models.vehicle import Vehicle
+from src.models.vehicle_hold import VehicleHold
+from src.schemas.ride_schemas import VehicleReserveRequest
+from src.services.rides_service import RideService
 from src.services.vehicles_service import VehiclesService
 
 router = APIRouter(prefix="/vehicles", tags=["vehicles"])
 service = VehiclesService()
+rides_service = RideService()
+
+
+@router.post("/reserve", response_model=VehicleHold)
+async def reserve_vehicle(
+    request: VehicleReserveRequest, db: aiosqlite.Connection = Depends(get_db)
+) -> VehicleHold:
+    """
+    Hold the best rentable vehicle near a location for a user.
+    Pass the returned hold_id to POST /rides/start before expires_at to ride it.
+    """
+    return await rides_service.reserve_vehicle(
+        db, user_id=request.user_id, lon=request.lon, lat=request.lat
+    )
 
 
 @router.get("/{vehicle_id}", response_model=Vehicle)
 async def get_vehicle(
-    vehicle_id: str, db: aiosqlite.Connection = Depends(get_db)
+    vehicle_id: str, db: aiosqlite.Connection = Depends(get_read_db)
 ) -> Vehicle:
     vehicle = await service.get_vehicle_by_id(db, vehicle_id)
 
@@ -1,24 +1,98 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from typing import AsyncIterator
 
 import aiosqlite
 
+from db.migrations import apply_migrations
+from src.db_pool import ConnectionPool
+from src.sql_profiler import profile_connection
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DB_PATH = PROJECT_ROOT / "data" / "app.db"
 
+# Read lane: query_only connections that grow with concurrent readers.
+# In WAL mode readers never block behind the writer.
+DB_READ_POOL_MIN_SIZE = int(os.getenv("DB_READ_POOL_MIN_SIZE", "1"))
+DB_READ_POOL_MAX_SIZE = int(os.getenv("DB_READ_POOL_MAX_SIZE", "8"))
+# Writer lane: a small (by default single) set of connections allowed to write,
+# so writers queue in-process instead of fighting over SQLite's write lock.
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5.0"))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(
+    os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30.0")
+)
+
+_read_pool: ConnectionPool | None = None
+_write_pool: ConnectionPool | None = None
+
+
+def get_read_pool() -> ConnectionPool:
+    """Return the process-wide read lane, creating it lazily if the lifespan hook did not."""
+    global _read_pool
+    if _read_pool is None or _read_pool.closed:
+        _read_pool = ConnectionPool(
+            DB_PATH,
+            min_size=DB_READ_POOL_MIN_SIZE,
+            max_size=DB_READ_POOL_MAX_SIZE,
+            acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+            health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+            read_only=True,
+        )
+    return _read_pool
+
+
+def get_write_pool() -> ConnectionPool:
+    """Return the process-wide writer lane, creating it lazily if the lifespan hook did not."""
+    global _write_pool
+    if _write_pool is None or _write_pool.closed:
+        _write_pool = ConnectionPool(
+            DB_PATH,
+            min_size=min(1, DB_WRITE_POOL_SIZE),
+            max_size=DB_WRITE_POOL_SIZE,
+            acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+            health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+        )
+    return _write_pool
+
+
+async def open_pools() -> None:
+    """Open both connection lanes at application startup, migrating the schema first."""
+    write_pool = get_write_pool()
+    await write_pool.open()
+    async with write_pool.acquire() as db:
+        await apply_migrations(db)
+    await get_read_pool().open()
+
+
+async def close_pools() -> None:
+    """Close both connection lanes at application shutdown."""
+    global _read_pool, _write_pool
+    for pool in (_read_pool, _write_pool):
+        if pool is not None:
+            await pool.close()
+    _read_pool = None
+    _write_pool = None
+
+
+def pool_stats() -> dict:
+    return {"read": get_read_pool().stats(), "write": get_write_pool().stats()}
+
 
 async def get_db() -> AsyncIterator[aiosqlite.Connection]:
-    db = await aiosqlite.connect(DB_PATH)
-    db.row_factory = aiosqlite.Row
-    try:
-        await db.execute("PRAGMA journal_mode=WAL;")
-        await db.execute("PRAGMA foreign_keys=ON;")
-        yield db
-        await db.commit()
-    except Exception:
-        await db.rollback()
-        raise
-    finally:
-        await db.close()
+    """Writer-lane connection for endpoints that modify state."""
+    async with get_write_pool().acquire() as db:
+        try:
+            yield profile_connection(db)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def get_read_db() -> AsyncIterator[aiosqlite.Connection]:
+    """Read-lane (``query_only``) connection for endpoints that only read."""
+    async with get_read_pool().acquire() as db:
+        yield profile_connection(db)
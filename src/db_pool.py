@@ -0,0 +1,271 @@
+"""
+Application-lifespan connection pool for aiosqlite.
+
+Every aiosqlite connection owns a worker thread, so opening one per request
+(and re-running the connection pragmas each time) dominates cheap endpoints.
+The pool keeps a bounded set of warm connections, applies the pragmas once
+per connection and hands them out to ``get_db``.
+
+The pool only uses plain futures created on the running loop while waiting,
+so it is safe to reuse across event loops (e.g. one loop per test).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Deque, Sequence
+
+import aiosqlite
+
+DEFAULT_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA foreign_keys=ON;",
+    "PRAGMA busy_timeout=5000;",
+)
+
+# Appended for read-lane pools: SQLite rejects any statement that would write
+READ_ONLY_PRAGMAS: tuple[str, ...] = ("PRAGMA query_only=ON;",)
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised when no connection could be acquired within the acquire timeout."""
+
+
+class PoolClosedError(RuntimeError):
+    """Raised when acquiring from a pool that has been closed."""
+
+
+class _PooledConnection:
+    """Book-keeping wrapper around a pooled aiosqlite connection."""
+
+    __slots__ = ("conn", "last_used")
+
+    def __init__(self, conn: aiosqlite.Connection) -> None:
+        self.conn = conn
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of aiosqlite connections.
+
+    Args:
+        db_path: Path of the SQLite database file
+        min_size: Connections opened eagerly by ``open()`` and kept warm
+        max_size: Upper bound on simultaneously open connections
+        acquire_timeout: Seconds to wait for a free connection before failing
+        health_check_interval: Connections idle for longer than this are
+            pinged with ``SELECT 1`` before being handed out
+        pragmas: Statements executed once on every new connection
+        read_only: Put every connection in ``query_only`` mode (read lane)
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        min_size: int = 1,
+        max_size: int = 8,
+        acquire_timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+        pragmas: Sequence[str] = DEFAULT_PRAGMAS,
+        read_only: bool = False,
+    ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size bounds: min_size={min_size}, max_size={max_size}"
+            )
+        self.db_path = db_path
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.read_only = read_only
+        self.pragmas = tuple(pragmas) + (READ_ONLY_PRAGMAS if read_only else ())
+
+        self._idle: Deque[_PooledConnection] = deque()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._size = 0  # open + opening connections
+        self._in_use = 0
+        self._closed = False
+
+        # Saturation counters
+        self._acquires = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._health_check_failures = 0
+        self._peak_in_use = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def open(self) -> None:
+        """Eagerly open ``min_size`` connections."""
+        while self._size < self.min_size:
+            self._size += 1
+            try:
+                conn = await self._connect()
+            except BaseException:
+                self._size -= 1
+                raise
+            self._idle.append(_PooledConnection(conn))
+
+    async def close(self) -> None:
+        """Close idle connections; in-use connections are closed on release."""
+        self._closed = True
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(PoolClosedError("Connection pool closed"))
+        while self._idle:
+            pooled = self._idle.popleft()
+            self._size -= 1
+            await self._close_quietly(pooled.conn)
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(self.db_path)
+        # Pooled connections may outlive the loop that opened them; never let
+        # their worker threads block interpreter shutdown.
+        conn.daemon = True
+        await conn
+        conn.row_factory = aiosqlite.Row
+        for pragma in self.pragmas:
+            await conn.execute(pragma)
+        return conn
+
+    @staticmethod
+    async def _close_quietly(conn: aiosqlite.Connection) -> None:
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    async def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = await pooled.conn.execute("SELECT 1")
+            await cursor.close()
+            return True
+        except Exception:
+            self._health_check_failures += 1
+            return False
+
+    async def _checkout(self) -> aiosqlite.Connection:
+        if self._closed:
+            raise PoolClosedError("Connection pool closed")
+
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        waited = False
+        while True:
+            while self._idle:
+                pooled = self._idle.pop()
+                if await self._is_healthy(pooled):
+                    self._mark_acquired(started, waited)
+                    return pooled.conn
+                self._size -= 1
+                await self._close_quietly(pooled.conn)
+
+            if self._size < self.max_size:
+                self._size += 1
+                try:
+                    conn = await self._connect()
+                except BaseException:
+                    self._size -= 1
+                    self._wake_next()
+                    raise
+                self._mark_acquired(started, waited)
+                return conn
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timeouts += 1
+                raise PoolTimeoutError(
+                    f"Timed out after {self.acquire_timeout:.2f}s waiting for a database connection"
+                )
+
+            waited = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # Pass a wake-up we already received on to the next waiter
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_next()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _mark_acquired(self, started: float, waited: bool) -> None:
+        self._in_use += 1
+        self._acquires += 1
+        self._peak_in_use = max(self._peak_in_use, self._in_use)
+        if waited:
+            elapsed = time.monotonic() - started
+            self._waits += 1
+            self._wait_time_total += elapsed
+            self._wait_time_max = max(self._wait_time_max, elapsed)
+
+    def _wake_next(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _release(self, conn: aiosqlite.Connection) -> None:
+        self._in_use -= 1
+        reusable = not self._closed
+        if reusable and conn.in_transaction:
+            # Never hand a connection with a dangling transaction to the next borrower
+            try:
+                await conn.rollback()
+            except Exception:
+                reusable = False
+
+        if reusable:
+            self._idle.append(_PooledConnection(conn))
+        else:
+            self._size -= 1
+            await self._close_quietly(conn)
+        self._wake_next()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a connection for the duration of the ``async with`` block."""
+        conn = await self._checkout()
+        try:
+            yield conn
+        finally:
+            await self._release(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool size and saturation counters."""
+        return {
+            "read_only": self.read_only,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": len(self._waiters),
+            "saturation": self._in_use / self.max_size,
+            "peak_in_use": self._peak_in_use,
+            "acquires_total": self._acquires,
+            "waits_total": self._waits,
+            "timeouts_total": self._timeouts,
+            "wait_time_total_seconds": round(self._wait_time_total, 6),
+            "wait_time_max_seconds": round(self._wait_time_max, 6),
+            "health_check_failures_total": self._health_check_failures,
+        }
@@ -1,13 +1,60 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from typing import Literal
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from src.db import close_pools, get_read_pool, get_write_pool, open_pools, pool_stats
+from src.models.active_ride_index import get_active_ride_index
+from src.models.availability_cache import get_availability_cache
+from src.models.nearest_station_cache import get_nearest_station_cache
+from src.models.station_catalog import get_station_catalog
+from src.db_pool import PoolTimeoutError
+from src.metrics import CONTENT_TYPE, PrometheusMiddleware, get_metrics_registry
+from src.sql_profiler import SQLProfilerMiddleware, get_statement_stats
+from src.slow_query_log import get_slow_query_log
 from src.controllers.stations_controller import router as stations_router
 from src.controllers.vehicles_controller import router as vehicles_router
 from src.controllers.users_controller import router as users_router
 from src.controllers.rides_controller import router as ride_router
+from src.repositories.rides_repository import RidesRepository
+from src.repositories.vehicles_repository import VehiclesRepository
+from src.services.hold_sweeper import HoldSweeper
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the read and writer connection lanes once for the whole application lifetime
+    await open_pools()
+    async with get_read_pool().acquire() as db:
+        # Station metadata and the nearest-station index live in memory
+        await get_station_catalog().reload(db)
+        # Serve the first nearest-station and ride requests from warm entries
+        await VehiclesRepository().warm_availability_cache(db)
+        # Who is riding what, for the "already has an active ride" checks
+        await RidesRepository().rebuild_active_ride_index(db)
+    # Release expired vehicle holds in the background
+    sweeper = HoldSweeper(get_write_pool().acquire)
+    sweeper.start()
+    try:
+        yield
+    finally:
+        await sweeper.stop()
+        get_station_catalog().invalidate()
+        get_availability_cache().clear()
+        get_active_ride_index().clear()
+        get_nearest_station_cache().clear()
+        await close_pools()
+        # Write out slow query entries still queued for the log file
+        get_slow_query_log().close()
 
-app = FastAPI(title="Advanced Programming Final Project")
+
+app = FastAPI(title="Advanced Programming Final Project", lifespan=lifespan)
+# Request count, in-flight gauge and latency histograms, served at /metrics
+app.add_middleware(PrometheusMiddleware)
+# Per-request statement counts (X-DB-* headers), N+1 flags and slow statement totals
+app.add_middleware(SQLProfilerMiddleware)
 
 
 # Global exception handler for 404 errors (non-existent routes)
@@ -28,6 +75,18 @@ async def not_found_handler(request: Request, exc: StarletteHTTPException):
     return JSONResponse(status_code=404, content={"detail": exc.detail})
 
 
+# Connection pool exhausted: tell clients to back off instead of reporting a crash
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": "Service Unavailable",
+            "message": "Database is busy, please retry",
+        },
+    )
+
+
 # Global exception handler for unhandled exceptions (500 errors)
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
@@ -54,3 +113,43 @@ def root() -> dict[str, str]:
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/health/db")
+def health_db() -> dict:
+    """Read/writer connection pool sizes and saturation counters."""
+    return pool_stats()
+
+
+@app.get("/health/db/statements")
+def health_db_statements(
+    limit: int = Query(10, ge=1, le=100),
+    order_by: Literal["total_ms", "mean_ms", "max_ms", "calls", "rows"] = "total_ms",
+) -> dict:
+    """
+    Top statement shapes of this worker, recent requests flagged for repeated
+    statements and the slow query log counters with its latest entries.
+    """
+    return {
+        **get_statement_stats().report(limit=limit, order_by=order_by),
+        "slow_queries": get_slow_query_log().stats(),
+    }
+
+
+@app.get("/health/caches")
+def health_caches() -> dict:
+    """Size, hit and miss counters of this worker's in-process caches."""
+    return {
+        "availability": get_availability_cache().stats(),
+        "active_rides": get_active_ride_index().stats(),
+        "nearest": get_nearest_station_cache().stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Request and nearest-station cache metrics of this worker in the Prometheus text format."""
+    return PlainTextResponse(
+        get_metrics_registry().render() + get_nearest_station_cache().render(),
+        media_type=CONTENT_TYPE,
+    )
@@ -0,0 +1,175 @@
+"""
+In-process request metrics exposed in the Prometheus text format.
+
+``PrometheusMiddleware`` is a plain ASGI middleware (no ``BaseHTTPMiddleware``
+task/stream overhead) that records, per method, route template and status code:
+
+- ``http_requests_total``: request count
+- ``http_request_duration_seconds``: latency histogram
+- ``http_requests_in_flight``: requests currently being served (one gauge; the
+  route is only known once routing has happened)
+
+The route label is the matched template (``/stations/{station_id}``), never the
+raw path, so label cardinality stays bounded; requests that match no route are
+labelled ``unmatched``. ``GET /metrics`` renders the registry; no Prometheus
+client library or push gateway is needed. Each worker process keeps its own
+registry, so scrape every worker (or run a single one) to see the whole picture.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Upper bounds (seconds) of the latency buckets; +Inf is implicit
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Series:
+    """Count, latency sum and per-bucket (non-cumulative) counts for one label set."""
+
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self, bucket_count: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        # One slot per bound plus the +Inf overflow slot
+        self.buckets = [0] * (bucket_count + 1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Request counters, latency histograms and the in-flight gauge."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.in_flight = 0
+        self._series: Dict[Tuple[str, str, int], _Series] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(len(self.buckets))
+        series.count += 1
+        series.total += seconds
+        # bisect_left: a duration equal to a bound belongs in that bucket (le)
+        series.buckets[bisect_left(self.buckets, seconds)] += 1
+
+    def reset(self) -> None:
+        self.in_flight = 0
+        self._series.clear()
+
+    def snapshot(self) -> Dict[Tuple[str, str, int], Dict[str, float]]:
+        """Count and latency sum per (method, route, status)."""
+        return {
+            key: {"count": series.count, "sum": series.total}
+            for key, series in self._series.items()
+        }
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        series = sorted(self._series.items())
+        lines = [
+            "# HELP http_requests_total Total HTTP requests by method, route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        labels = {
+            key: f'method="{_escape(key[0])}",route="{_escape(key[1])}",status="{key[2]}"'
+            for key, _ in series
+        }
+        for key, data in series:
+            lines.append(f"http_requests_total{{{labels[key]}}} {data.count}")
+
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds HTTP request latency by method, route and status.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for key, data in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data.buckets):
+                cumulative += count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels[key]},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels[key]},le="+Inf"}} {data.count}'
+            )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels[key]}}} {data.total}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{labels[key]}}} {data.count}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class PrometheusMiddleware:
+    """ASGI middleware feeding a ``MetricsRegistry``; non-HTTP scopes pass straight through."""
+
+    def __init__(self, app, registry: MetricsRegistry | None = None) -> None:
+        self.app = app
+        self.registry = registry or get_metrics_registry()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500  # if the app raises before starting a response
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight -= 1
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+                status,
+                elapsed,
+            )
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _registry
@@ -0,0 +1,136 @@
+"""
+In-process index of open rides by user and by vehicle.
+
+The index is tagged with ``open_rides_version``, a one-row table that triggers
+set to a fresh random value whenever a ride opens, closes or changes hands.
+It answers only while that value still matches, so rides opened or closed by
+other workers, or rolled back, are never missed. Otherwise it is rebuilt from
+the open rides, which the partial ``uq_rides_open_*`` indexes keep cheap to read.
+
+Rides started and ended in this process update the index in place when the
+version read just before the write still matched (write-through), like the
+station availability cache.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+from src.models.ride import Ride
+
+
+class ActiveRideIndex:
+    """
+    Process-wide maps of open rides, user_id -> ride and vehicle_id -> ride.
+    Implemented as a singleton, like StationSpatialIndex. Until ``load`` has
+    been called (and again after a mismatching write) the index is unloaded.
+    Indexed rides are shared between callers and must be treated as read-only.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._setup()
+        return cls._instance
+
+    def _setup(self) -> None:
+        self.version: int | None = None
+        self._by_ride: Dict[str, Ride] = {}
+        self._by_user: Dict[str, Ride] = {}
+        self._by_vehicle: Dict[str, Ride] = {}
+        self.hits = 0
+        self.reloads = 0
+        self.write_through = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    def __len__(self) -> int:
+        return len(self._by_ride)
+
+    def is_current(self, version: int | None) -> bool:
+        """Whether the index matches ``version``; counts a hit when it does."""
+        if self.version is None or self.version != version:
+            return False
+        self.hits += 1
+        return True
+
+    def load(self, version: int, rides: Iterable[Ride]) -> int:
+        """Replace the index with ``rides``, read at ``version``. Returns the ride count."""
+        by_ride = {ride.ride_id: ride for ride in rides}
+        # Swap in complete maps so concurrent readers never see a partial index
+        self._by_ride = by_ride
+        self._by_user = {ride.user_id: ride for ride in by_ride.values()}
+        self._by_vehicle = {ride.vehicle_id: ride for ride in by_ride.values()}
+        self.version = version
+        self.reloads += 1
+        return len(by_ride)
+
+    def invalidate(self) -> None:
+        """Unload the index; the next lookup rebuilds it."""
+        self.version = None
+        self._by_ride, self._by_user, self._by_vehicle = {}, {}, {}
+
+    def clear(self) -> None:
+        """Unload the index and reset the counters."""
+        self._setup()
+
+    def by_user(self, user_id: str) -> Ride | None:
+        return self._by_user.get(user_id)
+
+    def by_vehicle(self, vehicle_id: str) -> Ride | None:
+        return self._by_vehicle.get(vehicle_id)
+
+    def user_ids(self) -> list[str]:
+        return list(self._by_user)
+
+    def opened(self, ride: Ride, before: int | None, after: int | None) -> None:
+        """
+        Write-through hook after ``ride`` was inserted. ``before`` and ``after``
+        are the versions read in the writing transaction just before and just
+        after the insert; None when they could not be read consistently.
+        """
+        if not self._matches(before, after):
+            return
+        self._by_ride[ride.ride_id] = ride
+        self._by_user[ride.user_id] = ride
+        self._by_vehicle[ride.vehicle_id] = ride
+        self.version = after
+        self.write_through += 1
+
+    def closed(self, ride_id: str, before: int | None, after: int | None) -> None:
+        """Write-through hook after the open ride ``ride_id`` was ended."""
+        if not self._matches(before, after):
+            return
+        ride = self._by_ride.pop(ride_id, None)
+        if ride is not None:
+            del self._by_user[ride.user_id]
+            del self._by_vehicle[ride.vehicle_id]
+        self.version = after
+        self.write_through += 1
+
+    def _matches(self, before: int | None, after: int | None) -> bool:
+        if self.version is None:
+            return False
+        if before is None or after is None or self.version != before:
+            # Something else changed the open rides: rebuild on the next lookup
+            self.invalidate()
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.is_loaded,
+            "open_rides": len(self._by_ride),
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "write_through": self.write_through,
+        }
+
+
+def get_active_ride_index() -> ActiveRideIndex:
+    """Get the global active ride index instance."""
+    return ActiveRideIndex()
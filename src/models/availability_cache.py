@@ -0,0 +1,241 @@
+"""
+In-process cache of the available vehicles docked at each station.
+
+An entry is tagged with the station's ``station_stats.vehicles_version``, which
+triggers replace on every change to the station's vehicles. A lookup only hits
+while the version read from SQLite still matches, so changes made by other
+workers, or rolled back, are never served.
+
+Writes in this process update the affected entries in place (write-through):
+when an entry still matched the version read just before the write, the
+written vehicle is moved in or out of it and the entry takes the version read
+just after the write. Otherwise the entry is dropped.
+
+Each entry keeps its rentable vehicles in a heap ordered by
+``rental_order_key``, so the vehicle to rent is found without sorting.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Mapping, Sequence
+
+from src.models.vehicle import Vehicle, VehicleStatus, rental_order_key
+
+# Stations kept at once; the least recently used one is evicted beyond that. 0 disables the cache.
+AVAILABILITY_CACHE_MAX_STATIONS = int(
+    os.getenv("AVAILABILITY_CACHE_MAX_STATIONS", "4096")
+)
+
+
+class StationVehicles:
+    """
+    The available vehicles of one station at one ``vehicles_version``, plus a
+    heap of ``(rental_order_key, vehicle_id)`` over the rentable ones.
+    Removed vehicles stay in the heap until they reach its top.
+    """
+
+    __slots__ = ("version", "_vehicles", "_heap")
+
+    def __init__(self, version: int, vehicles: Sequence[Vehicle]) -> None:
+        self.version = version
+        self._vehicles: Dict[str, Vehicle] = {v.vehicle_id: v for v in vehicles}
+        self._heap: list[tuple[tuple[int, str], str]] = []
+        self._rebuild_heap()
+
+    def __len__(self) -> int:
+        return len(self._vehicles)
+
+    def __contains__(self, vehicle_id: str) -> bool:
+        return vehicle_id in self._vehicles
+
+    def vehicles(self) -> list[Vehicle]:
+        return list(self._vehicles.values())
+
+    def best_rentable(self) -> Vehicle | None:
+        """The rentable vehicle that goes out first, or None. O(log n) amortized."""
+        heap = self._heap
+        while heap:
+            vehicle = self._vehicles.get(heap[0][1])
+            if vehicle is not None and vehicle.can_rent():
+                return vehicle
+            heapq.heappop(heap)
+        return None
+
+    def add(self, vehicle: Vehicle) -> None:
+        self._vehicles[vehicle.vehicle_id] = vehicle
+        if vehicle.can_rent():
+            heapq.heappush(self._heap, (rental_order_key(vehicle), vehicle.vehicle_id))
+            # Bound the removed vehicles still waiting in the heap
+            if len(self._heap) > 2 * len(self._vehicles) + 16:
+                self._rebuild_heap()
+
+    def discard(self, vehicle_id: str) -> None:
+        self._vehicles.pop(vehicle_id, None)
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [
+            (rental_order_key(v), v.vehicle_id)
+            for v in self._vehicles.values()
+            if v.can_rent()
+        ]
+        heapq.heapify(self._heap)
+
+
+class StationAvailabilityCache:
+    """
+    Process-wide LRU of available vehicles per station.
+    Implemented as a singleton, like StationSpatialIndex. Cached vehicles are
+    shared between callers and must be treated as read-only.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._setup(AVAILABILITY_CACHE_MAX_STATIONS)
+        return cls._instance
+
+    def _setup(self, max_stations: int) -> None:
+        self.max_stations = max_stations
+        self._entries: OrderedDict[int, StationVehicles] = OrderedDict()
+        # Which cached station each vehicle sits at, for writes that only know the vehicle
+        self._vehicle_stations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.write_through = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_stations > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, station_id: int) -> bool:
+        return station_id in self._entries
+
+    def lookup(self, station_id: int, version: int | None) -> StationVehicles | None:
+        """
+        Return the entry of ``station_id`` if it is at ``version``, else None.
+        A mismatching entry is dropped.
+        """
+        entry = self._entries.get(station_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.version != version:
+            self.stale += 1
+            self.misses += 1
+            self._drop(station_id)
+            return None
+        self.hits += 1
+        self._entries.move_to_end(station_id)
+        return entry
+
+    def store(
+        self, station_id: int, version: int, vehicles: Sequence[Vehicle]
+    ) -> StationVehicles:
+        """Cache ``vehicles`` as the available vehicles of ``station_id`` at ``version``."""
+        entry = StationVehicles(version, vehicles)
+        if not self.enabled:
+            return entry
+        self._drop(station_id)
+        self._entries[station_id] = entry
+        for vehicle in vehicles:
+            self._vehicle_stations[vehicle.vehicle_id] = station_id
+        while len(self._entries) > self.max_stations:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+        return entry
+
+    def cached_stations(
+        self, station_ids: Iterable[int | None] = (), vehicle_id: str | None = None
+    ) -> set[int]:
+        """
+        The given stations, plus the station caching ``vehicle_id``, that have
+        an entry: the ones a write to that vehicle has to update.
+        """
+        stations = {s for s in station_ids if s is not None and s in self._entries}
+        if vehicle_id is not None and vehicle_id in self._vehicle_stations:
+            stations.add(self._vehicle_stations[vehicle_id])
+        return stations
+
+    def apply(
+        self,
+        vehicle_id: str,
+        vehicle: Vehicle | None,
+        stations: Iterable[int],
+        before: Mapping[int, int],
+        after: Mapping[int, int],
+    ) -> None:
+        """
+        Write-through hook, called after a write to one vehicle.
+        ``vehicle`` is its new state (None when it is no longer available
+        anywhere) and ``stations`` come from ``cached_stations``. ``before``
+        and ``after`` map stations to their version just before and just after
+        the write, read in the writing transaction; a station missing from
+        either is dropped.
+        """
+        for station_id in stations:
+            entry = self._entries.get(station_id)
+            if entry is None:
+                continue
+            if entry.version != before.get(station_id) or station_id not in after:
+                # Changed elsewhere since it was cached: its contents are unknown
+                self._drop(station_id)
+                self.invalidations += 1
+                continue
+            entry.discard(vehicle_id)
+            if self._vehicle_stations.get(vehicle_id) == station_id:
+                del self._vehicle_stations[vehicle_id]
+            if (
+                vehicle is not None
+                and vehicle.station_id == station_id
+                and vehicle.status == VehicleStatus.available
+            ):
+                # A private copy: the caller keeps the instance it passed in
+                entry.add(vehicle.model_copy())
+                self._vehicle_stations[vehicle_id] = station_id
+            entry.version = after[station_id]
+            self.write_through += 1
+
+    def _drop(self, station_id: int) -> None:
+        entry = self._entries.pop(station_id, None)
+        if entry is None:
+            return
+        for vehicle in entry.vehicles():
+            if self._vehicle_stations.get(vehicle.vehicle_id) == station_id:
+                del self._vehicle_stations[vehicle.vehicle_id]
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        self._setup(self.max_stations)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "stations": len(self._entries),
+            "max_stations": self.max_stations,
+            "vehicles": len(self._vehicle_stations),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "write_through": self.write_through,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_availability_cache() -> StationAvailabilityCache:
+    """Get the global station availability cache instance."""
+    return StationAvailabilityCache()
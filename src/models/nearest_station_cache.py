@@ -0,0 +1,221 @@
+"""
+Optional in-process cache of ``/stations/nearest`` responses.
+
+Requests are keyed on their coordinates snapped to a grid of
+``NEAREST_CACHE_GRID_DEGREES``, so clients standing at the same street corner
+share one entry: every point of a grid cell gets the station found for the
+first point asked in that cell, with its distance recomputed for the exact
+point. A hit touches neither SQLite nor the spatial index.
+
+Unlike the availability cache, entries are not validated against SQLite (that
+is the read a hit saves). They live for ``NEAREST_CACHE_TTL_SECONDS``, and a
+write in this process that changes a station's vehicles drops the station's
+entries at once and again after its commit. Changes made by other workers are therefore served for at most
+the TTL; the age of every served entry is recorded as its staleness.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple
+
+from src.models.station import StationWithDistance
+
+# Entry lifetime; 0 (the default) disables the cache
+NEAREST_CACHE_TTL_SECONDS = float(os.getenv("NEAREST_CACHE_TTL_SECONDS", "0"))
+# Grid resolution in degrees; 0.0005 degrees is about 50 m of latitude
+NEAREST_CACHE_GRID_DEGREES = float(os.getenv("NEAREST_CACHE_GRID_DEGREES", "0.0005"))
+# Grid cells kept at once; the least recently used one is evicted beyond that
+NEAREST_CACHE_MAX_ENTRIES = int(os.getenv("NEAREST_CACHE_MAX_ENTRIES", "10000"))
+
+
+class _Entry(NamedTuple):
+    station: StationWithDistance
+    stored_at: float
+
+
+class NearestStationCache:
+    """
+    Process-wide LRU of nearest-station responses per grid cell.
+    Implemented as a singleton, like StationAvailabilityCache. Cached
+    responses are shared between callers and must be treated as read-only.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._setup(
+                NEAREST_CACHE_TTL_SECONDS,
+                NEAREST_CACHE_GRID_DEGREES,
+                NEAREST_CACHE_MAX_ENTRIES,
+            )
+        return cls._instance
+
+    def _setup(self, ttl: float, grid: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.grid = grid
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, int], _Entry] = OrderedDict()
+        # Grid cells answered by each station, and the station of every vehicle
+        # listed in a cached response, for writes that only know the vehicle
+        self._cells: Dict[int, set[tuple[int, int]]] = {}
+        self._vehicle_stations: Dict[str, int] = {}
+        # Bumped by every invalidation; a response computed across one is not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.served_age_total = 0.0
+        self.served_age_max = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.grid > 0 and self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cell(self, lon: float, lat: float) -> tuple[int, int]:
+        return (round(lon / self.grid), round(lat / self.grid))
+
+    def lookup(
+        self, lon: float, lat: float, now: float | None = None
+    ) -> StationWithDistance | None:
+        """The cached response for (lon, lat), with its distance to that exact point."""
+        if not self.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+        key = self.cell(lon, lat)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        age = now - entry.stored_at
+        if age >= self.ttl:
+            self.expired += 1
+            self.misses += 1
+            self._drop(key)
+            return None
+        self.hits += 1
+        self.served_age_total += age
+        self.served_age_max = max(self.served_age_max, age)
+        self._entries.move_to_end(key)
+        station = entry.station
+        return station.model_copy(
+            update={"distance": (station.lon - lon) ** 2 + (station.lat - lat) ** 2}
+        )
+
+    def store(
+        self,
+        lon: float,
+        lat: float,
+        station: StationWithDistance,
+        generation: int,
+        now: float | None = None,
+    ) -> None:
+        """
+        Cache ``station`` as the response for the grid cell of (lon, lat).
+        ``generation`` is ``self.generation`` read before the response was
+        computed; if a station was invalidated since, the response may predate
+        that write and is not stored.
+        """
+        if not self.enabled or generation != self.generation:
+            return
+        key = self.cell(lon, lat)
+        self._drop(key)
+        self._entries[key] = _Entry(station, time.monotonic() if now is None else now)
+        self._cells.setdefault(station.station_id, set()).add(key)
+        for vehicle_id in station.vehicles or ():
+            self._vehicle_stations[vehicle_id] = station.station_id
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_stations(self, station_ids: Iterable[int | None]) -> None:
+        """Drop the responses of stations whose vehicles just changed."""
+        self.generation += 1
+        for station_id in station_ids:
+            for key in list(self._cells.get(station_id, ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def invalidate_vehicle(self, vehicle_id: str) -> None:
+        """Drop the responses of the station listing ``vehicle_id``, if any."""
+        self.invalidate_stations((self._vehicle_stations.get(vehicle_id),))
+
+    def _drop(self, key: tuple[int, int]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        station = entry.station
+        cells = self._cells[station.station_id]
+        cells.discard(key)
+        if cells:
+            return
+        del self._cells[station.station_id]
+        for vehicle_id in station.vehicles or ():
+            if self._vehicle_stations.get(vehicle_id) == station.station_id:
+                del self._vehicle_stations[vehicle_id]
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        self._setup(self.ttl, self.grid, self.max_entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "grid_degrees": self.grid,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "served_age_avg_seconds": (
+                self.served_age_total / self.hits if self.hits else 0.0
+            ),
+            "served_age_max_seconds": self.served_age_max,
+        }
+
+    def render(self) -> str:
+        """The counters in the Prometheus text exposition format, for /metrics."""
+        stats = self.stats()
+        lines = [
+            "# HELP nearest_cache_lookups_total Nearest-station cache lookups by result.",
+            "# TYPE nearest_cache_lookups_total counter",
+            f'nearest_cache_lookups_total{{result="hit"}} {self.hits}',
+            f'nearest_cache_lookups_total{{result="miss"}} {self.misses - self.expired}',
+            f'nearest_cache_lookups_total{{result="expired"}} {self.expired}',
+            "# HELP nearest_cache_hit_ratio Share of nearest-station lookups served from the cache.",
+            "# TYPE nearest_cache_hit_ratio gauge",
+            f"nearest_cache_hit_ratio {stats['hit_ratio']}",
+            "# HELP nearest_cache_entries Grid cells currently cached.",
+            "# TYPE nearest_cache_entries gauge",
+            f"nearest_cache_entries {len(self._entries)}",
+            "# HELP nearest_cache_invalidations_total Responses dropped because their station's vehicles changed.",
+            "# TYPE nearest_cache_invalidations_total counter",
+            f"nearest_cache_invalidations_total {self.invalidations}",
+            "# HELP nearest_cache_served_age_seconds Age of the cached responses served: how stale they may be.",
+            "# TYPE nearest_cache_served_age_seconds summary",
+            f"nearest_cache_served_age_seconds_sum {self.served_age_total}",
+            f"nearest_cache_served_age_seconds_count {self.hits}",
+            "# HELP nearest_cache_served_age_max_seconds Oldest cached response served.",
+            "# TYPE nearest_cache_served_age_max_seconds gauge",
+            f"nearest_cache_served_age_max_seconds {self.served_age_max}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def get_nearest_station_cache() -> NearestStationCache:
+    """Get the global nearest-station response cache instance."""
+    return NearestStationCache()
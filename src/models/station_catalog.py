@@ -0,0 +1,113 @@
+"""
+Immutable in-memory catalog of station metadata.
+
+Station name, coordinates and capacity almost never change, so they are loaded
+once at application startup into column arrays and served from memory; only
+live vehicle state is read from SQLite per request.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterator, NamedTuple, Sequence
+
+import aiosqlite
+
+from src.models.station_index import get_station_index
+
+
+class StationInfo(NamedTuple):
+    station_id: int
+    name: str
+    lat: float
+    lon: float
+    max_capacity: int
+
+
+class _CatalogSnapshot:
+    """One immutable load of the stations table, ordered by station_id."""
+
+    __slots__ = ("ids", "names", "lats", "lons", "capacities", "positions")
+
+    def __init__(self, rows: Sequence[tuple[int, str, float, float, int]]) -> None:
+        self.ids = tuple(row[0] for row in rows)
+        self.names = tuple(row[1] for row in rows)
+        self.lats = array("d", (row[2] for row in rows))
+        self.lons = array("d", (row[3] for row in rows))
+        self.capacities = array("l", (row[4] for row in rows))
+        self.positions: Dict[int, int] = {
+            station_id: i for i, station_id in enumerate(self.ids)
+        }
+
+    def info(self, i: int) -> StationInfo:
+        return StationInfo(
+            self.ids[i], self.names[i], self.lats[i], self.lons[i], self.capacities[i]
+        )
+
+
+class StationCatalog:
+    """
+    Process-wide station metadata catalog.
+    Implemented as a singleton, like StationSpatialIndex. Until ``reload`` has
+    been called the catalog is unloaded and repositories read stations from
+    SQLite as before.
+
+    Anything that writes the ``stations`` table must call ``invalidate`` (reads
+    fall back to SQLite) or ``reload`` afterwards; both keep the spatial index
+    in step with the catalog.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._snapshot = None
+        return cls._instance
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids) if self._snapshot is not None else 0
+
+    async def reload(self, db: aiosqlite.Connection) -> int:
+        """(Re)load the catalog and the spatial index from SQLite. Returns the station count."""
+        cursor = await db.execute(
+            "SELECT station_id, name, lat, lon, max_capacity FROM stations ORDER BY station_id"
+        )
+        rows = [tuple(row) for row in await cursor.fetchall()]
+        await cursor.close()
+        snapshot = _CatalogSnapshot(rows)
+        get_station_index().load(
+            zip(snapshot.ids, snapshot.lons, snapshot.lats),
+        )
+        # Swap in a fully built snapshot so concurrent readers never see a partial one
+        self._snapshot = snapshot
+        return len(snapshot.ids)
+
+    def invalidate(self) -> None:
+        """Station write hook: drop the catalog and the spatial index until the next reload."""
+        self._snapshot = None
+        get_station_index().invalidate()
+
+    def get(self, station_id: int) -> StationInfo | None:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        i = snapshot.positions.get(station_id)
+        return snapshot.info(i) if i is not None else None
+
+    def __iter__(self) -> Iterator[StationInfo]:
+        """Every station, ordered by station_id."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        for i in range(len(snapshot.ids)):
+            yield snapshot.info(i)
+
+
+def get_station_catalog() -> StationCatalog:
+    """Get the global station catalog instance."""
+    return StationCatalog()
@@ -0,0 +1,72 @@
+"""
+In-memory spatial index of station coordinates.
+
+Built once at application startup (and rebuilt whenever stations change) so
+nearest-station lookups never sort the whole ``stations`` table in SQLite.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import aiosqlite
+
+from src.utilis.kd_tree import KDTree
+
+
+class StationSpatialIndex:
+    """
+    Process-wide KD-tree over station (lon, lat) coordinates.
+    Implemented as a singleton, so every repository consults
+    the same index. Until ``rebuild`` has been called the index is unloaded and
+    callers fall back to querying SQLite.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._tree = None
+        return cls._instance
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._tree is not None
+
+    def __len__(self) -> int:
+        return len(self._tree) if self._tree is not None else 0
+
+    async def rebuild(self, db: aiosqlite.Connection) -> int:
+        """(Re)build the index from the stations table. Returns the station count."""
+        cursor = await db.execute("SELECT station_id, lon, lat FROM stations")
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return self.load((row[0], row[1], row[2]) for row in rows)
+
+    def load(self, points: Iterable[tuple[int, float, float]]) -> int:
+        """Build the index from ``(station_id, lon, lat)`` points. Returns the station count."""
+        # Swap in a fully built tree so concurrent readers never see a partial one
+        self._tree = KDTree(points)
+        return len(self._tree)
+
+    def invalidate(self) -> None:
+        """Drop the index; lookups fall back to SQLite until the next rebuild."""
+        self._tree = None
+
+    def nearest(self, lon: float, lat: float) -> tuple[int, float] | None:
+        """Return ``(station_id, squared_distance)`` of the closest station."""
+        if self._tree is None:
+            return None
+        return self._tree.nearest(lon, lat)
+
+    def k_nearest(self, lon: float, lat: float, k: int) -> list[tuple[int, float]]:
+        """Return up to ``k`` ``(station_id, squared_distance)`` pairs, closest first."""
+        if self._tree is None:
+            return []
+        return self._tree.k_nearest(lon, lat, k)
+
+
+def get_station_index() -> StationSpatialIndex:
+    """Get the global station spatial index instance."""
+    return StationSpatialIndex()
@@ -15,6 +15,20 @@ class VehicleStatus(str, Enum):
     available = "available"
     rented = "rented"
     degraded = "degraded"
+    reserved = "reserved"  # held for one user until the hold is used or expires
+
+
+# Which vehicle a rider gets first at a station: scooters, then electric bicycles, then bicycles
+RENTAL_TYPE_PRIORITY = {
+    VehicleType.scooter: 1,
+    VehicleType.electric_bicycle: 2,
+    VehicleType.bicycle: 3,
+}
+
+
+def rental_order_key(vehicle: Vehicle) -> tuple[int, str]:
+    """Sort key putting the vehicle to rent first at a station first."""
+    return RENTAL_TYPE_PRIORITY.get(vehicle.vehicle_type, 4), vehicle.vehicle_id
 
 
 class Vehicle(BaseModel):
@@ -49,6 +63,24 @@ class Vehicle(BaseModel):
         else:
             raise Exception("Vehicle is not available for rent")
 
+    def hold(self):
+        """Holds a rentable vehicle at its station for one user."""
+        if not self.can_rent():
+            raise Exception("Vehicle is not available for rent")
+        self.status = VehicleStatus.reserved
+
+    def release_hold(self):
+        """Makes a held vehicle available again."""
+        if self.status == VehicleStatus.reserved:
+            self.status = VehicleStatus.available
+
+    def rent_held(self):
+        """Rents a vehicle held for the renting user; eligibility was checked by hold()."""
+        if self.status != VehicleStatus.reserved:
+            raise Exception("Vehicle is not held")
+        self.status = VehicleStatus.rented
+        self.station_id = None
+
     def end_active_ride(self):
         """Completes an active ride and updates per-ride counters."""
         self.rides_since_last_treated += 1
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class VehicleHold(BaseModel):
+    """A vehicle held for one user, who can start a ride on it until ``expires_at``."""
+
+    hold_id: str
+    user_id: str
+    vehicle_id: str
+    station_id: int
+    expires_at: datetime
+
+    def is_expired(self, now: datetime) -> bool:
+        return now >= self.expires_at
@@ -1,22 +1,27 @@
+import json
+import sqlite3
+
 import aiosqlite
 from datetime import datetime
+from src.models.active_ride_index import ActiveRideIndex, get_active_ride_index
 from src.models.ride import Ride
-from src.models.lock_manager import LockManager
 
 from src.models.user import User
 
 
-class RidesRepository:
-    async def get_by_id(self, db: aiosqlite.Connection, ride_id: str) -> Ride | None:
-        """Fetches a ride by ID, or None if not found."""
-        cursor = await db.execute("SELECT * FROM rides WHERE ride_id = ?", (ride_id,))
-        row = await cursor.fetchone()
-        await cursor.close()
+class ActiveRideExistsError(ValueError):
+    """The user or the vehicle already has an open ride (uq_rides_open_* index)."""
 
-        if row is None:
-            return None
 
-        # Convert database row to Ride object
+class RidesRepository:
+    """
+    Open-ride checks are answered by the in-process ``ActiveRideIndex`` after
+    one read of ``open_rides_version``; the index is rebuilt from the open
+    rides when another worker (or a rolled-back write) changed them.
+    """
+
+    @staticmethod
+    def _ride_from_row(row) -> Ride:
         return Ride(
             ride_id=row["ride_id"],
             user_id=row["user_id"],
@@ -36,77 +41,66 @@ class RidesRepository:
             is_degraded_report=bool(row["is_degraded_report"]),
         )
 
+    async def _open_rides_version(self, db: aiosqlite.Connection) -> int | None:
+        cursor = await db.execute("SELECT version FROM open_rides_version WHERE id = 1")
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row[0] if row else None
+
+    async def _version_after_write(
+        self, db: aiosqlite.Connection, before: int | None
+    ) -> int | None:
+        """
+        The version to move the index to after a ride write that saw ``before``,
+        or None when the index cannot follow the write and must be rebuilt: it
+        was not at ``before``, or the write ran in autocommit mode, where another
+        worker could commit in between.
+        """
+        if not db.in_transaction or get_active_ride_index().version != before:
+            return None
+        return await self._open_rides_version(db)
+
+    async def rebuild_active_ride_index(self, db: aiosqlite.Connection) -> int:
+        """Load every open ride into the active ride index. Returns how many."""
+        # Read the version first: the rides may be newer (the index then simply
+        # reloads on the next lookup), never older
+        version = await self._open_rides_version(db)
+        cursor = await db.execute("SELECT * FROM rides WHERE end_time IS NULL")
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return get_active_ride_index().load(
+            version, [self._ride_from_row(row) for row in rows]
+        )
+
+    async def _current_index(self, db: aiosqlite.Connection) -> ActiveRideIndex:
+        index = get_active_ride_index()
+        if not index.is_current(await self._open_rides_version(db)):
+            await self.rebuild_active_ride_index(db)
+        return index
+
+    async def get_by_id(self, db: aiosqlite.Connection, ride_id: str) -> Ride | None:
+        """Fetches a ride by ID, or None if not found."""
+        cursor = await db.execute("SELECT * FROM rides WHERE ride_id = ?", (ride_id,))
+        row = await cursor.fetchone()
+        await cursor.close()
+
+        return self._ride_from_row(row) if row is not None else None
+
     async def get_active_ride_by_user(
         self, db: aiosqlite.Connection, user_id: str
     ) -> Ride | None:
         """
         Fetches the active ride for a user as a Ride object, or None if no active ride exists.
-        Uses locking to prevent race conditions when checking for active rides.
+        This is only a fast pre-check: the uq_rides_open_user index is what stops a
+        second open ride, even when it is inserted by another worker process.
         """
-        lock_manager = LockManager()
-
-        async with lock_manager.user_lock(user_id):
-            cursor = await db.execute(
-                "SELECT * FROM rides WHERE user_id = ? AND end_time IS NULL", (user_id,)
-            )
-            row = await cursor.fetchone()
-            await cursor.close()
-
-            if row is None:
-                return None
-
-            # Convert database row to Ride object
-            return Ride(
-                ride_id=row["ride_id"],
-                user_id=row["user_id"],
-                vehicle_id=row["vehicle_id"],
-                start_station_id=row["start_station_id"],
-                end_station_id=row["end_station_id"],
-                start_time=(
-                    datetime.fromisoformat(row["start_time"])
-                    if isinstance(row["start_time"], str)
-                    else row["start_time"]
-                ),
-                end_time=(
-                    datetime.fromisoformat(row["end_time"])
-                    if (row["end_time"] and isinstance(row["end_time"], str))
-                    else row["end_time"]
-                ),
-                is_degraded_report=bool(row["is_degraded_report"]),
-            )
+        return (await self._current_index(db)).by_user(user_id)
 
     async def get_active_ride_by_vehicle(
         self, db: aiosqlite.Connection, vehicle_id: str
     ) -> Ride | None:
         """Fetches the active ride for a vehicle, or None if no active ride exists."""
-        cursor = await db.execute(
-            "SELECT * FROM rides WHERE vehicle_id = ? AND end_time IS NULL",
-            (vehicle_id,),
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
-
-        if row is None:
-            return None
-
-        return Ride(
-            ride_id=row["ride_id"],
-            user_id=row["user_id"],
-            vehicle_id=row["vehicle_id"],
-            start_station_id=row["start_station_id"],
-            end_station_id=row["end_station_id"],
-            start_time=(
-                datetime.fromisoformat(row["start_time"])
-                if isinstance(row["start_time"], str)
-                else row["start_time"]
-            ),
-            end_time=(
-                datetime.fromisoformat(row["end_time"])
-                if (row["end_time"] and isinstance(row["end_time"], str))
-                else row["end_time"]
-            ),
-            is_degraded_report=bool(row["is_degraded_report"]),
-        )
+        return (await self._current_index(db)).by_vehicle(vehicle_id)
 
     async def create_active_ride(
         self,
@@ -119,33 +113,49 @@ class RidesRepository:
     ):
         """
         Inserts a new active ride into the database.
-        Uses locking to ensure the user doesn't create multiple simultaneous rides.
+        The partial unique indexes on open rides reject a second open ride for the
+        same user or vehicle atomically, across every process sharing the database.
+
+        Raises:
+            ActiveRideExistsError: the user or the vehicle already has an open ride
         """
-        lock_manager = LockManager()
+        if start_time is None:
+            start_time = datetime.now()
 
-        async with lock_manager.user_lock(user_id):
-            # Double-check no active ride exists
+        try:
+            # RETURNING is evaluated before the AFTER triggers: the version the
+            # write started from, without a separate read
             cursor = await db.execute(
-                "SELECT ride_id FROM rides WHERE user_id = ? AND end_time IS NULL",
-                (user_id,),
-            )
-            existing = await cursor.fetchone()
-            await cursor.close()
-
-            if existing:
-                raise ValueError(f"User {user_id} already has an active ride")
-
-            if start_time is None:
-                start_time = datetime.now()
-
-            await db.execute(
                 """
                 INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, is_degraded_report, start_time)
                 VALUES (?, ?, ?, ?, FALSE, ?)
+                RETURNING (SELECT version FROM open_rides_version WHERE id = 1)
                 """,
                 (ride_id, user_id, vehicle_id, start_station_id, start_time),
             )
-            await db.commit()
+        except sqlite3.IntegrityError as e:
+            if "rides.user_id" in str(e):
+                raise ActiveRideExistsError(
+                    f"User {user_id} already has an active ride"
+                ) from e
+            if "rides.vehicle_id" in str(e):
+                raise ActiveRideExistsError(
+                    f"Vehicle {vehicle_id} already has an active ride"
+                ) from e
+            raise
+        (before,) = await cursor.fetchone()
+        await cursor.close()
+        get_active_ride_index().opened(
+            Ride(
+                ride_id=ride_id,
+                user_id=user_id,
+                vehicle_id=vehicle_id,
+                start_station_id=start_station_id,
+                start_time=start_time,
+            ),
+            before,
+            await self._version_after_write(db, before),
+        )
 
     async def complete_ride(
         self,
@@ -161,22 +171,34 @@ class RidesRepository:
             UPDATE rides
             SET end_station_id = ?, end_time = ?, is_degraded_report = ?
             WHERE ride_id = ? AND end_time IS NULL
+            RETURNING (SELECT version FROM open_rides_version WHERE id = 1)
             """,
             (end_station_id, end_time, int(is_degraded_report), ride_id),
         )
-        await db.commit()
-        affected = cursor.rowcount
+        row = await cursor.fetchone()
         await cursor.close()
-        return affected > 0
+        if row is None:
+            return False
+        before = row[0]
+        get_active_ride_index().closed(
+            ride_id, before, await self._version_after_write(db, before)
+        )
+        return True
 
     async def get_active_users(self, db: aiosqlite.Connection) -> list[User]:
         """Returns the list of active User objects for currently active rides."""
-        cursor = await db.execute("""
-            SELECT DISTINCT u.user_id, u.first_name, u.last_name, u.email, u.payment_token
-            FROM users u
-            JOIN rides r ON u.user_id = r.user_id
-            WHERE r.start_time IS NOT NULL AND r.end_time IS NULL
-            """)
+        user_ids = (await self._current_index(db)).user_ids()
+        if not user_ids:
+            return []
+        # One bound parameter however many riders there are
+        cursor = await db.execute(
+            """
+            SELECT user_id, first_name, last_name, email, payment_token
+            FROM users
+            WHERE user_id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(user_ids),),
+        )
         rows = await cursor.fetchall()
         await cursor.close()
         return [User(**dict(row)) for row in rows]
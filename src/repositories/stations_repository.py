@@ -1,35 +1,82 @@
 from __future__ import annotations
 
+import json
+import time
+import uuid
+
 import aiosqlite
 from src.models.station import Station, StationWithDistance
-from src.models.lock_manager import LockManager
+from src.models.station_catalog import StationCatalog, get_station_catalog
+from src.models.station_index import get_station_index
+
+# Half-width, in degrees, of the first R*Tree search window (~500m) and how
+# fast it grows while too few stations have been found
+RTREE_INITIAL_HALF_WIDTH = 0.005
+RTREE_GROWTH = 4
+# A window this wide covers every valid (lat, lon)
+RTREE_MAX_HALF_WIDTH = 360.0
+
+# How long a dock stays held for a vehicle that has not docked yet
+DOCK_RESERVATION_TTL_SECONDS = 60.0
+
+# Station columns plus the docked vehicle ids as a JSON array, so a station and
+# its vehicles come back in one round trip (``s`` must alias ``stations``)
+STATION_WITH_VEHICLES_COLUMNS = """
+    s.station_id,
+    s.name,
+    s.lat,
+    s.lon,
+    s.max_capacity,
+    (
+        SELECT json_group_array(v.vehicle_id)
+        FROM vehicles v
+        WHERE v.station_id = s.station_id
+    ) AS vehicles
+"""
+
+# Docked vehicle ids of one station, for when its metadata comes from the catalog
+STATION_VEHICLES_SQL = """
+    SELECT json_group_array(v.vehicle_id)
+    FROM vehicles v
+    WHERE v.station_id = ?
+"""
+
+
+def _loaded_catalog() -> StationCatalog | None:
+    catalog = get_station_catalog()
+    return catalog if catalog.is_loaded else None
 
 
 class StationsRepository:
-    async def _fetch_vehicles_for_station(
-        self, db: aiosqlite.Connection, station_id: int
-    ) -> list[str]:
-        """Fetch all vehicle IDs docked at a specific station."""
-        cursor = await db.execute(
-            """
-            SELECT vehicle_id
-            FROM vehicles
-            WHERE station_id = ?
-            """,
-            (station_id,),
-        )
-        rows = await cursor.fetchall()
-        await cursor.close()
-        return [row[0] for row in rows]
+    """
+    Station reads take name, coordinates and capacity from the in-memory
+    ``StationCatalog`` when it is loaded and only read live vehicle state from
+    SQLite. A station missing from the catalog (written since the last reload)
+    is read from SQLite like before the catalog existed.
+    """
+
+    @staticmethod
+    def _station_from_row(row) -> Station:
+        station_dict = dict(row)
+        station_dict["vehicles"] = json.loads(station_dict["vehicles"])
+        return Station(**station_dict)
 
     async def get_by_id(
         self, db: aiosqlite.Connection, station_id: int
     ) -> Station | None:
+        catalog = _loaded_catalog()
+        info = catalog.get(station_id) if catalog is not None else None
+        if info is not None:
+            cursor = await db.execute(STATION_VEHICLES_SQL, (station_id,))
+            row = await cursor.fetchone()
+            await cursor.close()
+            return Station(**info._asdict(), vehicles=json.loads(row[0]))
+
         cursor = await db.execute(
-            """
-            SELECT station_id, name, lat, lon, max_capacity
-            FROM stations
-            WHERE station_id = ?
+            f"""
+            SELECT {STATION_WITH_VEHICLES_COLUMNS}
+            FROM stations s
+            WHERE s.station_id = ?
             """,
             (station_id,),
         )
@@ -37,71 +84,233 @@ class StationsRepository:
         await cursor.close()
         if not row:
             return None
-
-        station_dict = dict(row)
-        # Fetch vehicles docked at this station
-        vehicles = await self._fetch_vehicles_for_station(db, station_id)
-        station_dict["vehicles"] = vehicles
-        return Station(**station_dict)
+        return self._station_from_row(row)
 
     async def get_nearest(
         self, db: aiosqlite.Connection, lon: float, lat: float
     ) -> StationWithDistance | None:
+        nearest = await self.nearest_station_ids(db, lon, lat, 1)
+        if not nearest:
+            return None
+        station_id, distance = nearest[0]
+        station = await self.get_by_id(db, station_id)
+        if station is None:
+            # The in-memory index is stale (station removed); ask SQLite directly
+            nearest = await self._rtree_k_nearest(db, lon, lat, 1)
+            if not nearest:
+                return None
+            station_id, distance = nearest[0]
+            station = await self.get_by_id(db, station_id)
+            if station is None:
+                return None
+        return StationWithDistance(**station.model_dump(), distance=distance)
+
+    async def nearest_station_ids(
+        self, db: aiosqlite.Connection, lon: float, lat: float, k: int
+    ) -> list[tuple[int, float]]:
+        """
+        Return up to ``k`` ``(station_id, squared_distance)`` pairs, closest first.
+        Served from the in-memory index when it is loaded, otherwise from the R*Tree.
+        """
+        index = get_station_index()
+        if index.is_loaded:
+            return index.k_nearest(lon, lat, k)
+        return await self._rtree_k_nearest(db, lon, lat, k)
+
+    async def get_within_radius(
+        self, db: aiosqlite.Connection, lon: float, lat: float, radius: float
+    ) -> list[tuple[int, float]]:
+        """
+        Return ``(station_id, squared_distance)`` for every station within ``radius``
+        (in degrees) of the point, closest first.
+        """
+        candidates = await self._rtree_candidates(db, lon, lat, radius)
+        max_distance = radius * radius
+        return [(sid, dist) for sid, dist in candidates if dist <= max_distance]
+
+    async def _rtree_candidates(
+        self, db: aiosqlite.Connection, lon: float, lat: float, half_width: float
+    ) -> list[tuple[int, float]]:
+        """Stations inside the square of ``half_width`` around the point, closest first."""
         cursor = await db.execute(
             """
             SELECT
-                station_id,
-                name,
+                s.station_id,
+                ((s.lat - ?) * (s.lat - ?) + (s.lon - ?) * (s.lon - ?)) AS distance
+            FROM stations_rtree r
+            JOIN stations s ON s.station_id = r.station_id
+            WHERE r.max_lat >= ? AND r.min_lat <= ?
+              AND r.max_lon >= ? AND r.min_lon <= ?
+            ORDER BY distance ASC, s.station_id ASC
+            """,
+            (
+                lat,
                 lat,
                 lon,
-                max_capacity,
-                ((lat - ?) * (lat - ?) + (lon - ?) * (lon - ?)) AS distance
-            FROM stations
-            ORDER BY distance ASC
-            LIMIT 1
-            """,
-            (lat, lat, lon, lon),
+                lon,
+                lat - half_width,
+                lat + half_width,
+                lon - half_width,
+                lon + half_width,
+            ),
         )
-        row = await cursor.fetchone()
+        rows = await cursor.fetchall()
         await cursor.close()
-        if not row:
-            return None
+        return [(row[0], row[1]) for row in rows]
+
+    async def _rtree_k_nearest(
+        self, db: aiosqlite.Connection, lon: float, lat: float, k: int
+    ) -> list[tuple[int, float]]:
+        """
+        k-nearest search over the R*Tree by growing a square window around the point.
 
-        row_dict = dict(row)
-        station_id = row_dict["station_id"]
-        # Fetch vehicles docked at this station
-        vehicles = await self._fetch_vehicles_for_station(db, station_id)
-        row_dict["vehicles"] = vehicles
-        return StationWithDistance(**row_dict)
+        A candidate is final once its distance is within the window's inscribed
+        circle, because nothing outside the window can be closer than that.
+        """
+        if k <= 0:
+            return []
+        half_width = RTREE_INITIAL_HALF_WIDTH
+        while True:
+            candidates = await self._rtree_candidates(db, lon, lat, half_width)
+            settled = half_width * half_width
+            if len(candidates) >= k and candidates[k - 1][1] <= settled:
+                return candidates[:k]
+            if half_width >= RTREE_MAX_HALF_WIDTH:
+                # The window covers every valid coordinate: nothing left to find
+                return candidates[:k]
+            half_width *= RTREE_GROWTH
 
     async def get_stations_with_available_vehicles(
         self, db: aiosqlite.Connection
     ) -> list[Station]:
-        # The JOIN ensures we only get stations that have at least one 'available' vehicle
-        query = """
-            SELECT DISTINCT s.station_id, s.name, s.lat, s.lon, s.max_capacity
-            FROM stations s
-            JOIN vehicles v ON s.station_id = v.station_id
-            WHERE v.status = 'available'
-        """
-        db.row_factory = aiosqlite.Row
-        async with db.execute(query) as cursor:
+        # station_stats counts available vehicles per station, so no aggregation over vehicles
+        catalog = _loaded_catalog()
+        if catalog is not None:
+            cursor = await db.execute(
+                """
+                SELECT
+                    st.station_id,
+                    (
+                        SELECT json_group_array(v.vehicle_id)
+                        FROM vehicles v
+                        WHERE v.station_id = st.station_id
+                    ) AS vehicles
+                FROM station_stats st
+                WHERE st.available_count > 0
+                """
+            )
             rows = await cursor.fetchall()
-            stations = []
-            for row in rows:
-                station_dict = dict(row)
-                station_id = station_dict["station_id"]
-                # Fetch all vehicles docked at this station
-                vehicles = await self._fetch_vehicles_for_station(db, station_id)
-                station_dict["vehicles"] = vehicles
-                stations.append(Station(**station_dict))
-            return stations
+            await cursor.close()
+            infos = [catalog.get(row[0]) for row in rows]
+            if all(info is not None for info in infos):
+                return [
+                    Station(**info._asdict(), vehicles=json.loads(row[1]))
+                    for info, row in zip(infos, rows)
+                ]
+
+        cursor = await db.execute(
+            f"""
+            SELECT {STATION_WITH_VEHICLES_COLUMNS}
+            FROM station_stats st
+            JOIN stations s ON s.station_id = st.station_id
+            WHERE st.available_count > 0
+            """
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return [self._station_from_row(row) for row in rows]
+
+    async def filter_stations_with_available_vehicles(
+        self, db: aiosqlite.Connection, station_ids: list[int]
+    ) -> set[int]:
+        """Return the subset of station_ids that have at least one 'available' vehicle."""
+        if not station_ids:
+            return set()
+        placeholders = ",".join("?" for _ in station_ids)
+        cursor = await db.execute(
+            f"""
+            SELECT station_id
+            FROM station_stats
+            WHERE available_count > 0 AND station_id IN ({placeholders})
+            """,
+            tuple(station_ids),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return {row[0] for row in rows}
+
+    async def get_free_dock_capacities(
+        self, db: aiosqlite.Connection, station_ids: list[int]
+    ) -> dict[int, dict]:
+        """
+        Return the capacity rows, keyed by station_id, of the given stations that
+        still have a free dock (same fields as ``list_with_capacity``). Docks held
+        by a dock reservation are not free.
+        """
+        if not station_ids:
+            return {}
+        placeholders = ",".join("?" for _ in station_ids)
+        catalog = _loaded_catalog()
+        if catalog is not None:
+            infos = [catalog.get(station_id) for station_id in sorted(set(station_ids))]
+            if all(info is not None for info in infos):
+                cursor = await db.execute(
+                    f"""
+                    SELECT station_id, docked_count, reserved_count
+                    FROM station_stats
+                    WHERE station_id IN ({placeholders})
+                    """,
+                    tuple(station_ids),
+                )
+                counts = {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+                await cursor.close()
+                free = {}
+                for info in infos:
+                    docked, reserved = counts.get(info.station_id, (0, 0))
+                    if docked + reserved < info.max_capacity:
+                        free[info.station_id] = {
+                            **info._asdict(),
+                            "current_capacity": docked,
+                        }
+                return free
+
+        cursor = await db.execute(
+            f"""
+            SELECT
+                s.station_id,
+                s.name,
+                s.lat,
+                s.lon,
+                s.max_capacity,
+                COALESCE(st.docked_count, 0) as current_capacity
+            FROM stations s
+            LEFT JOIN station_stats st ON st.station_id = s.station_id
+            WHERE s.station_id IN ({placeholders})
+              AND COALESCE(st.docked_count + st.reserved_count, 0) < s.max_capacity
+            """,
+            tuple(station_ids),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return {row["station_id"]: dict(row) for row in rows}
 
     async def list_with_capacity(self, db: aiosqlite.Connection) -> list[dict]:
         """
         List all stations with their current capacity.
         Returns: list of dicts with station_id, name, lat, lon, max_capacity, current_capacity
         """
+        catalog = _loaded_catalog()
+        if catalog is not None:
+            cursor = await db.execute(
+                "SELECT station_id, docked_count FROM station_stats"
+            )
+            docked = {row[0]: row[1] for row in await cursor.fetchall()}
+            await cursor.close()
+            return [
+                {**info._asdict(), "current_capacity": docked.get(info.station_id, 0)}
+                for info in catalog
+            ]
+
         query = """
             SELECT
                 s.station_id,
@@ -109,10 +318,9 @@ class StationsRepository:
                 s.lat,
                 s.lon,
                 s.max_capacity,
-                COALESCE(COUNT(v.vehicle_id), 0) as current_capacity
+                COALESCE(st.docked_count, 0) as current_capacity
             FROM stations s
-            LEFT JOIN vehicles v ON s.station_id = v.station_id
-            GROUP BY s.station_id
+            LEFT JOIN station_stats st ON st.station_id = s.station_id
         """
         cursor = await db.execute(query)
         rows = await cursor.fetchall()
@@ -120,36 +328,65 @@ class StationsRepository:
         return [dict(row) for row in rows]
 
     async def check_and_reserve_capacity(
-        self, db: aiosqlite.Connection, station_id: int
-    ) -> bool:
+        self,
+        db: aiosqlite.Connection,
+        station_id: int,
+        vehicle_id: str,
+        ttl_seconds: float = DOCK_RESERVATION_TTL_SECONDS,
+        now: float | None = None,
+    ) -> str | None:
         """
-        Atomically check if a station has capacity and reserve a spot.
-        Uses locking to prevent race conditions when multiple vehicles try to dock simultaneously.
+        Hold a free dock at a station for a vehicle until it docks or the TTL runs out.
 
-        Returns: True if capacity is available and reserved, False otherwise
-        """
-        lock_manager = LockManager()
+        The capacity check and the hold are one conditional INSERT against the
+        station_stats counters, so no lock is needed, in this process or any other.
+        Held docks count against capacity until ``dock_vehicle`` consumes them (in
+        the same transaction as the dock) or they expire. A vehicle holds at most
+        one dock; reserving again replaces its previous hold.
 
-        async with lock_manager.station_lock(station_id):
-            # Get station info and current capacity
-            cursor = await db.execute(
-                """
-                SELECT s.max_capacity, COALESCE(COUNT(v.vehicle_id), 0) as current_capacity
-                FROM stations s
-                LEFT JOIN vehicles v ON s.station_id = v.station_id
-                WHERE s.station_id = ?
-                GROUP BY s.station_id
-                """,
-                (station_id,),
-            )
-            row = await cursor.fetchone()
-            await cursor.close()
+        Returns: the reservation id, or None if the station is full or unknown
+        """
+        now = time.time() if now is None else now
+        await self.purge_expired_dock_reservations(db, now)
+        await db.execute(
+            "DELETE FROM dock_reservations WHERE vehicle_id = ?", (vehicle_id,)
+        )
 
-            if not row:
-                return False
+        reservation_id = str(uuid.uuid4())
+        cursor = await db.execute(
+            """
+            INSERT INTO dock_reservations (reservation_id, station_id, vehicle_id, expires_at)
+            SELECT ?, s.station_id, ?, ?
+            FROM stations s
+            JOIN station_stats st ON st.station_id = s.station_id
+            WHERE s.station_id = ?
+              AND st.docked_count + st.reserved_count < s.max_capacity
+            """,
+            (reservation_id, vehicle_id, now + ttl_seconds, station_id),
+        )
+        reserved = cursor.rowcount == 1
+        await cursor.close()
+        return reservation_id if reserved else None
 
-            max_capacity = row["max_capacity"]
-            current_capacity = row["current_capacity"]
+    async def release_dock_reservation(
+        self, db: aiosqlite.Connection, reservation_id: str
+    ) -> bool:
+        """Give a held dock back before it expires. Returns False if it was already gone."""
+        cursor = await db.execute(
+            "DELETE FROM dock_reservations WHERE reservation_id = ?", (reservation_id,)
+        )
+        released = cursor.rowcount > 0
+        await cursor.close()
+        return released
 
-            # Check if there's space
-            return current_capacity < max_capacity
+    async def purge_expired_dock_reservations(
+        self, db: aiosqlite.Connection, now: float | None = None
+    ) -> int:
+        """Delete every expired dock reservation. Returns how many were removed."""
+        now = time.time() if now is None else now
+        cursor = await db.execute(
+            "DELETE FROM dock_reservations WHERE expires_at <= ?", (now,)
+        )
+        purged = cursor.rowcount
+        await cursor.close()
+        return purged
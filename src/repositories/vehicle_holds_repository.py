@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import aiosqlite
+
+from src.models.nearest_station_cache import get_nearest_station_cache
+from src.models.vehicle_hold import VehicleHold
+from src.unit_of_work import after_commit
+
+
+class VehicleHoldsRepository:
+    """
+    Vehicle holds live in ``vehicle_holds``; ``expires_at`` is stored as a Unix
+    timestamp so expiry is a plain indexed range scan. The held vehicle itself is
+    moved to status 'reserved' through ``VehiclesRepository``, and the
+    ``trg_vehicle_holds_consume`` trigger deletes the hold whenever the vehicle
+    leaves that status.
+    """
+
+    @staticmethod
+    def _to_hold(row: aiosqlite.Row) -> VehicleHold:
+        hold = dict(row)
+        hold["expires_at"] = datetime.fromtimestamp(hold["expires_at"], timezone.utc)
+        return VehicleHold(**hold)
+
+    async def _get_one(
+        self, db: aiosqlite.Connection, column: str, value: str
+    ) -> VehicleHold | None:
+        cursor = await db.execute(
+            f"""
+            SELECT hold_id, user_id, vehicle_id, station_id, expires_at
+            FROM vehicle_holds
+            WHERE {column} = ?
+            """,
+            (value,),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        return self._to_hold(row) if row else None
+
+    async def get_by_id(
+        self, db: aiosqlite.Connection, hold_id: str
+    ) -> VehicleHold | None:
+        return await self._get_one(db, "hold_id", hold_id)
+
+    async def get_by_user(
+        self, db: aiosqlite.Connection, user_id: str
+    ) -> VehicleHold | None:
+        return await self._get_one(db, "user_id", user_id)
+
+    async def create(self, db: aiosqlite.Connection, hold: VehicleHold) -> None:
+        """Insert a hold; the vehicle must already be in status 'reserved'."""
+        await db.execute(
+            """
+            INSERT INTO vehicle_holds (hold_id, user_id, vehicle_id, station_id, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                hold.hold_id,
+                hold.user_id,
+                hold.vehicle_id,
+                hold.station_id,
+                hold.expires_at.timestamp(),
+            ),
+        )
+
+    async def release_expired(
+        self, db: aiosqlite.Connection, now: datetime, limit: int
+    ) -> int:
+        """
+        Make the vehicles of up to ``limit`` expired holds available again, oldest
+        first, in one statement; the trigger deletes their holds.
+
+        Returns: how many holds were released
+        """
+        cursor = await db.execute(
+            """
+            UPDATE vehicles
+            SET status = 'available', version = version + 1
+            WHERE status = 'reserved'
+              AND vehicle_id IN (
+                SELECT vehicle_id FROM vehicle_holds
+                WHERE expires_at <= ?
+                ORDER BY expires_at
+                LIMIT ?
+              )
+            RETURNING station_id
+            """,
+            (now.timestamp(), limit),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        # The released vehicles can be rented again from their stations
+        stations = {row[0] for row in rows}
+        nearest = get_nearest_station_cache()
+        nearest.invalidate_stations(stations)
+        after_commit(db, lambda: nearest.invalidate_stations(stations))
+        return len(rows)
@@ -1,8 +1,29 @@
 from __future__ import annotations
-from src.models.vehicle import Vehicle, VehicleStatus, VehicleFactory
+import sqlite3
+from typing import Callable
+
+from src.models.availability_cache import StationVehicles, get_availability_cache
+from src.models.nearest_station_cache import get_nearest_station_cache
+from src.models.vehicle import (
+    Vehicle,
+    VehicleStatus,
+    VehicleFactory,
+    rental_order_key,
+)
+from src.unit_of_work import after_commit
 
 import aiosqlite
-from src.models.lock_manager import LockManager
+
+# How many times a compare-and-swap update re-reads the vehicle after losing a race
+VEHICLE_CAS_MAX_ATTEMPTS = 3
+
+
+class VersionConflictError(ValueError):
+    """Raised when a vehicle keeps changing underneath a compare-and-swap update."""
+
+
+class StationFullError(ValueError):
+    """Raised when the trg_vehicles_dock_capacity trigger rejects a dock at a full station."""
 
 
 class VehiclesRepository:
@@ -14,6 +35,7 @@ class VehiclesRepository:
             v.status,
             v.rides_since_last_treated,
             v.last_treated_date,
+            v.version,
             CASE
                 WHEN v.vehicle_type = 'electric_bicycle' THEN e.battery
                 WHEN v.vehicle_type = 'scooter' THEN s.battery
@@ -28,6 +50,121 @@ class VehiclesRepository:
     def _to_vehicle(row: aiosqlite.Row) -> Vehicle:
         return VehicleFactory.from_row(dict(row))
 
+    async def _apply_transition(
+        self,
+        db: aiosqlite.Connection,
+        vehicle_id: str,
+        transition: Callable[[Vehicle], None],
+    ) -> Vehicle | None:
+        """
+        Read the vehicle, let ``transition`` mutate it through the domain model, and
+        write it back only if nobody changed it in between (compare-and-swap on
+        ``version``). Works across processes without any in-memory lock.
+
+        Returns: the updated vehicle, or None if it does not exist
+        Raises: VersionConflictError after VEHICLE_CAS_MAX_ATTEMPTS lost races;
+            StationFullError when moving the vehicle to a station with no free dock;
+            whatever ``transition`` raises for an invalid state change
+        """
+        for _ in range(VEHICLE_CAS_MAX_ATTEMPTS):
+            cursor = await db.execute(
+                f"""
+                {self.BASE_SELECT}
+                WHERE v.vehicle_id = ?
+                """,
+                (vehicle_id,),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
+            if not row:
+                return None
+
+            vehicle = self._to_vehicle(row)
+            transition(vehicle)
+
+            cache = get_availability_cache()
+            cached = cache.cached_stations(
+                (row["station_id"], vehicle.station_id), vehicle_id
+            )
+            before = await self._station_versions_before_write(db, cached)
+            try:
+                cursor = await db.execute(
+                    """
+                    UPDATE vehicles
+                    SET station_id = ?,
+                        status = ?,
+                        rides_since_last_treated = ?,
+                        last_treated_date = ?,
+                        version = version + 1
+                    WHERE vehicle_id = ? AND version = ?
+                    RETURNING version
+                    """,
+                    (
+                        vehicle.station_id,
+                        vehicle.status.value,
+                        vehicle.rides_since_last_treated,
+                        (
+                            vehicle.last_treated_date.isoformat()
+                            if vehicle.last_treated_date
+                            else None
+                        ),
+                        vehicle_id,
+                        row["version"],
+                    ),
+                )
+            except sqlite3.IntegrityError as e:
+                if "station_full" in str(e):
+                    raise StationFullError(
+                        f"Station {vehicle.station_id} has no free dock"
+                    ) from e
+                raise
+            swapped = await cursor.fetchone()
+            await cursor.close()
+            if swapped:
+                await self._update_electric_battery(db, vehicle)
+                after = await self._station_versions(db, cached) if before else {}
+                cache.apply(vehicle_id, vehicle, cached, before, after)
+                stations = (row["station_id"], vehicle.station_id)
+                nearest = get_nearest_station_cache()
+                nearest.invalidate_stations(stations)
+                # Again on commit: other connections read the old vehicles until then
+                after_commit(db, lambda: nearest.invalidate_stations(stations))
+                return vehicle
+        raise VersionConflictError(
+            f"Vehicle {vehicle_id} was modified concurrently, please retry"
+        )
+
+    async def _station_versions(
+        self, db: aiosqlite.Connection, station_ids: set[int]
+    ) -> dict[int, int]:
+        """``station_stats.vehicles_version`` of each station, for the availability cache."""
+        if not station_ids:
+            return {}
+        placeholders = ",".join("?" for _ in station_ids)
+        cursor = await db.execute(
+            f"""
+            SELECT station_id, vehicles_version
+            FROM station_stats
+            WHERE station_id IN ({placeholders})
+            """,
+            tuple(station_ids),
+        )
+        versions = {row[0]: row[1] for row in await cursor.fetchall()}
+        await cursor.close()
+        return versions
+
+    async def _station_versions_before_write(
+        self, db: aiosqlite.Connection, station_ids: set[int]
+    ) -> dict[int, int]:
+        """
+        Versions to update the availability cache through a write. Only read
+        inside a transaction: in autocommit mode another worker could commit
+        between this read and the write, and the cached stations are dropped.
+        """
+        if not db.in_transaction:
+            return {}
+        return await self._station_versions(db, station_ids)
+
     async def _update_electric_battery(
         self, db: aiosqlite.Connection, vehicle: Vehicle
     ) -> None:
@@ -63,90 +200,177 @@ class VehiclesRepository:
         Sets: status='available', rides_since_last_treated=0, last_treated_date=today.
         Updates station_id if provided by service layer.
         """
-        vehicle = await self.get_by_id(db, vehicle_id)
-        if not vehicle:
-            return False
-
-        # Service layer determines whether to update station_id
-        if station_id is not None:
-            vehicle.station_id = station_id
 
-        vehicle.treat()
+        def treat(vehicle: Vehicle) -> None:
+            # Service layer determines whether to update station_id
+            if station_id is not None:
+                vehicle.station_id = station_id
+            vehicle.treat()
 
-        cursor = await db.execute(
-            """
-            UPDATE vehicles
-            SET status = ?,
-                rides_since_last_treated = ?,
-                last_treated_date = ?,
-                station_id = ?
-            WHERE vehicle_id = ?
-            """,
-            (
-                vehicle.status.value,
-                vehicle.rides_since_last_treated,
-                (
-                    vehicle.last_treated_date.isoformat()
-                    if vehicle.last_treated_date
-                    else None
-                ),
-                vehicle.station_id,
-                vehicle_id,
-            ),
-        )
-        await self._update_electric_battery(db, vehicle)
-        await db.commit()
-        affected = cursor.rowcount
-        await cursor.close()
-        return affected > 0
+        return await self._apply_transition(db, vehicle_id, treat) is not None
 
     async def mark_vehicle_degraded_and_detach(
         self, db: aiosqlite.Connection, vehicle_id: str
     ) -> bool:
         """Mark a vehicle as degraded and detach it from any station."""
+        cache = get_availability_cache()
+        cached = cache.cached_stations(vehicle_id=vehicle_id)
+        before = await self._station_versions_before_write(db, cached)
         cursor = await db.execute(
             """
             UPDATE vehicles
-            SET status = ?, station_id = NULL
+            SET status = ?, station_id = NULL, version = version + 1
             WHERE vehicle_id = ?
             """,
             (VehicleStatus.degraded.value, vehicle_id),
         )
-        await db.commit()
         affected = cursor.rowcount
         await cursor.close()
+        after = await self._station_versions(db, cached) if before else {}
+        cache.apply(vehicle_id, None, cached, before, after)
+        nearest = get_nearest_station_cache()
+        nearest.invalidate_vehicle(vehicle_id)
+        after_commit(db, lambda: nearest.invalidate_vehicle(vehicle_id))
         return affected > 0
 
     async def mark_vehicle_as_rented(
         self, db: aiosqlite.Connection, vehicle_id: str
     ) -> Vehicle | None:
-        """Rents a vehicle through its domain model and persists the state with locking."""
-        lock_manager = LockManager()
-
-        async with lock_manager.vehicle_lock(vehicle_id):
-            vehicle = await self.get_by_id(db, vehicle_id)
-            if not vehicle:
-                return None
+        """Rents a vehicle through its domain model and persists it with a compare-and-swap."""
 
+        def rent(vehicle: Vehicle) -> None:
             # Check if vehicle is available before renting
             if vehicle.status != VehicleStatus.available:
                 raise ValueError(f"Vehicle {vehicle_id} is not available for rental")
-
             vehicle.rent()
 
-            await db.execute(
-                """
-                UPDATE vehicles
-                SET status = ?, station_id = ?
-                WHERE vehicle_id = ?
-                """,
-                (vehicle.status.value, vehicle.station_id, vehicle_id),
-            )
-            await db.commit()
-            return vehicle
+        return await self._apply_transition(db, vehicle_id, rent)
+
+    async def hold_vehicle(
+        self, db: aiosqlite.Connection, vehicle_id: str
+    ) -> Vehicle | None:
+        """Moves a rentable vehicle to status 'reserved' with a compare-and-swap."""
+
+        def hold(vehicle: Vehicle) -> None:
+            if vehicle.status != VehicleStatus.available:
+                raise ValueError(f"Vehicle {vehicle_id} is not available for rental")
+            vehicle.hold()
+
+        return await self._apply_transition(db, vehicle_id, hold)
+
+    async def rent_held_vehicle(
+        self, db: aiosqlite.Connection, vehicle_id: str
+    ) -> Vehicle | None:
+        """Rents a held vehicle; leaving 'reserved' also deletes its hold (trigger)."""
+
+        def rent_held(vehicle: Vehicle) -> None:
+            if vehicle.status != VehicleStatus.reserved:
+                raise ValueError(f"Vehicle {vehicle_id} is not held")
+            vehicle.rent_held()
+
+        return await self._apply_transition(db, vehicle_id, rent_held)
+
+    async def release_vehicle_hold(
+        self, db: aiosqlite.Connection, vehicle_id: str
+    ) -> Vehicle | None:
+        """Makes a held vehicle available again (no-op for any other status)."""
+        return await self._apply_transition(
+            db, vehicle_id, lambda vehicle: vehicle.release_hold()
+        )
 
     async def get_available_vehicles_by_station(
         self, db: aiosqlite.Connection, station_id: int
+    ) -> list[Vehicle]:
+        """
+        Available vehicles docked at the station, from the availability cache
+        when its entry is still current. The returned vehicles may be shared
+        with the cache and must not be modified.
+        """
+        entry = await self._cached_station_vehicles(db, station_id)
+        if entry is not None:
+            return entry.vehicles()
+        return await self._select_available_vehicles(db, station_id)
+
+    async def get_best_rentable_vehicle(
+        self, db: aiosqlite.Connection, station_id: int
+    ) -> Vehicle | None:
+        """
+        The vehicle a rider at the station gets: one that can be rented, scooters
+        before electric bicycles before bicycles, then the lowest vehicle_id.
+        Served from the station's heap in the availability cache when current.
+        """
+        entry = await self._cached_station_vehicles(db, station_id)
+        if entry is not None:
+            return entry.best_rentable()
+        vehicles = await self._select_available_vehicles(db, station_id)
+        return min(
+            (vehicle for vehicle in vehicles if vehicle.can_rent()),
+            key=rental_order_key,
+            default=None,
+        )
+
+    async def _cached_station_vehicles(
+        self, db: aiosqlite.Connection, station_id: int
+    ) -> StationVehicles | None:
+        """
+        The station's availability cache entry, loaded on a miss. None when the
+        cache is off or the station does not exist.
+        """
+        cache = get_availability_cache()
+        if not cache.enabled:
+            return None
+        # Read the version before the vehicles: an entry may be newer than its
+        # version (and then simply misses later), never older
+        versions = await self._station_versions(db, {station_id})
+        if station_id not in versions:
+            return None
+        entry = cache.lookup(station_id, versions[station_id])
+        if entry is None:
+            vehicles = await self._select_available_vehicles(db, station_id)
+            entry = cache.store(station_id, versions[station_id], vehicles)
+        return entry
+
+    async def warm_availability_cache(self, db: aiosqlite.Connection) -> int:
+        """
+        Fill the availability cache for every station with available vehicles,
+        up to its size limit. Returns the number of stations cached.
+        """
+        cache = get_availability_cache()
+        if not cache.enabled:
+            return 0
+        cursor = await db.execute(
+            """
+            SELECT station_id, vehicles_version
+            FROM station_stats
+            WHERE available_count > 0
+            ORDER BY station_id
+            LIMIT ?
+            """,
+            (cache.max_stations,),
+        )
+        versions = {row[0]: row[1] for row in await cursor.fetchall()}
+        await cursor.close()
+
+        by_station: dict[int, list[Vehicle]] = {
+            station_id: [] for station_id in versions
+        }
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            f"""
+            {self.BASE_SELECT}
+            WHERE v.status = 'available' AND v.station_id IS NOT NULL
+            ORDER BY v.station_id, v.rowid
+            """
+        ) as cursor:
+            async for row in cursor:
+                if row["station_id"] in by_station:
+                    by_station[row["station_id"]].append(self._to_vehicle(row))
+        for station_id, vehicles in by_station.items():
+            cache.store(station_id, versions[station_id], vehicles)
+        return len(by_station)
+
+    async def _select_available_vehicles(
+        self, db: aiosqlite.Connection, station_id: int
     ) -> list[Vehicle]:
         query = f"""
             {self.BASE_SELECT}
@@ -157,47 +381,53 @@ class VehiclesRepository:
             rows = await cursor.fetchall()
             return [self._to_vehicle(row) for row in rows]
 
+    async def filter_stations_with_rentable_vehicles(
+        self, db: aiosqlite.Connection, station_ids: list[int]
+    ) -> set[int]:
+        """
+        Return the subset of station_ids with at least one vehicle that can be rented.
+        The predicate mirrors Vehicle.can_rent / ElectricVehicle.can_rent: available,
+        at most 10 rides since treatment and, for electric vehicles, battery >= 14.
+        """
+        if not station_ids:
+            return set()
+        placeholders = ",".join("?" for _ in station_ids)
+        cursor = await db.execute(
+            f"""
+            SELECT DISTINCT v.station_id
+            FROM vehicles v
+            LEFT JOIN electric_bicycles e ON v.vehicle_id = e.vehicle_id
+            LEFT JOIN scooters s ON v.vehicle_id = s.vehicle_id
+            WHERE v.station_id IN ({placeholders})
+              AND v.status = 'available'
+              AND v.rides_since_last_treated <= 10
+              AND (
+                v.vehicle_type = 'bicycle'
+                OR COALESCE(e.battery, s.battery, 100) >= 14
+              )
+            """,
+            tuple(station_ids),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return {row[0] for row in rows}
+
     async def dock_vehicle(
         self, db: aiosqlite.Connection, vehicle_id: str, station_id: int
     ) -> Vehicle | None:
         """
-        Docks a vehicle at a station after ride completion with locking.
+        Docks a vehicle at a station after ride completion with a compare-and-swap.
         The domain model determines ride counters, battery drain, and final status.
         """
-        lock_manager = LockManager()
-
-        async with lock_manager.vehicle_lock(vehicle_id):
-            vehicle = await self.get_by_id(db, vehicle_id)
-            if not vehicle:
-                raise ValueError(f"Vehicle {vehicle_id} not found")
 
+        def dock(vehicle: Vehicle) -> None:
             if vehicle.status not in [VehicleStatus.rented, VehicleStatus.available]:
                 raise ValueError(
                     f"Vehicle {vehicle_id} cannot be docked in status {vehicle.status}"
                 )
-
             vehicle.return_vehicle(station_id)
 
-            cursor = await db.execute(
-                """
-                UPDATE vehicles
-                SET station_id = ?,
-                    rides_since_last_treated = ?,
-                    status = ?
-                WHERE vehicle_id = ?
-                """,
-                (
-                    vehicle.station_id,
-                    vehicle.rides_since_last_treated,
-                    vehicle.status.value,
-                    vehicle_id,
-                ),
-            )
-            await self._update_electric_battery(db, vehicle)
-            await db.commit()
-            affected = cursor.rowcount
-            await cursor.close()
-
-            if affected > 0:
-                return await self.get_by_id(db, vehicle_id)
-            return None
+        vehicle = await self._apply_transition(db, vehicle_id, dock)
+        if vehicle is None:
+            raise ValueError(f"Vehicle {vehicle_id} not found")
+        return vehicle
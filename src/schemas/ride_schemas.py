@@ -6,6 +6,16 @@ class RideStartRequest(BaseModel):
     user_id: str
     lon: float | None = None
     lat: float | None = None
+    # From POST /vehicles/reserve; skips the nearest-station search
+    hold_id: str | None = None
+
+
+class VehicleReserveRequest(BaseModel):
+    """Hold the best rentable vehicle near a location for a user."""
+
+    user_id: str
+    lon: float
+    lat: float
 
 
 class ActiveUsersResponse(BaseModel):
@@ -0,0 +1,99 @@
+"""
+Background task that releases expired vehicle holds and dock reservations.
+
+Expired holds already stop counting when a user tries to use them, but their
+vehicles stay 'reserved' (and unrentable) until released. The sweeper wakes up
+every ``interval`` seconds and releases them in batches of ``batch_size``, one
+short transaction per batch, so it never holds the writer lane for long. Expired
+dock reservations are purged too, so dock searches stop counting them. Every
+worker process runs its own sweeper; releases are conditional updates, so
+sweepers racing over the same holds are harmless.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime, timezone
+from typing import Callable
+
+import aiosqlite
+
+from src.repositories.stations_repository import StationsRepository
+from src.services.rides_service import RideService
+from src.unit_of_work import UnitOfWork
+
+HOLD_SWEEP_INTERVAL_SECONDS = float(os.getenv("HOLD_SWEEP_INTERVAL_SECONDS", "5.0"))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+class HoldSweeper:
+    """
+    Args:
+        acquire: Returns an async context manager yielding a writer connection
+            (e.g. ``get_write_pool().acquire``)
+        interval: Seconds between sweeps
+        batch_size: Holds released per transaction
+    """
+
+    def __init__(
+        self,
+        acquire: Callable[[], AbstractAsyncContextManager[aiosqlite.Connection]],
+        interval: float = HOLD_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = HOLD_SWEEP_BATCH_SIZE,
+        service: RideService | None = None,
+    ) -> None:
+        self._acquire = acquire
+        self.interval = interval
+        self.batch_size = batch_size
+        self._service = service or RideService()
+        self._stations_repository = StationsRepository()
+        self._task: asyncio.Task | None = None
+
+    async def sweep_once(
+        self, db: aiosqlite.Connection, now: datetime | None = None
+    ) -> int:
+        """Release every hold expired at ``now``, batch by batch. Returns how many."""
+        now = now or datetime.now(timezone.utc)
+        total = 0
+        while True:
+            released = await self._service.release_expired_holds(
+                db, self.batch_size, now
+            )
+            total += released
+            if released < self.batch_size:
+                break
+
+        async with UnitOfWork(db):
+            await self._stations_repository.purge_expired_dock_reservations(
+                db, now.timestamp()
+            )
+        return total
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with self._acquire() as db:
+                    await self.sweep_once(db)
+            except Exception:
+                # A failed sweep (busy database, pool timeout) is retried next tick
+                logger.exception("Expired vehicle hold sweep failed")
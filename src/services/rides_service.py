@@ -1,16 +1,26 @@
 import uuid
 import aiosqlite
 from fastapi import HTTPException
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from src.models.ride import Ride
 from src.models.user import User
-from src.models.vehicle import VehicleStatus, VehicleType
+from src.models.vehicle_hold import VehicleHold
+from src.models.vehicle import VehicleStatus
 from src.services.stations_service import StationsService
-from src.repositories.vehicles_repository import VehiclesRepository
-from src.repositories.rides_repository import RidesRepository
+from src.repositories.vehicles_repository import (
+    StationFullError,
+    VehiclesRepository,
+    VersionConflictError,
+)
+from src.repositories.rides_repository import ActiveRideExistsError, RidesRepository
+from src.repositories.stations_repository import StationsRepository
 from src.repositories.users_repository import UsersRepository
-from src.utilis.distance import calculate_euclidean_distance
+from src.repositories.vehicle_holds_repository import VehicleHoldsRepository
+from src.unit_of_work import UnitOfWork
+
+# How long a vehicle stays held for a user who reserved it
+VEHICLE_HOLD_TTL = timedelta(minutes=2)
 
 
 class RideService:
@@ -18,7 +28,9 @@ class RideService:
         self.vehicles_repo = VehiclesRepository()
         self.rides_repo = RidesRepository()
         self.stations_service = StationsService()
+        self.stations_repo = StationsRepository()
         self.users_repo = UsersRepository()
+        self.holds_repo = VehicleHoldsRepository()
 
     @staticmethod
     def _ensure(condition: bool, status_code: int, detail: str) -> None:
@@ -45,24 +57,10 @@ class RideService:
         )
 
         station_id = nearest_station.station_id
-        available_vehicles = await self.vehicles_repo.get_available_vehicles_by_station(
+        # Scooters first, then electric bicycles, then bicycles, among rentable vehicles
+        picked_vehicle = await self.vehicles_repo.get_best_rentable_vehicle(
             db, station_id
         )
-
-        type_priority = {
-            VehicleType.scooter: 1,
-            VehicleType.electric_bicycle: 2,
-            VehicleType.bicycle: 3,
-        }
-
-        sorted_vehicles = sorted(
-            available_vehicles,
-            key=lambda v: (type_priority.get(v.vehicle_type, 4), v.vehicle_id),
-        )
-
-        picked_vehicle = next(
-            (vehicle for vehicle in sorted_vehicles if vehicle.can_rent()), None
-        )
         self._ensure(
             picked_vehicle is not None,
             409,
@@ -80,48 +78,163 @@ class RideService:
         """Return User objects currently in active rides."""
         return await self.rides_repo.get_active_users(db)
 
-    async def start_new_ride(
+    async def reserve_vehicle(
         self,
         db: aiosqlite.Connection,
         user_id: str,
         lon: float | None = None,
         lat: float | None = None,
-    ) -> Ride:
+    ) -> VehicleHold:
+        """
+        Hold the best rentable vehicle near (lon, lat) for the user for VEHICLE_HOLD_TTL.
+        A user holds at most one vehicle: while their hold is live, reserving again
+        returns it unchanged, so client retries cannot pile up holds.
+        """
         try:
-            user = await self.users_repo.get_by_id(db, user_id)
-            self._ensure(user is not None, 404, f"User {user_id} not found.")
+            async with UnitOfWork(db):
+                user = await self.users_repo.get_by_id(db, user_id)
+                self._ensure(user is not None, 404, f"User {user_id} not found.")
+
+                active_ride = await self.rides_repo.get_active_ride_by_user(db, user_id)
+                self._ensure(
+                    active_ride is None, 409, "User already has an active ride."
+                )
 
-            active_ride = await self.rides_repo.get_active_ride_by_user(db, user_id)
-            self._ensure(active_ride is None, 409, "User already has an active ride.")
+                now = datetime.now(timezone.utc)
+                existing = await self.holds_repo.get_by_user(db, user_id)
+                if existing is not None:
+                    if not existing.is_expired(now):
+                        return existing
+                    # Not swept yet: free the old vehicle before picking again
+                    await self.vehicles_repo.release_vehicle_hold(
+                        db, existing.vehicle_id
+                    )
 
-            picked_vehicle, station_id = await self._pick_vehicle_by_location(
-                db, lon, lat
+                picked_vehicle, station_id = await self._pick_vehicle_by_location(
+                    db, lon, lat
+                )
+                await self.vehicles_repo.hold_vehicle(db, picked_vehicle.vehicle_id)
+
+                hold = VehicleHold(
+                    hold_id=str(uuid.uuid4()),
+                    user_id=user_id,
+                    vehicle_id=picked_vehicle.vehicle_id,
+                    station_id=station_id,
+                    expires_at=now + VEHICLE_HOLD_TTL,
+                )
+                await self.holds_repo.create(db, hold)
+                return hold
+        except HTTPException:
+            raise
+        except VersionConflictError as e:
+            # Another request rented or held the vehicle first
+            raise HTTPException(status_code=409, detail=str(e))
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Could not reserve vehicle: {str(e)}"
             )
 
-            new_ride_id = str(uuid.uuid4())
-            start_time = datetime.now()
+    async def release_expired_holds(
+        self, db: aiosqlite.Connection, limit: int, now: datetime | None = None
+    ) -> int:
+        """Release up to ``limit`` expired holds in one transaction. Returns how many."""
+        async with UnitOfWork(db):
+            return await self.holds_repo.release_expired(
+                db, now or datetime.now(timezone.utc), limit
+            )
 
-            await self.vehicles_repo.mark_vehicle_as_rented(
-                db, picked_vehicle.vehicle_id
+    async def _start_held_ride(
+        self, db: aiosqlite.Connection, user_id: str, hold_id: str
+    ) -> Ride:
+        """
+        Fast path for a user holding a vehicle: a primary-key lookup of the hold,
+        one compare-and-swap on the vehicle and the ride insert. No station search.
+        """
+        async with UnitOfWork(db):
+            hold = await self.holds_repo.get_by_id(db, hold_id)
+            self._ensure(hold is not None, 404, f"Hold {hold_id} not found.")
+            self._ensure(hold.user_id == user_id, 403, "Hold belongs to another user.")
+            self._ensure(
+                not hold.is_expired(datetime.now(timezone.utc)),
+                409,
+                "Hold has expired.",
             )
+
+            # Renting the held vehicle also deletes the hold
+            await self.vehicles_repo.rent_held_vehicle(db, hold.vehicle_id)
+
+            new_ride_id = str(uuid.uuid4())
+            start_time = datetime.now()
             await self.rides_repo.create_active_ride(
                 db,
                 new_ride_id,
                 user_id,
-                picked_vehicle.vehicle_id,
-                station_id,
+                hold.vehicle_id,
+                hold.station_id,
                 start_time,
             )
-
             return Ride(
                 ride_id=new_ride_id,
                 user_id=user_id,
-                vehicle_id=picked_vehicle.vehicle_id,
+                vehicle_id=hold.vehicle_id,
                 start_time=start_time,
-                start_station_id=station_id,
+                start_station_id=hold.station_id,
             )
+
+    async def start_new_ride(
+        self,
+        db: aiosqlite.Connection,
+        user_id: str,
+        lon: float | None = None,
+        lat: float | None = None,
+        hold_id: str | None = None,
+    ) -> Ride:
+        try:
+            if hold_id is not None:
+                return await self._start_held_ride(db, user_id, hold_id)
+
+            # Renting the vehicle and opening the ride commit (or roll back) together
+            async with UnitOfWork(db):
+                user = await self.users_repo.get_by_id(db, user_id)
+                self._ensure(user is not None, 404, f"User {user_id} not found.")
+
+                active_ride = await self.rides_repo.get_active_ride_by_user(db, user_id)
+                self._ensure(
+                    active_ride is None, 409, "User already has an active ride."
+                )
+
+                picked_vehicle, station_id = await self._pick_vehicle_by_location(
+                    db, lon, lat
+                )
+
+                new_ride_id = str(uuid.uuid4())
+                start_time = datetime.now()
+
+                await self.vehicles_repo.mark_vehicle_as_rented(
+                    db, picked_vehicle.vehicle_id
+                )
+                await self.rides_repo.create_active_ride(
+                    db,
+                    new_ride_id,
+                    user_id,
+                    picked_vehicle.vehicle_id,
+                    station_id,
+                    start_time,
+                )
+
+                return Ride(
+                    ride_id=new_ride_id,
+                    user_id=user_id,
+                    vehicle_id=picked_vehicle.vehicle_id,
+                    start_time=start_time,
+                    start_station_id=station_id,
+                )
         except HTTPException:
             raise
+        except (VersionConflictError, ActiveRideExistsError) as e:
+            # Another request (possibly in another worker) rented the vehicle
+            # or opened a ride for this user first
+            raise HTTPException(status_code=409, detail=str(e))
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Could not start ride: {str(e)}"
@@ -137,11 +250,15 @@ class RideService:
         """
         End an active ride with the following flow:
         1. Verify ride exists in active rides
-        2. Find nearest station with available capacity
-        3. Dock the vehicle at that station
+        2. Find nearest station with available capacity and hold a dock there
+        3. Dock the vehicle at that station (consuming the hold)
         4. Increment vehicle's ride counter (sets to degraded if > 10)
         5. Charge the user 15 ILS (0 if degraded report)
         6. Clear user's active ride
+
+        The dock hold is committed on its own, before the ride is closed, so other
+        requests (in any worker) stop counting that dock as free while this one
+        finishes; if closing the ride fails the hold is given back.
         """
 
         # Step 1: Verify ride exists
@@ -150,67 +267,99 @@ class RideService:
             raise HTTPException(
                 status_code=404, detail=f"Ride with ID {ride_id} not found."
             )
-
-        # Step 2: Find nearest station with capacity
-        stations = await self.stations_service.get_stations_with_capacity(db)
-        if not stations:
+        if ride.end_time is not None:
             raise HTTPException(
-                status_code=400, detail="No stations available to dock the vehicle."
+                status_code=409, detail=f"Ride with ID {ride_id} is already ended."
             )
 
-        # Filter only stations with free capacity
-        available_stations = [
-            s for s in stations if s["current_capacity"] < s["max_capacity"]
-        ]
-
-        if not available_stations:
+        # Step 2: Find nearest station with a free dock
+        nearest_station = (
+            await self.stations_service.get_nearest_station_with_free_dock(
+                db, lon=lon, lat=lat
+            )
+        )
+        if nearest_station is None:
             raise HTTPException(
                 status_code=400, detail="No station with free capacity available."
             )
 
-        # Find nearest by euclidean distance
-        nearest_station = min(
-            available_stations,
-            key=lambda s: calculate_euclidean_distance(lat, lon, s["lat"], s["lon"]),
-        )
-
         station_id = nearest_station["station_id"]
-        end_time = datetime.now()
 
-        # Step 3 & 4: Get vehicle and dock it (incrementing rides counter)
-        vehicle = await self.vehicles_repo.get_by_id(db, ride.vehicle_id)
-        if not vehicle:
-            raise HTTPException(
-                status_code=400, detail=f"Vehicle {ride.vehicle_id} not found."
+        # Hold the dock in a short transaction of its own; the hold counts against
+        # capacity until the dock below consumes it or DOCK_RESERVATION_TTL_SECONDS pass
+        async with UnitOfWork(db):
+            reservation_id = await self.stations_repo.check_and_reserve_capacity(
+                db, station_id, ride.vehicle_id
             )
-
-        # Dock the vehicle at the station
-        docked_vehicle = await self.vehicles_repo.dock_vehicle(
-            db, ride.vehicle_id, station_id
-        )
-        if not docked_vehicle:
+        if not reservation_id:
             raise HTTPException(
-                status_code=400, detail=f"Failed to dock vehicle {ride.vehicle_id}."
+                status_code=409,
+                detail=f"Station {station_id} has no free dock, please retry.",
             )
 
-        ride_updated = await self.rides_repo.complete_ride(
-            db,
-            ride_id=ride_id,
-            end_station_id=station_id,
-            end_time=end_time,
-        )
-        if not ride_updated:
-            raise HTTPException(
-                status_code=409, detail=f"Ride with ID {ride_id} is already ended."
+        try:
+            return await self._close_ride_at_station(db, ride, station_id)
+        except Exception:
+            await self._release_dock_hold(db, reservation_id)
+            raise
+
+    async def _release_dock_hold(
+        self, db: aiosqlite.Connection, reservation_id: str
+    ) -> None:
+        try:
+            async with UnitOfWork(db):
+                await self.stations_repo.release_dock_reservation(db, reservation_id)
+        except Exception:
+            # Best effort: the hold expires after DOCK_RESERVATION_TTL_SECONDS anyway
+            pass
+
+    async def _close_ride_at_station(
+        self, db: aiosqlite.Connection, ride: Ride, station_id: int
+    ) -> dict:
+        end_time = datetime.now()
+
+        # Docking the vehicle and closing the ride commit (or roll back) together
+        async with UnitOfWork(db):
+            # Close the ride first: the conditional update lets exactly one
+            # request (in any worker) end it, before the vehicle is touched
+            ride_updated = await self.rides_repo.complete_ride(
+                db,
+                ride_id=ride.ride_id,
+                end_station_id=station_id,
+                end_time=end_time,
             )
+            if not ride_updated:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Ride with ID {ride.ride_id} is already ended.",
+                )
+
+            # Step 3 & 4: Get vehicle and dock it (incrementing rides counter)
+            vehicle = await self.vehicles_repo.get_by_id(db, ride.vehicle_id)
+            if not vehicle:
+                raise HTTPException(
+                    status_code=400, detail=f"Vehicle {ride.vehicle_id} not found."
+                )
+
+            # Dock the vehicle at the station, consuming the hold
+            try:
+                docked_vehicle = await self.vehicles_repo.dock_vehicle(
+                    db, ride.vehicle_id, station_id
+                )
+            except (VersionConflictError, StationFullError) as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            if not docked_vehicle:
+                raise HTTPException(
+                    status_code=400, detail=f"Failed to dock vehicle {ride.vehicle_id}."
+                )
 
-        # Step 5: Calculate and process payment
-        # For now, return a fixed 15 ILS
-        payment_charged = 15
+            # Step 5: Calculate and process payment
+            # For now, return a fixed 15 ILS
+            payment_charged = 15
 
-        # Return response object (only required fields per specification)
-        return {
-            "end_station_id": station_id,
-            "payment_charged": payment_charged,
-            "vehicle": docked_vehicle.model_dump(mode="json"),
-        }
+            # Return response object (only required fields per specification)
+            return {
+                "end_station_id": station_id,
+                "payment_charged": payment_charged,
+                "vehicle": docked_vehicle.model_dump(mode="json"),
+            }
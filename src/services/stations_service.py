@@ -1,11 +1,18 @@
 from __future__ import annotations
-from src.utilis.distance import calculate_euclidean_distance
+
+from typing import AsyncIterator
+
 import aiosqlite
 
 from src.repositories.stations_repository import StationsRepository
 from src.repositories.vehicles_repository import VehiclesRepository
+from src.models.nearest_station_cache import get_nearest_station_cache
 from src.models.station import Station, StationWithDistance
-from src.models.vehicle import VehicleType
+
+# Stations examined in the first ring of a nearest-station search; each further
+# ring examines NEAREST_RING_GROWTH times as many.
+NEAREST_RING_SIZE = 16
+NEAREST_RING_GROWTH = 4
 
 
 class StationsService:
@@ -25,6 +32,12 @@ class StationsService:
     async def get_nearest_station(
         self, db: aiosqlite.Connection, lon: float, lat: float
     ) -> StationWithDistance | None:
+        cache = get_nearest_station_cache()
+        cached = cache.lookup(lon, lat)
+        if cached is not None:
+            return cached
+        generation = cache.generation
+
         station = await self._repository.get_nearest(db, lon=lon, lat=lat)
         if not station:
             return None
@@ -32,46 +45,75 @@ class StationsService:
         if isinstance(station, dict):
             station = StationWithDistance(**station)
 
-        available_vehicles = (
-            await self._vehicles_repository.get_available_vehicles_by_station(
+        # The vehicle a ride started here would get
+        station.nearest_available_vehicle = (
+            await self._vehicles_repository.get_best_rentable_vehicle(
                 db, station.station_id
             )
         )
-        type_priority = {
-            VehicleType.scooter: 1,
-            VehicleType.electric_bicycle: 2,
-            VehicleType.bicycle: 3,
-        }
-
-        if available_vehicles:
-            best_vehicle = sorted(
-                available_vehicles,
-                key=lambda v: (type_priority.get(v.vehicle_type, 4), v.vehicle_id),
-            )[0]
-            station.nearest_available_vehicle = best_vehicle
 
+        cache.store(lon, lat, station, generation)
         return station
 
-    # Add this helper function if you don't have it already
-
     async def get_nearest_station_with_vehicles(
         self, db, lon: float, lat: float
     ) -> Station | None:
-        # 1. Get the raw list from the repository function we just wrote
-        active_stations = await self._repository.get_stations_with_available_vehicles(
-            db
-        )
+        """
+        Return the nearest station holding a vehicle that can actually be rented.
 
-        if not active_stations:
-            return None
+        A station whose vehicles are all drained or due for treatment is skipped
+        instead of failing the ride. Only when no vehicle anywhere can be rented
+        is the nearest station with any available vehicle returned, so callers
+        can still tell "nothing eligible" apart from "nothing available".
+        """
+        for station_filter in (
+            self._vehicles_repository.filter_stations_with_rentable_vehicles,
+            self._repository.filter_stations_with_available_vehicles,
+        ):
+            async for ring in self._nearest_station_rings(db, lon, lat):
+                matching = await station_filter(db, ring)
+                for station_id in ring:
+                    if station_id in matching:
+                        return await self._repository.get_by_id(db, station_id)
+        return None
 
-        # 2. Use Python to find the one with the shortest distance
-        nearest_station = min(
-            active_stations,
-            key=lambda s: calculate_euclidean_distance(lon, lat, s.lon, s.lat),
-        )
+    async def get_nearest_station_with_free_dock(
+        self, db, lon: float, lat: float
+    ) -> dict | None:
+        """
+        Return the capacity row (as from ``get_stations_with_capacity``) of the
+        nearest station that still has a free dock, or None if every station is full.
+        """
+        async for ring in self._nearest_station_rings(db, lon, lat):
+            free = await self._repository.get_free_dock_capacities(db, ring)
+            for station_id in ring:
+                if station_id in free:
+                    return free[station_id]
+        return None
 
-        return nearest_station
+    async def _nearest_station_rings(
+        self, db, lon: float, lat: float
+    ) -> AsyncIterator[list[int]]:
+        """
+        Yield station ids in distance order, in rings of increasing size, so a
+        caller can check a whole ring with one query and stop at the first match.
+        """
+        examined = 0
+        ring = NEAREST_RING_SIZE
+        while True:
+            wanted = examined + ring
+            candidates = await self._repository.nearest_station_ids(
+                db, lon, lat, wanted
+            )
+            batch = [station_id for station_id, _ in candidates[examined:]]
+            if not batch:
+                return
+            yield batch
+            if len(candidates) < wanted:
+                # Every station has been examined
+                return
+            examined = len(candidates)
+            ring *= NEAREST_RING_GROWTH
 
     async def get_stations_with_capacity(self, db: aiosqlite.Connection) -> list[dict]:
         """Return list of stations with their current capacity info."""
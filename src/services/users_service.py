@@ -6,6 +6,7 @@ import aiosqlite
 from src.models.user import User
 from src.repositories.users_repository import UsersRepository
 from src.repositories.rides_repository import RidesRepository
+from src.unit_of_work import UnitOfWork
 
 
 class UsersService:
@@ -42,33 +43,34 @@ class UsersService:
                 - User: The created or existing user model with mocked payment token
                 - is_existing_user: True if user already existed, False if newly created
         """
-        # Check if user already exists
-        existing_user = await self._repository.get_by_id(db, user_id)
-        if existing_user:
-            return existing_user, True
+        async with UnitOfWork(db):
+            # Check if user already exists
+            existing_user = await self._repository.get_by_id(db, user_id)
+            if existing_user:
+                return existing_user, True
 
-        # User does not exist, create new account
-        # Mocked billing token
-        token = uuid.uuid4().hex
+            # User does not exist, create new account
+            # Mocked billing token
+            token = uuid.uuid4().hex
 
-        created = await self._repository.create(
-            db,
-            user_id=user_id,
-            first_name=first_name,
-            last_name=last_name,
-            email=email,
-            payment_token=token,
-        )
-        if not created:
-            raise ValueError(f"Failed to create user with id {user_id}")
-
-        return (
-            User(
+            created = await self._repository.create(
+                db,
                 user_id=user_id,
                 first_name=first_name,
                 last_name=last_name,
                 email=email,
                 payment_token=token,
-            ),
-            False,
-        )
+            )
+            if not created:
+                raise ValueError(f"Failed to create user with id {user_id}")
+
+            return (
+                User(
+                    user_id=user_id,
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    payment_token=token,
+                ),
+                False,
+            )
@@ -6,6 +6,7 @@ from datetime import datetime
 from src.repositories.vehicles_repository import VehiclesRepository
 from src.repositories.rides_repository import RidesRepository
 from src.models.vehicle import Vehicle, VehicleStatus
+from src.unit_of_work import UnitOfWork
 
 
 class VehiclesService:
@@ -26,36 +27,38 @@ class VehiclesService:
         self, db: aiosqlite.Connection, vehicle_id: str
     ) -> Vehicle:
         """Mark vehicle as degraded and auto-complete its active ride (if exists)."""
-        vehicle = await self.get_vehicle_by_id(db, vehicle_id)
-        if not vehicle:
-            raise ValueError(f"Vehicle {vehicle_id} not found")
-
-        if vehicle.status == VehicleStatus.degraded:
-            raise ValueError(f"Vehicle {vehicle_id} is already marked as degraded")
-
-        active_ride = await self._rides_repository.get_active_ride_by_vehicle(
-            db, vehicle_id
-        )
-        if active_ride:
-            ride_updated = await self._rides_repository.complete_ride(
-                db,
-                ride_id=active_ride.ride_id,
-                end_station_id=None,
-                end_time=datetime.now(),
-                is_degraded_report=True,
+        # Closing the ride and detaching the vehicle commit (or roll back) together
+        async with UnitOfWork(db):
+            vehicle = await self.get_vehicle_by_id(db, vehicle_id)
+            if not vehicle:
+                raise ValueError(f"Vehicle {vehicle_id} not found")
+
+            if vehicle.status == VehicleStatus.degraded:
+                raise ValueError(f"Vehicle {vehicle_id} is already marked as degraded")
+
+            active_ride = await self._rides_repository.get_active_ride_by_vehicle(
+                db, vehicle_id
             )
-            if not ride_updated:
-                raise Exception(
-                    f"Failed to auto-complete active ride for vehicle {vehicle_id}"
+            if active_ride:
+                ride_updated = await self._rides_repository.complete_ride(
+                    db,
+                    ride_id=active_ride.ride_id,
+                    end_station_id=None,
+                    end_time=datetime.now(),
+                    is_degraded_report=True,
                 )
+                if not ride_updated:
+                    raise Exception(
+                        f"Failed to auto-complete active ride for vehicle {vehicle_id}"
+                    )
 
-        success = await self._repository.mark_vehicle_degraded_and_detach(
-            db, vehicle_id
-        )
-        if not success:
-            raise Exception(f"Failed to report vehicle {vehicle_id} as degraded")
+            success = await self._repository.mark_vehicle_degraded_and_detach(
+                db, vehicle_id
+            )
+            if not success:
+                raise Exception(f"Failed to report vehicle {vehicle_id} as degraded")
 
-        return await self.get_vehicle_by_id(db, vehicle_id)
+            return await self.get_vehicle_by_id(db, vehicle_id)
 
     async def treat_vehicle(
         self, db: aiosqlite.Connection, vehicle_id: str, station_id: int | None = None
@@ -66,38 +69,39 @@ class VehiclesService:
         - Treatment sets: status='available', rides_since_last_treated=0, last_treated_date=today
         - If vehicle was degraded (no station), assign a station
         """
-        # Get the vehicle
-        vehicle = await self.get_vehicle_by_id(db, vehicle_id)
-        if not vehicle:
-            raise ValueError(f"Vehicle {vehicle_id} not found")
-
-        # Check eligibility for treatment
-        is_degraded = vehicle.status == VehicleStatus.degraded
-        rides_threshold_met = vehicle.rides_since_last_treated >= 7
-
-        if not (is_degraded or rides_threshold_met):
-            raise ValueError(
-                f"Vehicle {vehicle_id} is not eligible for treatment. "
-                f"Status: {vehicle.status}, Rides: {vehicle.rides_since_last_treated}. "
-                f"Must be degraded or have >= 7 rides."
-            )
+        async with UnitOfWork(db):
+            # Get the vehicle
+            vehicle = await self.get_vehicle_by_id(db, vehicle_id)
+            if not vehicle:
+                raise ValueError(f"Vehicle {vehicle_id} not found")
+
+            # Check eligibility for treatment
+            is_degraded = vehicle.status == VehicleStatus.degraded
+            rides_threshold_met = vehicle.rides_since_last_treated >= 7
+
+            if not (is_degraded or rides_threshold_met):
+                raise ValueError(
+                    f"Vehicle {vehicle_id} is not eligible for treatment. "
+                    f"Status: {vehicle.status}, Rides: {vehicle.rides_since_last_treated}. "
+                    f"Must be degraded or have >= 7 rides."
+                )
 
-        # For previously degraded vehicles, a station must be assigned
-        if is_degraded and not vehicle.station_id and not station_id:
-            raise ValueError(
-                f"Vehicle {vehicle_id} was degraded without a station. "
-                f"Must provide a station_id to assign it a location."
-            )
+            # For previously degraded vehicles, a station must be assigned
+            if is_degraded and not vehicle.station_id and not station_id:
+                raise ValueError(
+                    f"Vehicle {vehicle_id} was degraded without a station. "
+                    f"Must provide a station_id to assign it a location."
+                )
 
-        # Use provided station_id or keep existing one
-        treatment_station = station_id if station_id else vehicle.station_id
+            # Use provided station_id or keep existing one
+            treatment_station = station_id if station_id else vehicle.station_id
 
-        # Perform treatment
-        success = await self._repository.treat_vehicle(
-            db, vehicle_id, treatment_station
-        )
-        if not success:
-            raise Exception(f"Failed to treat vehicle {vehicle_id}")
+            # Perform treatment
+            success = await self._repository.treat_vehicle(
+                db, vehicle_id, treatment_station
+            )
+            if not success:
+                raise Exception(f"Failed to treat vehicle {vehicle_id}")
 
-        # Return updated vehicle
-        return await self.get_vehicle_by_id(db, vehicle_id)
+            # Return updated vehicle
+            return await self.get_vehicle_by_id(db, vehicle_id)
@@ -0,0 +1,238 @@
+"""
+Slow query log with ``EXPLAIN QUERY PLAN`` capture.
+
+Statements issued through a connection from ``get_db`` / ``get_read_db`` (see
+``src.sql_profiler``; this works with the per-request profiler turned off too)
+that take at least ``SLOW_QUERY_THRESHOLD_MS`` (execute plus fetches) are
+written as one JSON line to a size-rotated log file, with:
+
+- the SQL text and its normalized shape
+- the shape of the parameters (types only; values may be personal data)
+- the duration and the row count
+- the query plan, re-derived on the same connection with ``EXPLAIN QUERY PLAN``
+- the route being served
+
+Capture is rate-limited twice so a slow database is never made slower by its
+own diagnostics: a token bucket bounds captures per minute overall, and a
+statement shape is captured at most once per cooldown. Suppressed captures are
+only counted. Entries are handed to a ``QueueListener`` thread that owns the
+file, so no disk write happens on the event loop.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Statements at least this slow are captured; 0 turns the log off
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+# Empty path: keep entries in memory only
+SLOW_QUERY_LOG_PATH = os.getenv(
+    "SLOW_QUERY_LOG_PATH", str(PROJECT_ROOT / "data" / "slow_queries.log")
+)
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(1024 * 1024)))
+SLOW_QUERY_LOG_BACKUP_COUNT = int(os.getenv("SLOW_QUERY_LOG_BACKUP_COUNT", "3"))
+SLOW_QUERY_LOG_MAX_PER_MINUTE = int(os.getenv("SLOW_QUERY_LOG_MAX_PER_MINUTE", "10"))
+SLOW_QUERY_LOG_SHAPE_COOLDOWN_SECONDS = float(
+    os.getenv("SLOW_QUERY_LOG_SHAPE_COOLDOWN_SECONDS", "60")
+)
+
+
+def parameter_shape(parameters: Any, many: bool = False) -> Any:
+    """Type names of the bound parameters (``executemany``: of the first row, plus the row count)."""
+    if parameters is None:
+        return []
+    if many:
+        rows = parameters if isinstance(parameters, Sequence) else None
+        first = parameter_shape(rows[0]) if rows else []
+        return {"rows": len(rows) if rows is not None else None, "first": first}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+
+async def explain_query_plan(conn, sql: str, parameters: Any = None) -> List[str]:
+    """``EXPLAIN QUERY PLAN`` rows of ``sql``, indented by plan depth."""
+    cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters or ())
+    rows = await cursor.fetchall()
+    await cursor.close()
+    depth: Dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    """
+    Threshold check, rate limiting and sink for slow statements.
+
+    Args:
+        threshold_ms: Minimum duration of a captured statement (0 disables capture)
+        path: Rotating log file; ``None`` keeps entries in memory only
+        max_bytes / backup_count: Rotation of the log file
+        max_per_minute: Token bucket bounding captures across all statements
+        shape_cooldown: Seconds before the same statement shape is captured again
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        path: str | Path | None = SLOW_QUERY_LOG_PATH or None,
+        max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+        backup_count: int = SLOW_QUERY_LOG_BACKUP_COUNT,
+        max_per_minute: int = SLOW_QUERY_LOG_MAX_PER_MINUTE,
+        shape_cooldown: float = SLOW_QUERY_LOG_SHAPE_COOLDOWN_SECONDS,
+        keep_recent: int = 20,
+    ) -> None:
+        self.threshold = threshold_ms / 1000
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_per_minute = max_per_minute
+        self.shape_cooldown = shape_cooldown
+        self.captured = 0
+        self.suppressed = 0
+        self._tokens = float(max_per_minute)
+        self._refilled_at = time.monotonic()
+        self._last_capture: Dict[str, float] = {}
+        self._recent: Deque[dict] = deque(maxlen=keep_recent)
+        self._handler: QueueHandler | None = None
+        self._listener: QueueListener | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def is_slow(self, seconds: float) -> bool:
+        return self.enabled and seconds >= self.threshold
+
+    def admit(self, shape: str, now: float | None = None) -> bool:
+        """Take a capture slot for ``shape``, or count the capture as suppressed."""
+        now = time.monotonic() if now is None else now
+        self._tokens = min(
+            float(self.max_per_minute),
+            self._tokens + max(now - self._refilled_at, 0.0) * self.max_per_minute / 60,
+        )
+        self._refilled_at = now
+        last = self._last_capture.get(shape)
+        if (last is not None and now - last < self.shape_cooldown) or self._tokens < 1:
+            self.suppressed += 1
+            return False
+        self._tokens -= 1
+        self._last_capture[shape] = now
+        if len(self._last_capture) > 1024:
+            # Forget shapes whose cooldown is over so the table stays bounded
+            self._last_capture = {
+                key: at
+                for key, at in self._last_capture.items()
+                if now - at < self.shape_cooldown
+            }
+        return True
+
+    async def capture(
+        self,
+        conn,
+        sql: str,
+        parameters: Any,
+        shape: str,
+        seconds: float,
+        rows: int,
+        many: bool = False,
+        route: str | None = None,
+    ) -> dict | None:
+        """Write an entry for a slow statement unless rate-limited; return it."""
+        if not self.admit(shape):
+            return None
+        plan: List[str] | None = None
+        plan_error = None
+        explain_parameters = parameters
+        if many:
+            explain_parameters = (
+                parameters[0]
+                if isinstance(parameters, Sequence) and parameters
+                else None
+            )
+        try:
+            plan = await explain_query_plan(conn, sql, explain_parameters)
+        except sqlite3.Error as e:
+            plan_error = str(e)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "route": route,
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "statement": shape,
+            "sql": " ".join(sql.split()),
+            "parameters": parameter_shape(parameters, many=many),
+            "plan": plan,
+        }
+        if plan_error is not None:
+            entry["plan_error"] = plan_error
+        self.write(entry)
+        return entry
+
+    def write(self, entry: dict) -> None:
+        self.captured += 1
+        self._recent.append(entry)
+        if self.path is None:
+            return
+        if self._handler is None:
+            self._start_writer()
+        # Only enqueues: the listener thread formats, writes and rotates
+        self._handler.handle(
+            logging.makeLogRecord({"msg": json.dumps(entry), "levelno": logging.INFO})
+        )
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "captured": self.captured,
+            "suppressed": self.suppressed,
+            "recent": list(self._recent),
+        }
+
+    def _start_writer(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        self._handler = QueueHandler(records)
+        self._listener = QueueListener(
+            records,
+            RotatingFileHandler(
+                self.path,
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8",
+                delay=True,
+            ),
+        )
+        self._listener.start()
+
+    def close(self) -> None:
+        """Write out the queued entries and close the file."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+        self._handler = None
+
+
+_slow_query_log = SlowQueryLog()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """Get the process-wide slow query log."""
+    return _slow_query_log
@@ -0,0 +1,443 @@
+"""
+Per-request SQL statement profiling.
+
+``SQLProfilerMiddleware`` opens a ``RequestProfile`` for every HTTP request;
+``get_db`` / ``get_read_db`` then hand out the pooled connection wrapped in a
+``ProfiledConnection`` that records, for each statement, its normalized text
+(literals and ``IN (...)`` lists folded into placeholders), duration (execute
+plus fetches) and row count.
+
+When the response starts, the request's totals are attached as headers:
+
+- ``X-DB-Query-Count``: statements issued
+- ``X-DB-Query-Time-Ms``: time spent in them
+- ``X-DB-Repeated-Statements``: only present when one statement shape ran more
+  than ``SQL_PROFILER_REPEAT_THRESHOLD`` times, the N+1 smell
+
+Finished requests are folded into the process-wide ``StatementStats``, which
+backs the top-N slow statement report at ``GET /health/db/statements``.
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` additionally go to the slow
+query log (``src.slow_query_log``) with their query plan. That does not depend
+on the profiler: with ``SQL_PROFILER_ENABLED=0`` (or outside a request) the
+connection is still wrapped while the slow query log is on, only timing
+statements for it. Connections not handed out by ``get_db`` / ``get_read_db``
+(background jobs, scripts) are not wrapped.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Deque, Dict, List
+
+from src.slow_query_log import SlowQueryLog, get_slow_query_log
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "1") == "1"
+# Flag a request once one statement shape runs more often than this
+SQL_PROFILER_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILER_REPEAT_THRESHOLD", "10"))
+# Distinct statement shapes kept by the aggregate report
+SQL_PROFILER_MAX_STATEMENTS = int(os.getenv("SQL_PROFILER_MAX_STATEMENTS", "500"))
+
+_profile: ContextVar["RequestProfile | None"] = ContextVar(
+    "sql_request_profile", default=None
+)
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Statement shape: literals become ``?``, ``IN`` lists collapse, whitespace folds."""
+    shape = _COMMENT.sub(" ", sql)
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip().rstrip(";").strip()
+
+
+class StatementRecord:
+    """One executed statement; fetches through its cursor keep adding to it."""
+
+    __slots__ = ("shape", "seconds", "rows", "logged")
+
+    def __init__(self, shape: str, seconds: float, rows: int) -> None:
+        self.shape = shape
+        self.seconds = seconds
+        self.rows = rows
+        # Already handed to the slow query log
+        self.logged = False
+
+
+class RequestProfile:
+    """Statements issued while serving one request."""
+
+    __slots__ = ("records", "scope")
+
+    def __init__(self, scope: dict | None = None) -> None:
+        self.records: List[StatementRecord] = []
+        self.scope = scope
+
+    @property
+    def route(self) -> str | None:
+        """Matched route template (once routing has happened), else the raw path."""
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        return route.path if route is not None else self.scope.get("path")
+
+    def record(self, sql: str, seconds: float, rows: int) -> StatementRecord:
+        record = StatementRecord(normalize_sql(sql), seconds, max(rows, 0))
+        self.records.append(record)
+        return record
+
+    @property
+    def count(self) -> int:
+        return len(self.records)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(record.seconds for record in self.records)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes issued more than ``threshold`` times."""
+        counts = Counter(record.shape for record in self.records)
+        return {shape: n for shape, n in counts.items() if n > threshold}
+
+
+class _Call:
+    """Awaitable / async-context-manager result of ``execute``, like aiosqlite's own."""
+
+    __slots__ = ("_coro", "_cursor")
+
+    def __init__(self, coro) -> None:
+        self._coro = coro
+        self._cursor = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        self._cursor = await self._coro
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._cursor.close()
+
+
+class ProfiledCursor:
+    """aiosqlite cursor wrapper charging fetch time and fetched rows to its statement."""
+
+    __slots__ = ("_cursor", "_record", "_owner", "_sql", "_parameters", "_many")
+
+    def __init__(
+        self,
+        cursor,
+        record: StatementRecord,
+        owner: "ProfiledConnection",
+        sql: str,
+        parameters: Any,
+        many: bool,
+    ) -> None:
+        self._cursor = cursor
+        self._record = record
+        self._owner = owner
+        self._sql = sql
+        self._parameters = parameters
+        self._many = many
+
+    async def _check_slow(self) -> None:
+        record = self._record
+        slow_log = self._owner._slow_log
+        if not record.logged and slow_log.is_slow(record.seconds):
+            record.logged = True
+            await slow_log.capture(
+                self._owner._conn,
+                self._sql,
+                self._parameters,
+                record.shape,
+                record.seconds,
+                record.rows,
+                many=self._many,
+                route=self._owner._route,
+            )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    async def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        result = await fetch(*args)
+        self._record.seconds += time.perf_counter() - started
+        if result:
+            self._record.rows += len(result) if isinstance(result, list) else 1
+        else:
+            # Exhausted: the statement's duration and row count are final
+            await self._check_slow()
+        return result
+
+    async def fetchone(self):
+        return await self._timed(self._cursor.fetchone)
+
+    async def fetchmany(self, size: int | None = None):
+        return await self._timed(
+            self._cursor.fetchmany, *(() if size is None else (size,))
+        )
+
+    async def fetchall(self):
+        rows = await self._timed(self._cursor.fetchall)
+        await self._check_slow()
+        return rows
+
+    async def close(self) -> None:
+        await self._cursor.close()
+        await self._check_slow()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        while True:
+            row = await self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+
+class ProfiledConnection:
+    """
+    aiosqlite connection wrapper recording every statement into a ``RequestProfile``
+    and handing statements that cross the slow threshold to the slow query log.
+    Without a profile, statements are only timed for the slow query log.
+    """
+
+    def __init__(
+        self,
+        conn,
+        profile: RequestProfile | None,
+        slow_log: SlowQueryLog | None = None,
+    ) -> None:
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_profile", profile)
+        object.__setattr__(self, "_slow_log", slow_log or get_slow_query_log())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    @property
+    def _route(self) -> str | None:
+        return self._profile.route if self._profile is not None else None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # row_factory and friends belong to the real connection
+        setattr(self._conn, name, value)
+
+    def execute(self, sql: str, parameters=None) -> _Call:
+        return _Call(self._execute(self._conn.execute, sql, parameters, False))
+
+    def executemany(self, sql: str, parameters) -> _Call:
+        return _Call(self._execute(self._conn.executemany, sql, parameters, True))
+
+    async def _execute(self, method, sql: str, parameters, many: bool):
+        started = time.perf_counter()
+        cursor = await method(sql, parameters)
+        elapsed = time.perf_counter() - started
+        # rowcount is -1 for queries; their rows are counted as they are fetched
+        if self._profile is not None:
+            record = self._profile.record(sql, elapsed, cursor.rowcount)
+        else:
+            record = StatementRecord(
+                normalize_sql(sql), elapsed, max(cursor.rowcount, 0)
+            )
+        cursor = ProfiledCursor(cursor, record, self, sql, parameters, many)
+        if cursor.description is None:
+            # Not a query: nothing left to fetch, so the statement is complete
+            await cursor._check_slow()
+        return cursor
+
+
+class _StatementTotals:
+    __slots__ = ("calls", "seconds", "max_seconds", "rows")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+
+class StatementStats:
+    """Process-wide per-shape totals and the most recent N+1 flags."""
+
+    ORDER_KEYS = ("total_ms", "mean_ms", "max_ms", "calls", "rows")
+
+    def __init__(
+        self, max_statements: int = SQL_PROFILER_MAX_STATEMENTS, max_flags: int = 50
+    ) -> None:
+        self.max_statements = max_statements
+        self.requests = 0
+        self.dropped = 0
+        self._totals: Dict[str, _StatementTotals] = {}
+        self._flags: Deque[dict] = deque(maxlen=max_flags)
+
+    def add(self, profile: RequestProfile) -> None:
+        self.requests += 1
+        for record in profile.records:
+            totals = self._totals.get(record.shape)
+            if totals is None:
+                if len(self._totals) >= self.max_statements:
+                    self.dropped += 1
+                    continue
+                totals = self._totals[record.shape] = _StatementTotals()
+            totals.calls += 1
+            totals.seconds += record.seconds
+            totals.rows += record.rows
+            if record.seconds > totals.max_seconds:
+                totals.max_seconds = record.seconds
+
+    def flag(self, method: str, route: str, repeated: Dict[str, int]) -> None:
+        for shape, count in repeated.items():
+            self._flags.append(
+                {"method": method, "route": route, "statement": shape, "count": count}
+            )
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.dropped = 0
+        self._totals.clear()
+        self._flags.clear()
+
+    def top(self, limit: int = 10, order_by: str = "total_ms") -> List[dict]:
+        """The ``limit`` statement shapes with the highest ``order_by``."""
+        if order_by not in self.ORDER_KEYS:
+            raise ValueError(f"order_by must be one of {', '.join(self.ORDER_KEYS)}")
+        rows = [
+            {
+                "statement": shape,
+                "calls": totals.calls,
+                "total_ms": totals.seconds * 1000,
+                "mean_ms": totals.seconds * 1000 / totals.calls,
+                "max_ms": totals.max_seconds * 1000,
+                "rows": totals.rows,
+            }
+            for shape, totals in self._totals.items()
+        ]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit]
+
+    def report(self, limit: int = 10, order_by: str = "total_ms") -> dict:
+        return {
+            "requests": self.requests,
+            "statements": self.top(limit, order_by),
+            "repeated_statements": list(self._flags),
+            "dropped_statements": self.dropped,
+        }
+
+
+_stats = StatementStats()
+
+
+def get_statement_stats() -> StatementStats:
+    """Get the process-wide statement statistics."""
+    return _stats
+
+
+def profile_connection(conn):
+    """
+    Wrap ``conn`` for the current request's profile. Without one (profiler off,
+    or outside a request) it is wrapped for the slow query log alone, if that is on.
+    """
+    profile = _profile.get()
+    if profile is None:
+        return ProfiledConnection(conn, None) if get_slow_query_log().enabled else conn
+    return ProfiledConnection(conn, profile)
+
+
+class SQLProfilerMiddleware:
+    """ASGI middleware opening a ``RequestProfile`` per HTTP request."""
+
+    def __init__(
+        self,
+        app,
+        stats: StatementStats | None = None,
+        repeat_threshold: int = SQL_PROFILER_REPEAT_THRESHOLD,
+        enabled: bool = SQL_PROFILER_ENABLED,
+    ) -> None:
+        self.app = app
+        self.stats = stats or get_statement_stats()
+        self.repeat_threshold = repeat_threshold
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(profile.count).encode()))
+                headers.append(
+                    (
+                        b"x-db-query-time-ms",
+                        f"{profile.total_seconds * 1000:.3f}".encode(),
+                    )
+                )
+                repeated = profile.repeated(self.repeat_threshold)
+                if repeated:
+                    headers.append(
+                        (
+                            b"x-db-repeated-statements",
+                            str(max(repeated.values())).encode(),
+                        )
+                    )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+            self._finish(scope, profile)
+
+    def _finish(self, scope, profile: RequestProfile) -> None:
+        self.stats.add(profile)
+        route = profile.route
+        repeated = profile.repeated(self.repeat_threshold)
+        if repeated:
+            self.stats.flag(scope["method"], route, repeated)
+            for shape, count in repeated.items():
+                logger.warning(
+                    "%s %s issued the same statement %d times: %s",
+                    scope["method"],
+                    route,
+                    count,
+                    shape,
+                )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s %s: %d statements in %.3f ms",
+                scope["method"],
+                route,
+                profile.count,
+                profile.total_seconds * 1000,
+            )
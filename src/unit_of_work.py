@@ -0,0 +1,72 @@
+"""
+Unit of work: one SQLite transaction per service use case.
+
+Repositories never commit; a service wraps a whole use case (e.g. start a ride:
+rent the vehicle + insert the ride) in a ``UnitOfWork`` so all of its writes
+land in a single ``BEGIN IMMEDIATE ... COMMIT`` (one fsync in WAL mode) and a
+failure half-way through rolls every write back.
+
+In-process caches that must not forget a write before other connections can
+see it register an ``after_commit`` callback.
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+import aiosqlite
+
+
+def after_commit(db: aiosqlite.Connection, callback: Callable[[], None]) -> None:
+    """
+    Run ``callback`` once the unit of work owning ``db``'s transaction commits.
+    It is dropped if that transaction rolls back, and run at once when no unit
+    of work owns the connection (the write is then committed by someone else).
+    """
+    callbacks = getattr(db, "_after_commit", None)
+    if isinstance(callbacks, list):
+        callbacks.append(callback)
+    else:
+        callback()
+
+
+class UnitOfWork:
+    """
+    Async context manager owning a single write transaction.
+
+    ``BEGIN IMMEDIATE`` takes SQLite's write lock up front, so the reads the use
+    case performs before writing cannot be invalidated by another writer.
+
+    If the connection is already inside a transaction (an outer unit of work, or
+    a caller managing the transaction itself), the unit of work joins it and
+    leaves commit/rollback to the owner; so do the ``after_commit`` callbacks
+    registered inside it.
+
+    Usage:
+        async with UnitOfWork(db):
+            await vehicles_repo.mark_vehicle_as_rented(db, vehicle_id)
+            await rides_repo.create_active_ride(db, ...)
+    """
+
+    def __init__(self, db: aiosqlite.Connection) -> None:
+        self.db = db
+        self._owner = False
+
+    async def __aenter__(self) -> aiosqlite.Connection:
+        if not self.db.in_transaction:
+            await self.db.execute("BEGIN IMMEDIATE")
+            self._owner = True
+            self.db._after_commit = []
+        return self.db
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if not self._owner:
+            return
+        self._owner = False
+        callbacks, self.db._after_commit = self.db._after_commit, None
+        if exc_type is None:
+            await self.db.commit()
+            for callback in callbacks:
+                callback()
+        else:
+            await self.db.rollback()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import heapq
+from typing import Iterable
+
+
+class KDTree:
+    """
+    Static 2-d tree over points tagged with integer ids.
+
+    Built once in O(n log^2 n); nearest and k-nearest queries visit O(log n)
+    nodes on average. Distances are squared euclidean distances in the same
+    (x, y) units as the input, and ties are broken by the lower id so results
+    are deterministic.
+    """
+
+    __slots__ = ("_ids", "_xs", "_ys", "_axes", "_left", "_right", "_root")
+
+    def __init__(self, points: Iterable[tuple[int, float, float]]) -> None:
+        self._ids: list[int] = []
+        self._xs: list[float] = []
+        self._ys: list[float] = []
+        self._axes: list[int] = []
+        self._left: list[int] = []
+        self._right: list[int] = []
+        self._root = self._build(list(points), 0)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _build(self, points: list[tuple[int, float, float]], depth: int) -> int:
+        if not points:
+            return -1
+        axis = depth % 2
+        points.sort(key=lambda p: (p[axis + 1], p[0]))
+        mid = len(points) // 2
+        point_id, x, y = points[mid]
+
+        node = len(self._ids)
+        self._ids.append(point_id)
+        self._xs.append(x)
+        self._ys.append(y)
+        self._axes.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+
+        upper_start = mid + 1
+        self._left[node] = self._build(points[:mid], depth + 1)
+        self._right[node] = self._build(points[upper_start:], depth + 1)
+        return node
+
+    def nearest(self, x: float, y: float) -> tuple[int, float] | None:
+        """Return ``(id, squared_distance)`` of the closest point, or None if empty."""
+        result = self.k_nearest(x, y, 1)
+        return result[0] if result else None
+
+    def k_nearest(self, x: float, y: float, k: int) -> list[tuple[int, float]]:
+        """Return up to ``k`` ``(id, squared_distance)`` pairs, closest first."""
+        if k <= 0 or self._root < 0:
+            return []
+
+        # Max-heap of the best k so far, keyed so the worst candidate is on top
+        best: list[tuple[float, int]] = []
+        # (node, lower bound of the squared distance to any point in its subtree)
+        stack: list[tuple[int, float]] = [(self._root, 0.0)]
+        ids, xs, ys, axes = self._ids, self._xs, self._ys, self._axes
+        left, right = self._left, self._right
+
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound > -best[0][0]:
+                continue
+
+            dx = xs[node] - x
+            dy = ys[node] - y
+            dist = dx * dx + dy * dy
+            entry = (-dist, -ids[node])
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+            diff = dx if axes[node] == 0 else dy
+            # diff > 0 means the query point lies on the left/lower side
+            if diff > 0:
+                near, far = left[node], right[node]
+            else:
+                near, far = right[node], left[node]
+            if far >= 0:
+                stack.append((far, max(bound, diff * diff)))
+            if near >= 0:
+                stack.append((near, bound))
+
+        return sorted(
+            ((-neg_id, -neg_dist) for neg_dist, neg_id in best),
+            key=lambda result: (result[1], result[0]),
+        )
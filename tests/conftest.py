@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import pytest
 import pytest_asyncio
 import aiosqlite
 from pathlib import Path
@@ -9,17 +10,34 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(PROJECT_ROOT))
 
 
+@pytest.fixture(autouse=True)
+def reset_in_memory_indexes():
+    """Process-wide in-memory indexes must not leak between tests."""
+    from src.models.active_ride_index import get_active_ride_index
+    from src.models.availability_cache import get_availability_cache
+    from src.models.nearest_station_cache import get_nearest_station_cache
+    from src.models.station_catalog import get_station_catalog
+    from src.models.station_index import get_station_index
+
+    yield
+    get_active_ride_index().clear()
+    get_availability_cache().clear()
+    get_nearest_station_cache().clear()
+    get_station_catalog().invalidate()
+    get_station_index().invalidate()
+
+
 @pytest_asyncio.fixture
 async def test_db():
     """Create an in-memory test database with schema."""
-    from db.schema import CREATE_SQL
+    from db.migrations import apply_migrations
     from src.models.vehicle import VehicleType
 
     db = await aiosqlite.connect(":memory:")
     db.row_factory = aiosqlite.Row
 
-    # Create schema
-    await db.executescript(CREATE_SQL)
+    # Create schema and apply migrations
+    await apply_migrations(db)
 
     # Seed test data
     await db.execute(
@@ -47,3 +65,38 @@ async def test_db():
     yield db
 
     await db.close()
+
+
+@pytest.fixture
+def seed_station_layout(test_db):
+    """
+    Replace the seeded stations with the given capacity rows (the shape returned
+    by ``list_with_capacity``), docking ``current_capacity`` vehicles at each.
+    """
+
+    async def seed(stations: list[dict]) -> None:
+        await test_db.execute("DELETE FROM scooters")
+        await test_db.execute("DELETE FROM vehicles")
+        await test_db.execute("DELETE FROM stations")
+        for station in stations:
+            await test_db.execute(
+                "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+                (
+                    station["station_id"],
+                    station["name"],
+                    station["lat"],
+                    station["lon"],
+                    station["max_capacity"],
+                ),
+            )
+            await test_db.executemany(
+                "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+                "VALUES (?, ?, 'bicycle', 'available', 0, NULL)",
+                [
+                    (f"SEED_{station['station_id']}_{i}", station["station_id"])
+                    for i in range(station["current_capacity"])
+                ],
+            )
+        await test_db.commit()
+
+    return seed
@@ -9,7 +9,7 @@ from src.main import app
 
 @pytest.mark.asyncio
 async def test_get_station_success():
-    with patch("src.controllers.stations_controller.get_db") as mock_get_db:
+    with patch("src.controllers.stations_controller.get_read_db") as mock_get_db:
         mock_db = AsyncMock()
         mock_get_db.return_value.__aenter__.return_value = mock_db
 
@@ -37,7 +37,7 @@ async def test_get_station_success():
 
 @pytest.mark.asyncio
 async def test_get_station_not_found():
-    with patch("src.controllers.stations_controller.get_db") as mock_get_db:
+    with patch("src.controllers.stations_controller.get_read_db") as mock_get_db:
         mock_db = AsyncMock()
         mock_get_db.return_value.__aenter__.return_value = mock_db
 
@@ -57,7 +57,7 @@ async def test_get_station_not_found():
 
 @pytest.mark.asyncio
 async def test_get_nearest_station():
-    with patch("src.controllers.stations_controller.get_db") as mock_get_db:
+    with patch("src.controllers.stations_controller.get_read_db") as mock_get_db:
         mock_db = AsyncMock()
         mock_get_db.return_value.__aenter__.return_value = mock_db
 
@@ -97,7 +97,7 @@ async def test_get_nearest_station_missing_params():
 @pytest.mark.asyncio
 async def test_get_station_includes_vehicles_array():
     """Test that GET /stations/{id} returns vehicles array populated from database."""
-    with patch("src.controllers.stations_controller.get_db") as mock_get_db:
+    with patch("src.controllers.stations_controller.get_read_db") as mock_get_db:
         mock_db = AsyncMock()
         mock_get_db.return_value.__aenter__.return_value = mock_db
 
@@ -129,7 +129,7 @@ async def test_get_station_includes_vehicles_array():
 @pytest.mark.asyncio
 async def test_get_nearest_station_includes_vehicles_array():
     """Test that GET /stations/nearest returns vehicles array populated from database."""
-    with patch("src.controllers.stations_controller.get_db") as mock_get_db:
+    with patch("src.controllers.stations_controller.get_read_db") as mock_get_db:
         mock_db = AsyncMock()
         mock_get_db.return_value.__aenter__.return_value = mock_db
 
@@ -0,0 +1,104 @@
+"""The load generator replays full journeys and reports per-endpoint outcomes."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+
+import aiosqlite
+import httpx
+import pytest
+
+from db.migrations import apply_migrations
+from scripts.load_test import END, REGISTER, START, GeoDistribution, run_stage
+from src.controllers import rides_controller, users_controller
+from src.main import app
+
+
+def test_station_distribution_stays_near_stations():
+    geo = GeoDistribution([(34.0, 32.0, 1), (35.0, 33.0, 99)], spread=0.001)
+    rng = random.Random(3)
+
+    points = [geo.point(rng) for _ in range(500)]
+
+    near_big = sum(1 for lon, lat in points if abs(lon - 35.0) < 0.01)
+    assert all(min(abs(lon - 34.0), abs(lon - 35.0)) < 0.01 for lon, _ in points)
+    # Stations are weighted by capacity
+    assert near_big > 450
+
+
+@pytest.mark.asyncio
+async def test_stage_reports_statuses_and_transport_errors():
+    calls = {"start": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/users/register":
+            return httpx.Response(201, json={})
+        if request.url.path == "/rides/start":
+            calls["start"] += 1
+            if calls["start"] % 4 == 0:
+                return httpx.Response(409, json={"detail": "busy"})
+            return httpx.Response(200, json={"ride_id": f"R{calls['start']}"})
+        if calls["start"] % 3 == 0:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={})
+
+    geo = GeoDistribution([(34.0, 32.0, 10)])
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://load"
+    ) as client:
+        stats = await run_stage(client, geo, rate=2000, journeys=40, seed=1)
+
+    summary = stats.summary()
+    endpoints = summary["endpoints"]
+    assert summary["journeys_started"] == 40
+    assert endpoints[REGISTER]["statuses"] == {"201": 40}
+    assert endpoints[START]["statuses"] == {"200": 30, "409": 10}
+    assert sum(endpoints[END]["statuses"].values()) == 30
+    assert summary["journeys_completed"] == endpoints[END]["statuses"].get("200", 0)
+    assert "error:ConnectError" in endpoints[END]["statuses"]
+    assert 0 < summary["error_rate"] < 1
+    assert endpoints[START]["p50_ms"] <= endpoints[START]["p99_ms"]
+
+
+@pytest.mark.asyncio
+async def test_journeys_against_the_application():
+    db = await aiosqlite.connect(":memory:")
+    db.row_factory = aiosqlite.Row
+    await apply_migrations(db)
+    await db.executemany(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+        [(1, "One", 32.0, 34.0, 40), (2, "Two", 32.01, 34.01, 40)],
+    )
+    await db.executemany(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES (?, ?, 'bicycle', 'available', 0, NULL)",
+        # More vehicles than journeys: overlapping rides never run out of vehicles
+        [(f"LB{i}", 1 + i % 2) for i in range(30)],
+    )
+    await db.commit()
+
+    # One shared connection: serialize requests on it like the single-writer lane
+    writer = asyncio.Lock()
+
+    async def override_get_db():
+        async with writer:
+            yield db
+
+    original_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[users_controller.get_db] = override_get_db
+    app.dependency_overrides[rides_controller.get_db] = override_get_db
+    try:
+        geo = GeoDistribution([(34.0, 32.0, 20), (34.01, 32.01, 20)])
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            stats = await run_stage(client, geo, rate=500, journeys=15, seed=2)
+    finally:
+        app.dependency_overrides = original_overrides
+        await db.close()
+
+    summary = stats.summary()
+    assert summary["journeys_completed"] == 15
+    assert summary["error_rate"] == 0
+    assert summary["endpoints"][END]["statuses"] == {"200": 15}
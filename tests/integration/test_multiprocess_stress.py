@@ -0,0 +1,26 @@
+"""Several worker processes share one SQLite file; no ride/dock invariant may break."""
+
+from __future__ import annotations
+
+from scripts.stress_multiworker import run_stress
+
+
+def test_concurrent_workers_keep_invariants(tmp_path):
+    report = run_stress(
+        tmp_path / "stress.db",
+        workers=4,
+        clients=2,
+        operations=30,
+        users=6,
+        stations=4,
+        vehicles_per_station=3,
+    )
+
+    outcomes = report["outcomes"]
+    assert report["violations"] == []
+    assert outcomes.get("start:200", 0) > 0
+    assert outcomes.get("end:200", 0) > 0
+    # Losing a race is a 4xx for the client, never a crash
+    assert not [
+        outcome for outcome in outcomes if ":5" in outcome or ":error" in outcome
+    ]
@@ -5,7 +5,7 @@ import pytest_asyncio
 import aiosqlite
 from httpx import AsyncClient, ASGITransport
 
-from db.schema import CREATE_SQL
+from db.migrations import apply_migrations
 from src.main import app
 from src.controllers import (
     users_controller,
@@ -19,7 +19,7 @@ from src.controllers import (
 async def isolated_api_client() -> AsyncClient:
     db = await aiosqlite.connect(":memory:")
     db.row_factory = aiosqlite.Row
-    await db.executescript(CREATE_SQL)
+    await apply_migrations(db)
 
     # Seed stations
     await db.execute(
@@ -57,7 +57,9 @@ async def isolated_api_client() -> AsyncClient:
     app.dependency_overrides[users_controller.get_db] = override_get_db
     app.dependency_overrides[rides_controller.get_db] = override_get_db
     app.dependency_overrides[vehicles_controller.get_db] = override_get_db
-    app.dependency_overrides[stations_controller.get_db] = override_get_db
+    app.dependency_overrides[vehicles_controller.get_read_db] = override_get_db
+    app.dependency_overrides[rides_controller.get_read_db] = override_get_db
+    app.dependency_overrides[stations_controller.get_read_db] = override_get_db
 
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test"
@@ -439,6 +441,38 @@ async def test_start_ride_no_eligible_vehicle_returns_409(
     )
 
 
+@pytest.mark.asyncio
+async def test_start_ride_skips_station_without_eligible_vehicle(
+    isolated_api_client: AsyncClient,
+):
+    register_response = await isolated_api_client.post(
+        "/users/register",
+        json={
+            "user_id": "USER_SKIP_DRAINED",
+            "first_name": "Skip",
+            "last_name": "Drained",
+            "email": "skip.drained@example.com",
+        },
+    )
+    assert register_response.status_code == 201
+
+    # The only vehicle at the nearest station is due for treatment
+    db = isolated_api_client._test_db  # type: ignore[attr-defined]
+    await db.execute(
+        "UPDATE vehicles SET rides_since_last_treated = 11 WHERE vehicle_id = 'BICYCLE_001'"
+    )
+    await db.commit()
+
+    response = await isolated_api_client.post(
+        "/rides/start",
+        json={"user_id": "USER_SKIP_DRAINED", "lon": 34.0, "lat": 32.0},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["vehicle_id"] == "SCOOTER_001"
+    assert response.json()["start_station_id"] == 2
+
+
 @pytest.mark.asyncio
 async def test_end_ride_no_station_with_capacity_returns_400(
     isolated_api_client: AsyncClient,
@@ -519,3 +553,42 @@ async def test_report_degraded_auto_ends_active_ride(isolated_api_client: AsyncC
     assert all(
         user["user_id"] != "USER_REPORT_FLOW" for user in active_users_response.json()
     )
+
+
+@pytest.mark.asyncio
+async def test_reserve_then_start_ride_with_hold(isolated_api_client: AsyncClient):
+    register_response = await isolated_api_client.post(
+        "/users/register",
+        json={
+            "user_id": "USER_HOLD_FLOW",
+            "first_name": "Hold",
+            "last_name": "Flow",
+            "email": "hold.flow@example.com",
+        },
+    )
+    assert register_response.status_code == 201
+
+    reserve_response = await isolated_api_client.post(
+        "/vehicles/reserve",
+        json={"user_id": "USER_HOLD_FLOW", "lon": 34.0, "lat": 32.0},
+    )
+    assert reserve_response.status_code == 200
+    hold = reserve_response.json()
+    assert hold["vehicle_id"] == "BICYCLE_001"
+    assert hold["station_id"] == 1
+
+    vehicle_response = await isolated_api_client.get("/vehicles/BICYCLE_001")
+    assert vehicle_response.json()["status"] == "reserved"
+
+    start_response = await isolated_api_client.post(
+        "/rides/start",
+        json={"user_id": "USER_HOLD_FLOW", "hold_id": hold["hold_id"]},
+    )
+    assert start_response.status_code == 200
+    assert start_response.json()["vehicle_id"] == "BICYCLE_001"
+
+    reused_response = await isolated_api_client.post(
+        "/rides/start",
+        json={"user_id": "USER_HOLD_FLOW", "hold_id": hold["hold_id"]},
+    )
+    assert reused_response.status_code == 404
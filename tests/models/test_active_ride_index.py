@@ -0,0 +1,113 @@
+"""Tests for the in-process active ride index and its use by RidesRepository."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from src.models.active_ride_index import get_active_ride_index
+from src.models.ride import Ride
+from src.repositories.rides_repository import ActiveRideExistsError, RidesRepository
+
+
+def _ride(ride_id: str, user_id: str, vehicle_id: str) -> Ride:
+    return Ride(
+        ride_id=ride_id,
+        user_id=user_id,
+        vehicle_id=vehicle_id,
+        start_station_id=1,
+        start_time=datetime(2026, 1, 1),
+    )
+
+
+async def _seed_users(db, *user_ids: str) -> None:
+    for user_id in user_ids:
+        await db.execute(
+            "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES (?, 'F', 'L', ?, 'tok')",
+            (user_id, f"{user_id}@example.com"),
+        )
+    await db.commit()
+
+
+def test_write_through_needs_the_version_it_was_loaded_at():
+    index = get_active_ride_index()
+    index.load(10, [_ride("R1", "U1", "V1")])
+
+    index.opened(_ride("R2", "U2", "V2"), before=10, after=11)
+    assert index.by_user("U2").ride_id == "R2"
+    index.closed("R1", before=11, after=12)
+    assert index.by_user("U1") is None and index.by_vehicle("V1") is None
+    assert (len(index), index.version, index.write_through) == (1, 12, 2)
+
+    # Someone else changed the open rides in between: unload instead of guessing
+    index.closed("R2", before=99, after=100)
+    assert not index.is_loaded and len(index) == 0
+
+    stats = index.stats()
+    assert (stats["loaded"], stats["reloads"], stats["write_through"]) == (
+        False,
+        1,
+        2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_start_and_end_update_the_index_in_place(test_db):
+    repo = RidesRepository()
+    index = get_active_ride_index()
+    await _seed_users(test_db, "U1", "U2")
+    assert await repo.rebuild_active_ride_index(test_db) == 0
+
+    await test_db.execute("BEGIN IMMEDIATE")
+    await repo.create_active_ride(test_db, "R1", "U1", "V001", 1)
+    await test_db.commit()
+
+    assert (await repo.get_active_ride_by_user(test_db, "U1")).ride_id == "R1"
+    assert (await repo.get_active_ride_by_vehicle(test_db, "V001")).user_id == "U1"
+    assert await repo.get_active_ride_by_user(test_db, "U2") is None
+    assert [u.user_id for u in await repo.get_active_users(test_db)] == ["U1"]
+
+    await test_db.execute("BEGIN IMMEDIATE")
+    assert await repo.complete_ride(test_db, "R1", 2, datetime.now())
+    await test_db.commit()
+
+    assert await repo.get_active_ride_by_user(test_db, "U1") is None
+    assert await repo.get_active_users(test_db) == []
+    assert (index.reloads, index.write_through) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_rides_opened_elsewhere_reload_the_index(test_db):
+    repo = RidesRepository()
+    index = get_active_ride_index()
+    await _seed_users(test_db, "U1")
+    await repo.rebuild_active_ride_index(test_db)
+
+    # A ride the index never heard of, as from another worker
+    await test_db.execute(
+        "INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, start_time) VALUES ('R1', 'U1', 'V001', 1, '2026-01-01T10:00:00')"
+    )
+    await test_db.commit()
+
+    ride = await repo.get_active_ride_by_user(test_db, "U1")
+    assert (ride.ride_id, ride.start_time) == ("R1", datetime(2026, 1, 1, 10))
+    assert index.reloads == 2
+    with pytest.raises(ActiveRideExistsError):
+        await repo.create_active_ride(test_db, "R2", "U1", "V002", 1)
+    assert index.by_user("U1").ride_id == "R1"
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_rides_are_never_served(test_db):
+    repo = RidesRepository()
+    await _seed_users(test_db, "U1")
+    await repo.rebuild_active_ride_index(test_db)
+
+    await test_db.execute("BEGIN IMMEDIATE")
+    await repo.create_active_ride(test_db, "R1", "U1", "V001", 1)
+    assert (await repo.get_active_ride_by_user(test_db, "U1")).ride_id == "R1"
+    await test_db.rollback()
+
+    assert await repo.get_active_ride_by_user(test_db, "U1") is None
+    assert await repo.get_active_ride_by_vehicle(test_db, "V001") is None
@@ -0,0 +1,213 @@
+"""Tests for the per-station availability cache and its use by VehiclesRepository."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.models.availability_cache import (
+    StationAvailabilityCache,
+    get_availability_cache,
+)
+from src.models.availability_cache import StationVehicles
+from src.models.vehicle import Bicycle, ElectricBicycle, Scooter
+from src.repositories.vehicles_repository import VehiclesRepository
+
+
+def _bicycle(vehicle_id: str, station_id: int, rides: int = 0) -> Bicycle:
+    return Bicycle(
+        vehicle_id=vehicle_id,
+        station_id=station_id,
+        status="available",
+        rides_since_last_treated=rides,
+        last_treated_date=None,
+    )
+
+
+def _scooter(vehicle_id: str, station_id: int, battery: int) -> Scooter:
+    return Scooter(
+        vehicle_id=vehicle_id,
+        station_id=station_id,
+        status="available",
+        rides_since_last_treated=0,
+        last_treated_date=None,
+        battery=battery,
+    )
+
+
+def test_heap_orders_rentable_vehicles_by_type_then_id():
+    entry = StationVehicles(
+        0,
+        [
+            _bicycle("B2", 1),
+            _bicycle("B1", 1),
+            _scooter("S1", 1, battery=10),
+            ElectricBicycle(
+                vehicle_id="E9",
+                station_id=1,
+                status="available",
+                rides_since_last_treated=0,
+                last_treated_date=None,
+            ),
+            _bicycle("B0", 1, rides=11),
+        ],
+    )
+
+    # The drained scooter and the bicycle due for treatment cannot be rented
+    assert entry.best_rentable().vehicle_id == "E9"
+    entry.discard("E9")
+    assert entry.best_rentable().vehicle_id == "B1"
+    entry.add(_scooter("S2", 1, battery=80))
+    assert entry.best_rentable().vehicle_id == "S2"
+    entry.discard("S2")
+    entry.discard("B1")
+    entry.discard("B2")
+    assert entry.best_rentable() is None
+    assert len(entry) == 2
+
+
+def test_lru_eviction_and_counters(monkeypatch):
+    cache = get_availability_cache()
+    monkeypatch.setattr(cache, "max_stations", 2)
+
+    cache.store(1, 10, [_bicycle("A", 1)])
+    cache.store(2, 20, [_bicycle("B", 2)])
+    assert [v.vehicle_id for v in cache.lookup(1, 10).vehicles()] == ["A"]
+    # Station 2 is now the least recently used one
+    cache.store(3, 30, [_bicycle("C", 3)])
+
+    assert cache.lookup(2, 20) is None
+    assert cache.lookup(3, 31) is None
+    assert cache.lookup(1, 10) is not None
+    # Written outside a transaction: no versions, so the station is dropped
+    stations = cache.cached_stations(vehicle_id="A")
+    cache.apply("A", None, stations, {}, {})
+    assert stations == {1} and len(cache) == 0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stale"]) == (2, 2, 1)
+    assert (stats["evictions"], stats["invalidations"], stats["vehicles"]) == (1, 1, 0)
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    cache = StationAvailabilityCache()
+    monkeypatch.setattr(cache, "max_stations", 0)
+
+    cache.store(1, 10, [_bicycle("A", 1)])
+
+    assert not cache.enabled and len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_repeat_reads_hit_until_the_station_changes(test_db):
+    repo = VehiclesRepository()
+    cache = get_availability_cache()
+
+    first = await repo.get_available_vehicles_by_station(test_db, 1)
+    second = await repo.get_available_vehicles_by_station(test_db, 1)
+    assert [v.vehicle_id for v in second] == [v.vehicle_id for v in first] == ["V001"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A write the cache never heard of, as from another worker
+    await test_db.execute(
+        "UPDATE vehicles SET status = 'available' WHERE vehicle_id = 'V002'"
+    )
+    third = await repo.get_available_vehicles_by_station(test_db, 1)
+
+    assert {v.vehicle_id for v in third} == {"V001", "V002"}
+    assert cache.stale == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_the_affected_stations(test_db):
+    repo = VehiclesRepository()
+    cache = get_availability_cache()
+    await repo.get_available_vehicles_by_station(test_db, 1)
+    await repo.get_available_vehicles_by_station(test_db, 2)
+    assert len(cache) == 2
+
+    await repo.mark_vehicle_as_rented(test_db, "V001")
+    assert len(cache) == 1
+    assert await repo.get_available_vehicles_by_station(test_db, 1) == []
+
+    await repo.dock_vehicle(test_db, "V001", 2)
+    assert [
+        v.vehicle_id for v in await repo.get_available_vehicles_by_station(test_db, 2)
+    ] == ["V001"]
+
+    await repo.mark_vehicle_degraded_and_detach(test_db, "V001")
+    assert await repo.get_available_vehicles_by_station(test_db, 2) == []
+
+
+@pytest.mark.asyncio
+async def test_writes_in_a_transaction_update_the_heaps_in_place(test_db):
+    repo = VehiclesRepository()
+    cache = get_availability_cache()
+    await test_db.execute(
+        "UPDATE vehicles SET status = 'available', rides_since_last_treated = 0 WHERE vehicle_id = 'V002'"
+    )
+    await test_db.commit()
+    assert (await repo.get_best_rentable_vehicle(test_db, 1)).vehicle_id == "V002"
+    await repo.get_best_rentable_vehicle(test_db, 2)
+
+    await test_db.execute("BEGIN IMMEDIATE")
+    await repo.mark_vehicle_as_rented(test_db, "V002")
+    await repo.dock_vehicle(test_db, "V002", 2)
+    await test_db.commit()
+
+    misses = cache.misses
+    assert (await repo.get_best_rentable_vehicle(test_db, 1)).vehicle_id == "V001"
+    docked = await repo.get_best_rentable_vehicle(test_db, 2)
+    assert (docked.vehicle_id, docked.battery) == ("V002", 86)
+    assert (cache.misses, cache.write_through) == (misses, 2)
+
+    await test_db.execute("BEGIN IMMEDIATE")
+    await repo.mark_vehicle_degraded_and_detach(test_db, "V002")
+    await test_db.commit()
+    assert await repo.get_available_vehicles_by_station(test_db, 2) == []
+    assert cache.misses == misses
+
+
+@pytest.mark.asyncio
+async def test_best_rentable_vehicle_matches_sql_without_the_cache(
+    test_db, monkeypatch
+):
+    repo = VehiclesRepository()
+    await test_db.execute(
+        "UPDATE vehicles SET status = 'available' WHERE vehicle_id = 'V002'"
+    )
+    await test_db.execute("UPDATE scooters SET battery = 10 WHERE vehicle_id = 'V002'")
+
+    cached = await repo.get_best_rentable_vehicle(test_db, 1)
+    monkeypatch.setattr(get_availability_cache(), "max_stations", 0)
+    uncached = await repo.get_best_rentable_vehicle(test_db, 1)
+
+    assert cached.vehicle_id == uncached.vehicle_id == "V001"
+    assert await repo.get_best_rentable_vehicle(test_db, 999) is None
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_reads_are_never_served(test_db):
+    repo = VehiclesRepository()
+    await test_db.commit()
+
+    await test_db.execute("BEGIN IMMEDIATE")
+    await repo.mark_vehicle_as_rented(test_db, "V001")
+    # Cached from inside the transaction, under its uncommitted version
+    assert await repo.get_available_vehicles_by_station(test_db, 1) == []
+    await test_db.rollback()
+
+    assert [
+        v.vehicle_id for v in await repo.get_available_vehicles_by_station(test_db, 1)
+    ] == ["V001"]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_caches_stations_with_available_vehicles(test_db):
+    repo = VehiclesRepository()
+    cache = get_availability_cache()
+
+    assert await repo.warm_availability_cache(test_db) == 1
+
+    vehicles = await repo.get_available_vehicles_by_station(test_db, 1)
+    assert [v.vehicle_id for v in vehicles] == ["V001"]
+    assert (cache.hits, cache.misses) == (1, 0)
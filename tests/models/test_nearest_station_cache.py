@@ -0,0 +1,152 @@
+"""Tests for the /stations/nearest response cache and its invalidation by writes."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import aiosqlite
+import pytest
+
+from db.migrations import apply_migrations
+from src.models.nearest_station_cache import get_nearest_station_cache
+from src.models.station import StationWithDistance
+from src.repositories.vehicle_holds_repository import VehicleHoldsRepository
+from src.repositories.vehicles_repository import VehiclesRepository
+from src.services.stations_service import StationsService
+from src.unit_of_work import UnitOfWork
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = get_nearest_station_cache()
+    monkeypatch.setattr(cache, "ttl", 5.0)
+    monkeypatch.setattr(cache, "grid", 0.001)
+    monkeypatch.setattr(cache, "max_entries", 100)
+    return cache
+
+
+def _station(station_id: int, vehicles: list[str]) -> StationWithDistance:
+    return StationWithDistance(
+        station_id=station_id,
+        name=f"S{station_id}",
+        lat=32.0,
+        lon=34.0,
+        max_capacity=10,
+        vehicles=vehicles,
+        distance=0.0,
+    )
+
+
+def test_nearby_points_share_an_entry_until_it_expires(cache):
+    cache.store(34.0101, 32.0101, _station(1, ["V1"]), cache.generation, now=100.0)
+
+    hit = cache.lookup(34.0104, 32.0098, now=102.0)
+    assert hit.station_id == 1
+    # The distance is to the point asked for, not to the one that filled the entry
+    assert hit.distance == pytest.approx(0.0104**2 + 0.0098**2)
+    assert cache.lookup(34.0110, 32.0101, now=102.0) is None
+    assert cache.lookup(34.0101, 32.0101, now=105.0) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 2, 1)
+    assert stats["served_age_max_seconds"] == 2.0
+    metrics = cache.render()
+    assert 'nearest_cache_lookups_total{result="hit"} 1' in metrics
+    assert "nearest_cache_served_age_seconds_sum 2.0" in metrics
+
+
+def test_station_changes_drop_its_entries(cache):
+    cache.store(34.0, 32.0, _station(1, ["V1"]), cache.generation)
+    cache.store(34.5, 32.5, _station(1, ["V1"]), cache.generation)
+    cache.store(35.0, 33.0, _station(2, ["V2"]), cache.generation)
+
+    cache.invalidate_stations([1])
+    assert len(cache) == 1 and cache.lookup(35.0, 33.0) is not None
+    cache.invalidate_vehicle("V2")
+    assert len(cache) == 0 and cache.invalidations == 3
+
+    # Computed before the invalidation above: may predate the write, so not kept
+    generation = cache.generation
+    cache.invalidate_stations([7])
+    cache.store(34.0, 32.0, _station(1, ["V1"]), generation)
+    assert len(cache) == 0
+
+
+def test_disabled_by_default():
+    cache = get_nearest_station_cache()
+
+    cache.store(34.0, 32.0, _station(1, []), cache.generation)
+
+    assert not cache.enabled and cache.lookup(34.0, 32.0) is None
+
+
+@pytest.mark.asyncio
+async def test_repeat_lookups_skip_sqlite_until_the_station_changes(cache, test_db):
+    service = StationsService()
+    first = await service.get_nearest_station(test_db, lon=34.0, lat=32.0)
+    assert first.nearest_available_vehicle.vehicle_id == "V001"
+
+    statements: list[str] = []
+    await test_db.set_trace_callback(statements.append)
+    second = await service.get_nearest_station(test_db, lon=34.0002, lat=32.0001)
+    await test_db.set_trace_callback(None)
+    assert statements == []
+    assert second.station_id == 1
+    assert second.nearest_available_vehicle.vehicle_id == "V001"
+
+    await VehiclesRepository().mark_vehicle_as_rented(test_db, "V001")
+    third = await service.get_nearest_station(test_db, lon=34.0002, lat=32.0001)
+    assert third.nearest_available_vehicle is None
+    assert "V001" not in third.vehicles
+    assert cache.invalidations == 1
+
+
+@pytest.mark.asyncio
+async def test_released_holds_drop_their_stations(cache, test_db):
+    vehicles = VehiclesRepository()
+    await vehicles.hold_vehicle(test_db, "V001")
+    await test_db.execute(
+        "INSERT INTO vehicle_holds (hold_id, user_id, vehicle_id, station_id, expires_at) VALUES ('H1', 'U1', 'V001', 1, 0)"
+    )
+    service = StationsService()
+    held = await service.get_nearest_station(test_db, lon=34.0, lat=32.0)
+    assert held.nearest_available_vehicle is None
+
+    now = datetime.now(timezone.utc) + timedelta(minutes=5)
+    assert await VehicleHoldsRepository().release_expired(test_db, now, 10) == 1
+
+    released = await service.get_nearest_station(test_db, lon=34.0, lat=32.0)
+    assert released.nearest_available_vehicle.vehicle_id == "V001"
+
+
+@pytest.mark.asyncio
+async def test_reads_before_the_commit_are_dropped_by_it(cache, tmp_path):
+    path = tmp_path / "app.db"
+    writer = await aiosqlite.connect(path)
+    reader = await aiosqlite.connect(path)
+    writer.row_factory = reader.row_factory = aiosqlite.Row
+    try:
+        await apply_migrations(writer)
+        await writer.execute(
+            "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (1, 'S1', 32.0, 34.0, 10)"
+        )
+        await writer.execute(
+            "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated) "
+            "VALUES ('V001', 1, 'bicycle', 'available', 0)"
+        )
+        await writer.commit()
+        service = StationsService()
+
+        async with UnitOfWork(writer):
+            await VehiclesRepository().mark_vehicle_as_rented(writer, "V001")
+            # Another connection still sees the committed vehicle and caches it
+            stale = await service.get_nearest_station(reader, lon=34.0, lat=32.0)
+            assert stale.nearest_available_vehicle.vehicle_id == "V001"
+            assert len(cache) == 1
+
+        assert len(cache) == 0
+        fresh = await service.get_nearest_station(reader, lon=34.0, lat=32.0)
+        assert fresh.nearest_available_vehicle is None
+    finally:
+        await reader.close()
+        await writer.close()
@@ -0,0 +1,110 @@
+"""Tests for the in-memory station catalog and the repository reads it serves."""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.controllers import stations_controller
+from src.main import app
+from src.models.station_catalog import StationInfo, get_station_catalog
+from src.models.station_index import get_station_index
+from src.repositories.stations_repository import StationsRepository
+
+
+async def _repository_reads(db) -> dict:
+    repo = StationsRepository()
+    return {
+        "by_id": [await repo.get_by_id(db, station_id) for station_id in (1, 2, 999)],
+        "nearest": await repo.get_nearest(db, lon=34.09, lat=32.09),
+        "capacity": await repo.list_with_capacity(db),
+        "available": await repo.get_stations_with_available_vehicles(db),
+        "free": await repo.get_free_dock_capacities(db, [2, 1, 999]),
+    }
+
+
+@pytest.mark.asyncio
+async def test_reload_loads_stations_and_the_spatial_index(test_db):
+    catalog = get_station_catalog()
+    assert not catalog.is_loaded
+
+    assert await catalog.reload(test_db) == 2
+
+    assert catalog.is_loaded and len(catalog) == 2
+    assert get_station_index().is_loaded
+    assert catalog.get(2) == StationInfo(2, "Test Station 2", 32.1, 34.1, 20)
+    assert catalog.get(999) is None
+    assert [info.station_id for info in catalog] == [1, 2]
+
+    catalog.invalidate()
+    assert not catalog.is_loaded and catalog.get(1) is None
+    assert not get_station_index().is_loaded
+
+
+@pytest.mark.asyncio
+async def test_catalog_reads_match_sql_reads(test_db):
+    from_sql = await _repository_reads(test_db)
+
+    await get_station_catalog().reload(test_db)
+    from_catalog = await _repository_reads(test_db)
+
+    assert from_catalog == from_sql
+
+
+@pytest.mark.asyncio
+async def test_live_vehicle_state_is_read_from_sqlite(test_db):
+    await get_station_catalog().reload(test_db)
+    repo = StationsRepository()
+
+    await test_db.execute(
+        "UPDATE vehicles SET station_id = 2 WHERE vehicle_id = 'V001'"
+    )
+
+    assert (await repo.get_by_id(test_db, 2)).vehicles == ["V001"]
+    assert [
+        s.station_id for s in await repo.get_stations_with_available_vehicles(test_db)
+    ] == [2]
+
+
+@pytest.mark.asyncio
+async def test_station_missing_from_catalog_falls_back_to_sql(test_db):
+    await get_station_catalog().reload(test_db)
+    await test_db.execute(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (3, 'New', 32.2, 34.2, 5)"
+    )
+    await test_db.execute(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES ('V003', 3, 'bicycle', 'available', 0, NULL)"
+    )
+    repo = StationsRepository()
+
+    assert (await repo.get_by_id(test_db, 3)).name == "New"
+    assert {
+        s.station_id for s in await repo.get_stations_with_available_vehicles(test_db)
+    } == {1, 3}
+    assert set(await repo.get_free_dock_capacities(test_db, [1, 3])) == {1, 3}
+
+
+@pytest.mark.asyncio
+async def test_reload_endpoint_picks_up_station_changes(test_db):
+    async def override_get_db():
+        yield test_db
+
+    original_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[stations_controller.get_db] = override_get_db
+    app.dependency_overrides[stations_controller.get_read_db] = override_get_db
+    try:
+        await get_station_catalog().reload(test_db)
+        await test_db.execute(
+            "UPDATE stations SET name = 'Renamed' WHERE station_id = 1"
+        )
+        await test_db.commit()
+        client = TestClient(app)
+
+        assert client.get("/stations/1").json()["name"] == "Test Station 1"
+        response = client.post("/stations/catalog/reload")
+        assert response.status_code == 200
+        assert response.json() == {"stations": 2}
+        assert client.get("/stations/1").json()["name"] == "Renamed"
+    finally:
+        app.dependency_overrides = original_overrides
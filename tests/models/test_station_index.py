@@ -0,0 +1,124 @@
+"""Tests for the KD-tree and the in-memory station spatial index."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src.models.station_index import get_station_index
+from src.repositories.stations_repository import StationsRepository
+from src.services.stations_service import StationsService
+from src.utilis.kd_tree import KDTree
+
+
+def _brute_force(points, x, y, k):
+    return sorted(
+        ((i, (px - x) * (px - x) + (py - y) * (py - y)) for i, px, py in points),
+        key=lambda r: (r[1], r[0]),
+    )[:k]
+
+
+def test_kd_tree_matches_brute_force():
+    rng = random.Random(7)
+    points = [
+        (i, rng.uniform(34.7, 34.9), rng.uniform(32.0, 32.2)) for i in range(2000)
+    ]
+    tree = KDTree(points)
+
+    for _ in range(200):
+        x, y = rng.uniform(34.6, 35.0), rng.uniform(31.9, 32.3)
+        for k in (1, 5, 25):
+            assert tree.k_nearest(x, y, k) == _brute_force(points, x, y, k)
+
+
+def test_kd_tree_ties_broken_by_lower_id():
+    tree = KDTree([(7, 1.0, 1.0), (3, 1.0, 1.0), (9, 2.0, 2.0)])
+
+    assert tree.nearest(1.0, 1.0) == (3, 0.0)
+    assert [i for i, _ in tree.k_nearest(1.0, 1.0, 2)] == [3, 7]
+
+
+def test_kd_tree_empty_and_small_k():
+    assert KDTree([]).nearest(0.0, 0.0) is None
+    assert KDTree([(1, 0.0, 0.0)]).k_nearest(0.0, 0.0, 5) == [(1, 0.0)]
+    assert KDTree([(1, 0.0, 0.0)]).k_nearest(0.0, 0.0, 0) == []
+
+
+@pytest.mark.asyncio
+async def test_rebuild_and_invalidate(test_db):
+    index = get_station_index()
+    assert not index.is_loaded
+
+    assert await index.rebuild(test_db) == 2
+    assert index.is_loaded
+    assert index.nearest(lon=34.09, lat=32.09)[0] == 2
+
+    index.invalidate()
+    assert not index.is_loaded
+    assert index.k_nearest(34.0, 32.0, 3) == []
+
+
+@pytest.mark.asyncio
+async def test_repository_get_nearest_uses_index(test_db):
+    repo = StationsRepository()
+    from_sql = await repo.get_nearest(test_db, lon=34.09, lat=32.09)
+
+    await get_station_index().rebuild(test_db)
+    statements: list[str] = []
+    await test_db.set_trace_callback(statements.append)
+    from_index = await repo.get_nearest(test_db, lon=34.09, lat=32.09)
+    await test_db.set_trace_callback(None)
+
+    assert from_index.station_id == from_sql.station_id == 2
+    assert from_index.distance == pytest.approx(from_sql.distance)
+    assert sorted(from_index.vehicles) == sorted(from_sql.vehicles)
+    # No distance computation in SQLite once the index is loaded
+    assert not any("ORDER BY distance" in s for s in statements)
+
+
+@pytest.mark.asyncio
+async def test_nearest_station_with_vehicles_skips_empty_stations(test_db):
+    # Station 2 is nearest to the query point but has no vehicles
+    await get_station_index().rebuild(test_db)
+
+    station = await StationsService().get_nearest_station_with_vehicles(
+        test_db, lon=34.1, lat=32.1
+    )
+
+    assert station is not None
+    assert station.station_id == 1
+
+
+@pytest.mark.asyncio
+async def test_nearest_station_with_vehicles_none_available(test_db):
+    await test_db.execute("UPDATE vehicles SET status = 'rented', station_id = NULL")
+    await test_db.commit()
+    await get_station_index().rebuild(test_db)
+
+    station = await StationsService().get_nearest_station_with_vehicles(
+        test_db, lon=34.1, lat=32.1
+    )
+
+    assert station is None
+
+
+@pytest.mark.asyncio
+async def test_nearest_station_with_vehicles_skips_unrentable_vehicles(test_db):
+    # Station 2 is nearest but its only available scooter is drained
+    await test_db.execute(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES ('V003', 2, 'scooter', 'available', 0, NULL)"
+    )
+    await test_db.execute(
+        "INSERT INTO scooters (vehicle_id, battery) VALUES ('V003', 5)"
+    )
+    await test_db.commit()
+
+    for loaded in (False, True):
+        if loaded:
+            await get_station_index().rebuild(test_db)
+        station = await StationsService().get_nearest_station_with_vehicles(
+            test_db, lon=34.1, lat=32.1
+        )
+        assert station.station_id == 1
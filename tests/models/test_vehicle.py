@@ -81,3 +81,41 @@ def test_electric_vehicle_treatment_recharges_to_100():
     assert scooter.status == VehicleStatus.available
     assert scooter.rides_since_last_treated == 0
     assert scooter.battery == 100
+
+
+def test_hold_release_and_rent_held():
+    vehicle = Bicycle(
+        vehicle_id="B_HOLD",
+        station_id=1,
+        status=VehicleStatus.available,
+        rides_since_last_treated=0,
+        last_treated_date=None,
+    )
+
+    vehicle.hold()
+    assert vehicle.status == VehicleStatus.reserved
+    assert not vehicle.can_rent()
+    vehicle.release_hold()
+    assert vehicle.status == VehicleStatus.available
+
+    vehicle.hold()
+    vehicle.rent_held()
+    assert vehicle.status == VehicleStatus.rented
+    assert vehicle.station_id is None
+    with pytest.raises(Exception):
+        vehicle.rent_held()
+
+
+def test_hold_requires_enough_battery():
+    scooter = Scooter(
+        vehicle_id="S_HOLD",
+        station_id=1,
+        status=VehicleStatus.available,
+        rides_since_last_treated=0,
+        last_treated_date=None,
+        battery=10,
+    )
+
+    with pytest.raises(Exception):
+        scooter.hold()
+    assert scooter.status == VehicleStatus.available
@@ -0,0 +1,89 @@
+"""Guard against N+1 query patterns in StationsRepository.
+
+Statements are counted with a trace callback; each method must issue a fixed
+number of queries however many stations and vehicles it returns.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from src.repositories.stations_repository import StationsRepository
+
+STATION_COUNT = 50
+VEHICLES_PER_STATION = 3
+
+
+async def _seed_many(db) -> None:
+    await db.executemany(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+        [
+            (100 + i, f"Bulk {i}", 31.0 + i * 0.001, 33.0, 10)
+            for i in range(STATION_COUNT)
+        ],
+    )
+    await db.executemany(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES (?, ?, 'bicycle', 'available', 0, NULL)",
+        [
+            (f"B{i}-{j}", 100 + i)
+            for i in range(STATION_COUNT)
+            for j in range(VEHICLES_PER_STATION)
+        ],
+    )
+    await db.commit()
+
+
+async def _count_queries(db, call) -> tuple[int, object]:
+    statements: list[str] = []
+    await db.set_trace_callback(statements.append)
+    try:
+        result = await call()
+    finally:
+        await db.set_trace_callback(None)
+    return len(statements), result
+
+
+@pytest.mark.asyncio
+async def test_stations_with_available_vehicles_is_one_query(test_db):
+    await _seed_many(test_db)
+    repo = StationsRepository()
+
+    count, stations = await _count_queries(
+        test_db, lambda: repo.get_stations_with_available_vehicles(test_db)
+    )
+
+    assert len(stations) == STATION_COUNT + 1
+    assert all(s.vehicles for s in stations)
+    bulk = next(s for s in stations if s.station_id == 100)
+    assert sorted(bulk.vehicles) == ["B0-0", "B0-1", "B0-2"]
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_is_one_query(test_db):
+    repo = StationsRepository()
+
+    count, station = await _count_queries(test_db, lambda: repo.get_by_id(test_db, 1))
+
+    assert sorted(station.vehicles) == ["V001", "V002"]
+    assert count == 1
+
+    count, empty = await _count_queries(test_db, lambda: repo.get_by_id(test_db, 2))
+    assert empty.vehicles == []
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_nearest_query_count_is_constant(test_db):
+    await _seed_many(test_db)
+    repo = StationsRepository()
+
+    # One spatial lookup plus one station-with-vehicles fetch
+    count, station = await _count_queries(
+        test_db, lambda: repo.get_nearest(test_db, lon=33.0, lat=31.0)
+    )
+
+    assert station.station_id == 100
+    assert len(station.vehicles) == VEHICLES_PER_STATION
+    assert count == 2
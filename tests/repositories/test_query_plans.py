@@ -0,0 +1,163 @@
+"""Guard against repository queries regressing to full table scans.
+
+Every statement issued by the repository methods below is captured with a
+trace callback and run through ``EXPLAIN QUERY PLAN`` against the migrated
+schema. A plan step ``SCAN <table>`` without ``USING ... INDEX`` is a full
+table scan and fails the test, unless the method inherently sweeps that table.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime
+
+import pytest
+
+from src.repositories.rides_repository import RidesRepository
+from src.repositories.stations_repository import StationsRepository
+from src.repositories.users_repository import UsersRepository
+from src.repositories.vehicles_repository import VehiclesRepository
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+CAPTURED_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+stations = StationsRepository()
+vehicles = VehiclesRepository()
+rides = RidesRepository()
+users = UsersRepository()
+
+# (name, call, tables/aliases allowed to be fully scanned)
+REPOSITORY_CALLS = [
+    ("stations.get_by_id", lambda db: stations.get_by_id(db, 1), set()),
+    # Listing every station's capacity is a sweep over stations by definition
+    ("stations.list_with_capacity", lambda db: stations.list_with_capacity(db), {"s"}),
+    (
+        "stations.get_stations_with_available_vehicles",
+        lambda db: stations.get_stations_with_available_vehicles(db),
+        set(),
+    ),
+    (
+        "stations.filter_stations_with_available_vehicles",
+        lambda db: stations.filter_stations_with_available_vehicles(db, [1, 2]),
+        set(),
+    ),
+    (
+        "stations.get_free_dock_capacities",
+        lambda db: stations.get_free_dock_capacities(db, [1, 2]),
+        set(),
+    ),
+    (
+        "stations.check_and_reserve_capacity",
+        lambda db: stations.check_and_reserve_capacity(db, 2, "V001"),
+        set(),
+    ),
+    (
+        "stations.purge_expired_dock_reservations",
+        lambda db: stations.purge_expired_dock_reservations(db),
+        set(),
+    ),
+    (
+        "stations.get_nearest",
+        lambda db: stations.get_nearest(db, lon=34.0, lat=32.0),
+        set(),
+    ),
+    (
+        "stations.get_within_radius",
+        lambda db: stations.get_within_radius(db, lon=34.0, lat=32.0, radius=0.5),
+        set(),
+    ),
+    ("vehicles.get_by_id", lambda db: vehicles.get_by_id(db, "V001"), set()),
+    (
+        "vehicles.get_available_vehicles_by_station",
+        lambda db: vehicles.get_available_vehicles_by_station(db, 1),
+        set(),
+    ),
+    ("users.get_by_id", lambda db: users.get_by_id(db, "USER_PLAN"), set()),
+    ("rides.get_by_id", lambda db: rides.get_by_id(db, "RIDE_PLAN"), set()),
+    (
+        "rides.get_active_ride_by_user",
+        lambda db: rides.get_active_ride_by_user(db, "USER_PLAN"),
+        set(),
+    ),
+    (
+        "rides.get_active_ride_by_vehicle",
+        lambda db: rides.get_active_ride_by_vehicle(db, "V001"),
+        set(),
+    ),
+    ("rides.get_active_users", lambda db: rides.get_active_users(db), set()),
+    (
+        "rides.rebuild_active_ride_index",
+        lambda db: rides.rebuild_active_ride_index(db),
+        set(),
+    ),
+    (
+        "vehicles.mark_vehicle_as_rented",
+        lambda db: vehicles.mark_vehicle_as_rented(db, "V001"),
+        set(),
+    ),
+    (
+        "rides.create_active_ride",
+        lambda db: rides.create_active_ride(
+            db, "RIDE_PLAN_2", "USER_PLAN_2", "V001", 1, datetime(2026, 1, 1)
+        ),
+        set(),
+    ),
+    ("vehicles.dock_vehicle", lambda db: vehicles.dock_vehicle(db, "V001", 2), set()),
+    (
+        "rides.complete_ride",
+        lambda db: rides.complete_ride(
+            db, "RIDE_PLAN_2", end_station_id=2, end_time=datetime(2026, 1, 1, 1)
+        ),
+        set(),
+    ),
+    (
+        "vehicles.mark_vehicle_degraded_and_detach",
+        lambda db: vehicles.mark_vehicle_degraded_and_detach(db, "V002"),
+        set(),
+    ),
+    ("vehicles.treat_vehicle", lambda db: vehicles.treat_vehicle(db, "V002", 1), set()),
+]
+
+
+async def _capture(db, call) -> list[str]:
+    statements: list[str] = []
+    await db.set_trace_callback(statements.append)
+    try:
+        await call(db)
+    finally:
+        await db.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith(CAPTURED_PREFIXES)]
+
+
+async def _full_scans(db, statement: str) -> set[str]:
+    cursor = await db.execute(f"EXPLAIN QUERY PLAN {statement}")
+    rows = await cursor.fetchall()
+    await cursor.close()
+    scans = set()
+    for row in rows:
+        match = FULL_SCAN.match(row["detail"])
+        if match:
+            scans.add(match.group(1))
+    return scans
+
+
+@pytest.mark.asyncio
+async def test_repository_queries_use_indexes(test_db):
+    await test_db.execute(
+        "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES (?, ?, ?, ?, ?)",
+        ("USER_PLAN_2", "Plan", "User", "plan@example.com", "tok"),
+    )
+    await test_db.commit()
+
+    regressions = []
+    for name, call, allowed in REPOSITORY_CALLS:
+        statements = await _capture(test_db, call)
+        assert statements, f"{name} issued no statements"
+        for statement in statements:
+            scans = await _full_scans(test_db, statement) - allowed
+            if scans:
+                regressions.append(
+                    f"{name}: full scan of {sorted(scans)} in {statement!r}"
+                )
+
+    assert not regressions, "\n".join(regressions)
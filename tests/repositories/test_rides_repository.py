@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import sqlite3
+
 import pytest
 from datetime import datetime
 
-from src.repositories.rides_repository import RidesRepository
+from src.repositories.rides_repository import ActiveRideExistsError, RidesRepository
 from src.models.ride import Ride
 
 
@@ -123,7 +125,7 @@ async def test_create_multiple_active_rides(test_db):
     ride_data = [
         ("RIDE101", "USER101", "V001", 1, datetime(2026, 3, 17, 10, 0)),
         ("RIDE102", "USER102", "V002", 2, datetime(2026, 3, 17, 10, 15)),
-        ("RIDE103", "USER103", "V001", 1, datetime(2026, 3, 17, 10, 30)),
+        ("RIDE103", "USER103", "V003", 1, datetime(2026, 3, 17, 10, 30)),
     ]
 
     for ride_id, user_id, vehicle_id, station_id, start_time in ride_data:
@@ -418,8 +420,8 @@ async def test_get_active_ride_by_user_ignores_completed_rides(test_db):
 
 
 @pytest.mark.asyncio
-async def test_get_active_ride_by_user_only_returns_first_active_ride(test_db):
-    """Test that get_active_ride_by_user returns only one ride (first active)."""
+async def test_second_active_ride_for_user_is_rejected_by_database(test_db):
+    """The uq_rides_open_user index rejects a second open ride, even bypassing the repository."""
     repo = RidesRepository()
     start_time_1 = datetime(2026, 3, 17, 10, 30, 0)
     start_time_2 = datetime(2026, 3, 17, 11, 30, 0)
@@ -434,23 +436,64 @@ async def test_get_active_ride_by_user_only_returns_first_active_ride(test_db):
         start_time=start_time_1,
     )
 
-    # Create second active ride directly in DB (bypassing lock for testing edge case)
-    # This shouldn't happen in real scenario due to locks, but testing the query behavior
-    await test_db.execute(
-        """
-        INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, is_degraded_report, start_time)
-        VALUES (?, ?, ?, ?, FALSE, ?)
-        """,
-        ("RIDE_MULTI_ACTIVE_002", "USER_MULTI_RIDES", "V002", 2, start_time_2),
-    )
-    await test_db.commit()
+    # A raw insert (e.g. from another worker process) is rejected too
+    with pytest.raises(sqlite3.IntegrityError):
+        await test_db.execute(
+            """
+            INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, is_degraded_report, start_time)
+            VALUES (?, ?, ?, ?, FALSE, ?)
+            """,
+            ("RIDE_MULTI_ACTIVE_002", "USER_MULTI_RIDES", "V002", 2, start_time_2),
+        )
+
+    with pytest.raises(ActiveRideExistsError, match="User USER_MULTI_RIDES"):
+        await repo.create_active_ride(
+            test_db,
+            ride_id="RIDE_MULTI_ACTIVE_003",
+            user_id="USER_MULTI_RIDES",
+            vehicle_id="V002",
+            start_station_id=2,
+            start_time=start_time_2,
+        )
 
-    # Get active ride should return the first one (query returns only one row)
     active_ride = await repo.get_active_ride_by_user(test_db, "USER_MULTI_RIDES")
 
     assert active_ride is not None
     assert isinstance(active_ride, Ride)
-    assert active_ride.user_id == "USER_MULTI_RIDES"
+    assert active_ride.ride_id == "RIDE_MULTI_ACTIVE_001"
+
+
+@pytest.mark.asyncio
+async def test_second_active_ride_for_vehicle_is_rejected(test_db):
+    repo = RidesRepository()
+    await repo.create_active_ride(
+        test_db,
+        ride_id="RIDE_VEHICLE_001",
+        user_id="USER_VEHICLE_A",
+        vehicle_id="V001",
+        start_station_id=1,
+    )
+
+    with pytest.raises(ActiveRideExistsError, match="Vehicle V001"):
+        await repo.create_active_ride(
+            test_db,
+            ride_id="RIDE_VEHICLE_002",
+            user_id="USER_VEHICLE_B",
+            vehicle_id="V001",
+            start_station_id=1,
+        )
+
+    # Once the first ride is closed the vehicle (and user) can ride again
+    await repo.complete_ride(
+        test_db, "RIDE_VEHICLE_001", end_station_id=1, end_time=datetime.now()
+    )
+    await repo.create_active_ride(
+        test_db,
+        ride_id="RIDE_VEHICLE_003",
+        user_id="USER_VEHICLE_A",
+        vehicle_id="V001",
+        start_station_id=1,
+    )
 
 
 @pytest.mark.asyncio
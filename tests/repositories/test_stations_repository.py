@@ -85,3 +85,197 @@ async def test_get_nearest_returns_closest(test_db):
     assert station is not None
     assert isinstance(station, StationWithDistance)
     assert station.station_id == 2
+
+
+async def _insert_grid(db, size: int = 10, step: float = 0.01) -> None:
+    """Insert a size x size grid of stations (ids 100+) south-west of the fixtures."""
+    await db.executemany(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, ?, ?, ?, ?)",
+        [
+            (100 + i * size + j, f"Grid {i}-{j}", 31.0 + i * step, 33.0 + j * step, 5)
+            for i in range(size)
+            for j in range(size)
+        ],
+    )
+    await db.commit()
+
+
+async def _brute_force_nearest(db, lon: float, lat: float, k: int):
+    cursor = await db.execute(
+        """
+        SELECT station_id, ((lat - ?) * (lat - ?) + (lon - ?) * (lon - ?)) AS distance
+        FROM stations
+        ORDER BY distance, station_id
+        LIMIT ?
+        """,
+        (lat, lat, lon, lon, k),
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return [(row[0], row[1]) for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_rtree_is_kept_in_sync_by_triggers(test_db):
+    async def rtree_ids():
+        cursor = await test_db.execute("SELECT station_id FROM stations_rtree")
+        ids = {row[0] for row in await cursor.fetchall()}
+        await cursor.close()
+        return ids
+
+    assert await rtree_ids() == {1, 2}
+
+    await test_db.execute(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (3, 'New', 40.0, 40.0, 5)"
+    )
+    await test_db.execute(
+        "UPDATE stations SET lat = 10.0, lon = 10.0 WHERE station_id = 2"
+    )
+    await test_db.commit()
+    assert await rtree_ids() == {1, 2, 3}
+
+    repo = StationsRepository()
+    assert [
+        sid for sid, _ in await repo.get_within_radius(test_db, 10.0, 10.0, 0.1)
+    ] == [2]
+
+    await test_db.execute("DELETE FROM stations WHERE station_id = 3")
+    await test_db.commit()
+    assert await rtree_ids() == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_rtree_k_nearest_matches_full_scan(test_db):
+    await _insert_grid(test_db)
+    repo = StationsRepository()
+
+    # Inside the grid, on its edge, and far away from every station
+    for lon, lat in [(33.043, 31.051), (33.0, 31.0), (34.05, 32.05), (0.0, 0.0)]:
+        for k in (1, 5, 40):
+            expected = await _brute_force_nearest(test_db, lon, lat, k)
+            result = await repo.nearest_station_ids(test_db, lon, lat, k)
+            assert [sid for sid, _ in result] == [sid for sid, _ in expected]
+
+
+@pytest.mark.asyncio
+async def test_rtree_k_nearest_returns_everything_when_k_exceeds_count(test_db):
+    repo = StationsRepository()
+
+    result = await repo.nearest_station_ids(test_db, 34.0, 32.0, 10)
+
+    assert [sid for sid, _ in result] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_within_radius(test_db):
+    await _insert_grid(test_db, size=5)
+    repo = StationsRepository()
+
+    # Grid station (31.0, 33.0) is id 100; neighbours are 0.01 apart
+    result = await repo.get_within_radius(test_db, lon=33.0, lat=31.0, radius=0.0101)
+
+    assert [sid for sid, _ in result] == [100, 101, 105]
+    assert result[0][1] == pytest.approx(0.0)
+    assert await repo.get_within_radius(test_db, lon=0.0, lat=0.0, radius=1.0) == []
+
+
+async def _add_tiny_station(db, max_capacity: int = 2) -> None:
+    """Station 3 with one docked bicycle and one rented vehicle heading somewhere."""
+    await db.execute(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (3, 'Tiny', 32.2, 34.2, ?)",
+        (max_capacity,),
+    )
+    await db.executemany(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES (?, ?, 'bicycle', ?, 0, NULL)",
+        [
+            ("V_DOCKED", 3, "available"),
+            ("V_RIDE_A", None, "rented"),
+            ("V_RIDE_B", None, "rented"),
+        ],
+    )
+
+
+async def _reserved_count(db, station_id: int) -> int:
+    cursor = await db.execute(
+        "SELECT reserved_count FROM station_stats WHERE station_id = ?", (station_id,)
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+@pytest.mark.asyncio
+async def test_dock_reservation_counts_against_capacity(test_db):
+    repo = StationsRepository()
+    await _add_tiny_station(test_db)
+
+    reservation = await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_A")
+
+    assert reservation is not None
+    assert await _reserved_count(test_db, 3) == 1
+    # One docked + one held = full, for other vehicles and for dock searches
+    assert await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_B") is None
+    assert 3 not in await repo.get_free_dock_capacities(test_db, [3])
+
+    # Reserving again replaces the vehicle's previous hold instead of stacking
+    assert await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_A") is not None
+    assert await _reserved_count(test_db, 3) == 1
+
+    assert await repo.check_and_reserve_capacity(test_db, 999, "V_RIDE_B") is None
+
+
+@pytest.mark.asyncio
+async def test_dock_reservation_expires_after_ttl(test_db):
+    repo = StationsRepository()
+    await _add_tiny_station(test_db)
+
+    assert await repo.check_and_reserve_capacity(
+        test_db, 3, "V_RIDE_A", ttl_seconds=30, now=1_000.0
+    )
+    assert (
+        await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_B", now=1_029.0)
+        is None
+    )
+
+    # Once expired, the next reservation purges the stale hold and takes the dock
+    assert await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_B", now=1_030.0)
+    assert await _reserved_count(test_db, 3) == 1
+    assert await repo.purge_expired_dock_reservations(test_db, now=10**12) == 1
+    assert await _reserved_count(test_db, 3) == 0
+
+
+@pytest.mark.asyncio
+async def test_dock_consumes_reservation_and_only_holder_may_use_it(test_db):
+    from src.repositories.vehicles_repository import (
+        StationFullError,
+        VehiclesRepository,
+    )
+
+    repo = StationsRepository()
+    vehicles = VehiclesRepository()
+    await _add_tiny_station(test_db)
+    reservation = await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_A")
+
+    # The held dock is the last one: a vehicle without the hold is turned away
+    with pytest.raises(StationFullError):
+        await vehicles.dock_vehicle(test_db, "V_RIDE_B", 3)
+
+    await vehicles.dock_vehicle(test_db, "V_RIDE_A", 3)
+
+    assert await _reserved_count(test_db, 3) == 0
+    assert not await repo.release_dock_reservation(test_db, reservation)
+    cursor = await test_db.execute("SELECT COUNT(*) FROM dock_reservations")
+    assert (await cursor.fetchone())[0] == 0
+    await cursor.close()
+
+
+@pytest.mark.asyncio
+async def test_release_dock_reservation_frees_the_dock(test_db):
+    repo = StationsRepository()
+    await _add_tiny_station(test_db)
+    reservation = await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_A")
+
+    assert await repo.release_dock_reservation(test_db, reservation)
+    assert await _reserved_count(test_db, 3) == 0
+    assert await repo.check_and_reserve_capacity(test_db, 3, "V_RIDE_B") is not None
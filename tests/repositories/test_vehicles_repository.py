@@ -74,3 +74,181 @@ async def test_mark_vehicle_degraded_and_detach(test_db):
     assert vehicle is not None
     assert vehicle.status == VehicleStatus.degraded
     assert vehicle.station_id is None
+
+
+@pytest.mark.asyncio
+async def test_filter_stations_with_rentable_vehicles_matches_can_rent(test_db):
+    """The SQL rentability predicate must agree with Vehicle.can_rent()."""
+    repo = VehiclesRepository()
+    cases = [
+        # (vehicle_type, status, rides, battery)
+        ("bicycle", "available", 10, None),
+        ("bicycle", "available", 11, None),
+        ("bicycle", "degraded", 0, None),
+        ("scooter", "available", 0, 14),
+        ("scooter", "available", 0, 13),
+        ("electric_bicycle", "available", 3, 100),
+        ("electric_bicycle", "available", 3, 0),
+        ("electric_bicycle", "available", 11, 100),
+    ]
+    for i, (vehicle_type, status, rides, battery) in enumerate(cases):
+        station_id = 100 + i
+        await test_db.execute(
+            "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (?, 'S', 0, 0, 5)",
+            (station_id,),
+        )
+        await test_db.execute(
+            "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+            "VALUES (?, ?, ?, ?, ?, NULL)",
+            (f"R{i}", station_id, vehicle_type, status, rides),
+        )
+        if vehicle_type == "scooter":
+            await test_db.execute(
+                "INSERT INTO scooters (vehicle_id, battery) VALUES (?, ?)",
+                (f"R{i}", battery),
+            )
+        elif vehicle_type == "electric_bicycle":
+            await test_db.execute(
+                "INSERT INTO electric_bicycles (vehicle_id, battery) VALUES (?, ?)",
+                (f"R{i}", battery),
+            )
+    await test_db.commit()
+
+    station_ids = [100 + i for i in range(len(cases))]
+    rentable = await repo.filter_stations_with_rentable_vehicles(test_db, station_ids)
+
+    expected = set()
+    for i in range(len(cases)):
+        vehicle = await repo.get_by_id(test_db, f"R{i}")
+        if vehicle.can_rent():
+            expected.add(100 + i)
+    assert rentable == expected == {100, 103, 105}
+    assert await repo.filter_stations_with_rentable_vehicles(test_db, []) == set()
+
+
+async def _version(db, vehicle_id: str) -> int:
+    cursor = await db.execute(
+        "SELECT version FROM vehicles WHERE vehicle_id = ?", (vehicle_id,)
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+@pytest.mark.asyncio
+async def test_state_transitions_bump_version(test_db):
+    repo = VehiclesRepository()
+    assert await _version(test_db, "V001") == 0
+
+    await repo.mark_vehicle_as_rented(test_db, "V001")
+    await repo.dock_vehicle(test_db, "V001", 2)
+    await repo.mark_vehicle_degraded_and_detach(test_db, "V001")
+    await repo.treat_vehicle(test_db, "V001", 1)
+
+    assert await _version(test_db, "V001") == 4
+
+
+@pytest.fixture
+async def file_db(tmp_path):
+    """A file-backed DB so a second (blocking) connection can race the repository."""
+    import aiosqlite
+
+    from db.migrations import apply_migrations
+
+    path = tmp_path / "cas.db"
+    db = await aiosqlite.connect(path)
+    db.row_factory = aiosqlite.Row
+    await apply_migrations(db)
+    await db.execute(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (1, 'S', 32.0, 34.0, 5)"
+    )
+    await db.execute(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES ('V001', 1, 'bicycle', 'available', 0, NULL)"
+    )
+    await db.commit()
+    yield db, path
+    await db.close()
+
+
+def _racing_writer(path, races: int):
+    """Patch-in for _to_vehicle that lets another connection bump the version first."""
+    import sqlite3
+
+    remaining = {"races": races}
+    original = VehiclesRepository._to_vehicle
+
+    def to_vehicle(row):
+        if remaining["races"] > 0:
+            remaining["races"] -= 1
+            other = sqlite3.connect(path)
+            other.execute("UPDATE vehicles SET version = version + 1")
+            other.commit()
+            other.close()
+        return original(row)
+
+    return to_vehicle
+
+
+@pytest.mark.asyncio
+async def test_compare_and_swap_retries_after_losing_a_race(file_db, monkeypatch):
+    db, path = file_db
+    monkeypatch.setattr(
+        VehiclesRepository, "_to_vehicle", staticmethod(_racing_writer(path, 1))
+    )
+
+    vehicle = await VehiclesRepository().mark_vehicle_as_rented(db, "V001")
+    await db.commit()
+
+    assert vehicle.status == VehicleStatus.rented
+    # The foreign bump plus our own write
+    assert await _version(db, "V001") == 2
+
+
+@pytest.mark.asyncio
+async def test_compare_and_swap_gives_up_after_bounded_retries(test_db, monkeypatch):
+    from src.repositories.vehicles_repository import VersionConflictError
+
+    # Every read now sees a stale version, as if another writer always won
+    monkeypatch.setattr(
+        VehiclesRepository,
+        "BASE_SELECT",
+        VehiclesRepository.BASE_SELECT.replace(
+            "v.version,", "v.version - 1 AS version,"
+        ),
+    )
+
+    with pytest.raises(VersionConflictError):
+        await VehiclesRepository().mark_vehicle_as_rented(test_db, "V001")
+
+    cursor = await test_db.execute(
+        "SELECT status, version FROM vehicles WHERE vehicle_id = 'V001'"
+    )
+    assert tuple(await cursor.fetchone()) == ("available", 0)
+    await cursor.close()
+
+
+@pytest.mark.asyncio
+async def test_docking_at_a_full_station_is_rejected_by_database(test_db):
+    from src.repositories.vehicles_repository import StationFullError
+
+    await test_db.execute(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (3, 'Tiny', 32.0, 34.0, 1)"
+    )
+    await test_db.execute(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES ('V003', 3, 'bicycle', 'available', 0, NULL)"
+    )
+    repo = VehiclesRepository()
+    await repo.mark_vehicle_as_rented(test_db, "V001")
+
+    with pytest.raises(StationFullError, match="Station 3"):
+        await repo.dock_vehicle(test_db, "V001", 3)
+
+    # The vehicle was left untouched and can still dock elsewhere
+    assert (await repo.get_by_id(test_db, "V001")).status == VehicleStatus.rented
+    assert (await repo.dock_vehicle(test_db, "V001", 2)).station_id == 2
+
+    # Updating a vehicle that stays at its (full) station is not a dock
+    await test_db.execute("UPDATE stations SET max_capacity = 1 WHERE station_id = 1")
+    assert await repo.treat_vehicle(test_db, "V002", 1)
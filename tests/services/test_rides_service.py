@@ -8,15 +8,23 @@ from datetime import datetime, date
 from fastapi import HTTPException
 
 from src.services.rides_service import RideService
-from src.repositories.vehicles_repository import VehiclesRepository
+from src.repositories.vehicles_repository import StationFullError, VehiclesRepository
 from src.repositories.rides_repository import RidesRepository
 from src.repositories.users_repository import UsersRepository
 from src.services.stations_service import StationsService
 from src.models.ride import Ride
 from src.models.station import Station
+from src.models.availability_cache import StationVehicles
 from src.models.vehicle import Vehicle, VehicleType, VehicleStatus
 
 
+def _stub_station_vehicles(vehicles_repo, vehicles: list[Vehicle]) -> None:
+    """Pick from the vehicles available at the nearest station with the real rental heap."""
+    vehicles_repo.get_best_rentable_vehicle = AsyncMock(
+        return_value=StationVehicles(0, vehicles).best_rentable()
+    )
+
+
 @pytest.mark.asyncio
 async def test_start_new_ride_success():
     """Test successfully starting a new ride."""
@@ -32,8 +40,9 @@ async def test_start_new_ride_success():
         )
     )
 
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(
-        return_value=[
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
             Vehicle(
                 vehicle_id="V001",
                 vehicle_type=VehicleType.bicycle,
@@ -42,7 +51,7 @@ async def test_start_new_ride_success():
                 rides_since_last_treated=0,
                 last_treated_date=date.today(),
             )
-        ]
+        ],
     )
 
     mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
@@ -131,8 +140,9 @@ async def test_start_new_ride_vehicle_type_priority_scooter():
     )
 
     # Return multiple vehicles with different types
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(
-        return_value=[
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
             Vehicle(
                 vehicle_id="V001",
                 vehicle_type=VehicleType.bicycle,
@@ -157,7 +167,7 @@ async def test_start_new_ride_vehicle_type_priority_scooter():
                 rides_since_last_treated=0,
                 last_treated_date=date.today(),
             ),
-        ]
+        ],
     )
 
     mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
@@ -205,8 +215,9 @@ async def test_start_new_ride_vehicle_type_priority_electric_bicycle():
     )
 
     # Return bicycles and electric_bicycles (no scooters)
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(
-        return_value=[
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
             Vehicle(
                 vehicle_id="V001",
                 vehicle_type=VehicleType.bicycle,
@@ -223,7 +234,7 @@ async def test_start_new_ride_vehicle_type_priority_electric_bicycle():
                 rides_since_last_treated=0,
                 last_treated_date=date.today(),
             ),
-        ]
+        ],
     )
 
     mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
@@ -270,8 +281,9 @@ async def test_start_new_ride_vehicle_id_sorting():
     )
 
     # Return multiple scooters
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(
-        return_value=[
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
             Vehicle(
                 vehicle_id="SCOOTER003",
                 vehicle_type=VehicleType.scooter,
@@ -296,7 +308,7 @@ async def test_start_new_ride_vehicle_id_sorting():
                 rides_since_last_treated=0,
                 last_treated_date=date.today(),
             ),
-        ]
+        ],
     )
 
     mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
@@ -342,8 +354,9 @@ async def test_start_new_ride_returns_correct_model():
         )
     )
 
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(
-        return_value=[
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
             Vehicle(
                 vehicle_id="V_TEST",
                 vehicle_type=VehicleType.bicycle,
@@ -352,7 +365,7 @@ async def test_start_new_ride_returns_correct_model():
                 rides_since_last_treated=0,
                 last_treated_date=date.today(),
             )
-        ]
+        ],
     )
 
     mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
@@ -436,8 +449,9 @@ async def test_start_new_ride_creates_database_entry():
         )
     )
 
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(
-        return_value=[
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
             Vehicle(
                 vehicle_id="V_NEW",
                 vehicle_type=VehicleType.bicycle,
@@ -446,7 +460,7 @@ async def test_start_new_ride_creates_database_entry():
                 rides_since_last_treated=0,
                 last_treated_date=date.today(),
             )
-        ]
+        ],
     )
 
     mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
@@ -560,8 +574,8 @@ async def test_end_ride_success():
             "current_capacity": 7,
         },
     ]
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=mock_stations[0]
     )
 
     # Mock stations repo for capacity check
@@ -592,7 +606,7 @@ async def test_end_ride_success():
 
 
 @pytest.mark.asyncio
-async def test_end_ride_no_available_station():
+async def test_end_ride_no_available_station(test_db, seed_station_layout):
     """Test error when no station with free capacity is available."""
     rides_repo = AsyncMock(spec=RidesRepository)
 
@@ -631,17 +645,115 @@ async def test_end_ride_no_available_station():
             "current_capacity": 8,  # Full
         },
     ]
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    await seed_station_layout(mock_stations)
+    service.stations_service = StationsService()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.end_ride(test_db, "RIDE001", 34.5, 32.5)
+
+    assert exc_info.value.status_code == 400
+    assert "capacity" in exc_info.value.detail.lower()
+
+
+@pytest.mark.asyncio
+async def test_end_ride_dock_reservation_lost_returns_409():
+    """If the chosen dock is taken before it can be held, nothing is written."""
+    rides_repo = AsyncMock(spec=RidesRepository)
+    rides_repo.get_by_id = AsyncMock(
+        return_value=Ride(
+            ride_id="RIDE001",
+            user_id="USER001",
+            vehicle_id="V001",
+            start_station_id=1,
+            start_time=datetime(2026, 3, 19, 10, 0, 0),
+        )
+    )
+    vehicles_repo = AsyncMock(spec=VehiclesRepository)
+
+    service = RideService()
+    service.rides_repo = rides_repo
+    service.vehicles_repo = vehicles_repo
+    service.stations_service = AsyncMock()
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value={"station_id": 1, "max_capacity": 10, "current_capacity": 9}
     )
+    service.stations_repo = AsyncMock()
+    service.stations_repo.check_and_reserve_capacity = AsyncMock(return_value=None)
 
     mock_db = Mock()
+    with pytest.raises(HTTPException) as exc_info:
+        await service.end_ride(mock_db, "RIDE001", lon=34.5, lat=32.5)
+
+    assert exc_info.value.status_code == 409
+    service.stations_repo.check_and_reserve_capacity.assert_awaited_once_with(
+        mock_db, 1, "V001"
+    )
+    rides_repo.complete_ride.assert_not_called()
+    vehicles_repo.dock_vehicle.assert_not_called()
+
+
+async def _open_ride(db) -> None:
+    await db.execute(
+        "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES ('U1', 'A', 'B', 'a@b.c', 'tok')"
+    )
+    await db.execute(
+        "UPDATE vehicles SET station_id = NULL, status = 'rented' WHERE vehicle_id = 'V001'"
+    )
+    await db.execute(
+        "INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, start_time) VALUES ('R1', 'U1', 'V001', 1, '2026-01-01T10:00:00')"
+    )
+    await db.commit()
+
+
+async def _dock_reservations(db) -> list[tuple]:
+    cursor = await db.execute("SELECT station_id, vehicle_id FROM dock_reservations")
+    rows = [tuple(row) for row in await cursor.fetchall()]
+    await cursor.close()
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_end_ride_commits_the_dock_hold_before_closing_the_ride(test_db):
+    """The hold outlives a rolled-back close: it was committed on its own."""
+    await _open_ride(test_db)
+    service = RideService()
+    service.vehicles_repo.dock_vehicle = AsyncMock(
+        side_effect=StationFullError("Station 1 has no free dock")
+    )
+    service.stations_repo.release_dock_reservation = AsyncMock(return_value=True)
 
     with pytest.raises(HTTPException) as exc_info:
-        await service.end_ride(mock_db, "RIDE001", 34.5, 32.5)
+        await service.end_ride(test_db, "R1", lon=34.0, lat=32.0)
 
-    assert exc_info.value.status_code == 400
-    assert "capacity" in exc_info.value.detail.lower()
+    assert exc_info.value.status_code == 409
+    assert not test_db.in_transaction
+    assert await _dock_reservations(test_db) == [(1, "V001")]
+    assert (await service.rides_repo.get_by_id(test_db, "R1")).end_time is None
+    service.stations_repo.release_dock_reservation.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_end_ride_gives_the_dock_back_when_closing_fails(test_db):
+    await _open_ride(test_db)
+    service = RideService()
+    service.vehicles_repo.dock_vehicle = AsyncMock(
+        side_effect=StationFullError("Station 1 has no free dock")
+    )
+
+    with pytest.raises(HTTPException):
+        await service.end_ride(test_db, "R1", lon=34.0, lat=32.0)
+
+    assert await _dock_reservations(test_db) == []
+
+
+@pytest.mark.asyncio
+async def test_end_ride_consumes_the_dock_hold(test_db):
+    await _open_ride(test_db)
+
+    result = await RideService().end_ride(test_db, "R1", lon=34.0, lat=32.0)
+
+    assert result["end_station_id"] == 1
+    assert await _dock_reservations(test_db) == []
 
 
 @pytest.mark.asyncio
@@ -707,7 +819,9 @@ async def test_end_ride_no_stations():
     service = RideService()
     service.rides_repo = rides_repo
     service.stations_service = AsyncMock()
-    service.stations_service.get_stations_with_capacity = AsyncMock(return_value=[])
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=None
+    )
 
     mock_db = Mock()
 
@@ -763,8 +877,8 @@ async def test_end_ride_payment_fixed_15_ils():
             "current_capacity": 5,
         }
     ]
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=mock_stations[0]
     )
 
     # Mock stations repo for capacity check
@@ -779,7 +893,7 @@ async def test_end_ride_payment_fixed_15_ils():
 
 
 @pytest.mark.asyncio
-async def test_end_ride_selects_nearest_station():
+async def test_end_ride_selects_nearest_station(test_db, seed_station_layout):
     """Test that the nearest station by euclidean distance is selected."""
     rides_repo = AsyncMock(spec=RidesRepository)
 
@@ -845,17 +959,15 @@ async def test_end_ride_selects_nearest_station():
             "current_capacity": 5,
         },
     ]
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
-    )
+    await seed_station_layout(mock_stations)
+    service.stations_service = StationsService()
 
     # Mock stations repo for capacity check
     stations_repo = AsyncMock()
     stations_repo.check_and_reserve_capacity = AsyncMock(return_value=True)
     service.stations_repo = stations_repo
 
-    mock_db = Mock()
-    result = await service.end_ride(mock_db, "RIDE001", lon=34.1, lat=32.1)
+    result = await service.end_ride(test_db, "RIDE001", lon=34.1, lat=32.1)
 
     # S1 should be selected (closest to drop-off point)
     assert result["end_station_id"] == 1
@@ -879,3 +991,50 @@ async def test_end_ride_handles_missing_fields():
         await service.end_ride(mock_db, "", None, None)
 
     assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_start_new_ride_version_conflict_returns_409():
+    """Losing every compare-and-swap retry on the vehicle maps to 409."""
+    from src.repositories.vehicles_repository import VersionConflictError
+
+    mock_stations_service = Mock(spec=StationsService)
+    mock_vehicles_repo = Mock(spec=VehiclesRepository)
+    mock_rides_repo = Mock(spec=RidesRepository)
+
+    mock_stations_service.get_nearest_station_with_vehicles = AsyncMock(
+        return_value=Station(
+            station_id=1, name="Station 1", lat=32.0, lon=34.0, max_capacity=10
+        )
+    )
+    _stub_station_vehicles(
+        mock_vehicles_repo,
+        [
+            Vehicle(
+                vehicle_id="V001",
+                vehicle_type=VehicleType.bicycle,
+                station_id=1,
+                status=VehicleStatus.available,
+                rides_since_last_treated=0,
+                last_treated_date=date.today(),
+            )
+        ],
+    )
+    mock_vehicles_repo.mark_vehicle_as_rented = AsyncMock(
+        side_effect=VersionConflictError("Vehicle V001 was modified concurrently")
+    )
+    mock_rides_repo.get_active_ride_by_user = AsyncMock(return_value=None)
+    mock_rides_repo.create_active_ride = AsyncMock()
+
+    service = RideService()
+    service.stations_service = mock_stations_service
+    service.vehicles_repo = mock_vehicles_repo
+    service.rides_repo = mock_rides_repo
+    service.users_repo = Mock(spec=UsersRepository)
+    service.users_repo.get_by_id = AsyncMock(return_value=Mock())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.start_new_ride(Mock(), user_id="USER001", lon=34.0, lat=32.0)
+
+    assert exc_info.value.status_code == 409
+    mock_rides_repo.create_active_ride.assert_not_called()
@@ -59,7 +59,7 @@ async def test_get_nearest_station():
         }
     )
     mock_vehicles_repo = Mock()
-    mock_vehicles_repo.get_available_vehicles_by_station = AsyncMock(return_value=[])
+    mock_vehicles_repo.get_best_rentable_vehicle = AsyncMock(return_value=None)
 
     service = StationsService(
         repository=mock_repo, vehicles_repository=mock_vehicles_repo
@@ -72,3 +72,70 @@ async def test_get_nearest_station():
     assert result.station_id == 1
     assert result.distance == 0.01
     mock_repo.get_nearest.assert_called_once_with(mock_db, lon=34.0, lat=32.0)
+
+
+@pytest.mark.asyncio
+async def test_get_nearest_station_with_free_dock_skips_full_stations(
+    test_db, seed_station_layout
+):
+    from src.models.station_index import get_station_index
+
+    # A line of 40 full stations west of a single free one, so the search has
+    # to walk past several rings before it finds a dock
+    layout = [
+        {
+            "station_id": i,
+            "name": f"Full {i}",
+            "lat": 32.0,
+            "lon": 34.0 + i * 0.001,
+            "max_capacity": 1,
+            "current_capacity": 1,
+        }
+        for i in range(1, 41)
+    ]
+    layout.append(
+        {
+            "station_id": 99,
+            "name": "Free",
+            "lat": 32.0,
+            "lon": 34.5,
+            "max_capacity": 5,
+            "current_capacity": 2,
+        }
+    )
+    await seed_station_layout(layout)
+    service = StationsService()
+
+    for loaded in (False, True):
+        if loaded:
+            await get_station_index().rebuild(test_db)
+        station = await service.get_nearest_station_with_free_dock(
+            test_db, lon=34.0, lat=32.0
+        )
+        assert station["station_id"] == 99
+        assert station["current_capacity"] == 2
+        assert station["max_capacity"] == 5
+
+
+@pytest.mark.asyncio
+async def test_get_nearest_station_with_free_dock_all_full(
+    test_db, seed_station_layout
+):
+    await seed_station_layout(
+        [
+            {
+                "station_id": 1,
+                "name": "Full",
+                "lat": 32.0,
+                "lon": 34.0,
+                "max_capacity": 1,
+                "current_capacity": 1,
+            }
+        ]
+    )
+
+    station = await StationsService().get_nearest_station_with_free_dock(
+        test_db, lon=34.0, lat=32.0
+    )
+
+    assert station is None
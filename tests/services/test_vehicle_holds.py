@@ -0,0 +1,155 @@
+"""Tests for vehicle holds: POST /vehicles/reserve, the /rides/start fast path and the sweeper."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from src.models.vehicle import VehicleStatus
+from src.repositories.vehicles_repository import VehiclesRepository
+from src.services.hold_sweeper import HoldSweeper
+from src.services.rides_service import VEHICLE_HOLD_TTL, RideService
+
+
+@pytest_asyncio.fixture
+async def hold_db(test_db):
+    """test_db plus three users and a second rentable bicycle at station 2."""
+    await test_db.executemany(
+        "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES (?, 'H', 'U', ?, 'tok')",
+        [(f"HU{i}", f"hu{i}@example.com") for i in range(3)],
+    )
+    await test_db.execute(
+        "INSERT INTO vehicles (vehicle_id, station_id, vehicle_type, status, rides_since_last_treated, last_treated_date) "
+        "VALUES ('V003', 2, 'bicycle', 'available', 0, NULL)"
+    )
+    await test_db.commit()
+    return test_db
+
+
+async def _status(db, vehicle_id: str) -> VehicleStatus:
+    return (await VehiclesRepository().get_by_id(db, vehicle_id)).status
+
+
+async def _hold_count(db) -> int:
+    cursor = await db.execute("SELECT COUNT(*) FROM vehicle_holds")
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+@pytest.mark.asyncio
+async def test_reserve_holds_nearest_vehicle_once_per_user(hold_db):
+    service = RideService()
+
+    hold = await service.reserve_vehicle(hold_db, "HU0", lon=34.0, lat=32.0)
+
+    assert (hold.vehicle_id, hold.station_id) == ("V001", 1)
+    assert hold.expires_at > datetime.now(timezone.utc)
+    assert await _status(hold_db, "V001") == VehicleStatus.reserved
+    # A retried reservation gets the same hold back
+    assert await service.reserve_vehicle(hold_db, "HU0", lon=34.0, lat=32.0) == hold
+
+    # The held vehicle is no longer offered to anyone else
+    other = await service.reserve_vehicle(hold_db, "HU1", lon=34.0, lat=32.0)
+    assert other.vehicle_id == "V003"
+    with pytest.raises(HTTPException) as exc_info:
+        await service.reserve_vehicle(hold_db, "HU2", lon=34.0, lat=32.0)
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_start_ride_with_hold_rents_the_held_vehicle(hold_db):
+    service = RideService()
+    hold = await service.reserve_vehicle(hold_db, "HU0", lon=34.0, lat=32.0)
+
+    ride = await service.start_new_ride(hold_db, "HU0", hold_id=hold.hold_id)
+
+    assert (ride.vehicle_id, ride.start_station_id) == ("V001", 1)
+    assert await _status(hold_db, "V001") == VehicleStatus.rented
+    assert await _hold_count(hold_db) == 0
+
+    # The hold is used up
+    with pytest.raises(HTTPException) as exc_info:
+        await service.start_new_ride(hold_db, "HU0", hold_id=hold.hold_id)
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_start_ride_rejects_foreign_and_expired_holds(hold_db, monkeypatch):
+    service = RideService()
+    hold = await service.reserve_vehicle(hold_db, "HU0", lon=34.0, lat=32.0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.start_new_ride(hold_db, "HU1", hold_id=hold.hold_id)
+    assert exc_info.value.status_code == 403
+
+    monkeypatch.setattr(
+        "src.models.vehicle_hold.VehicleHold.is_expired", lambda self, now: True
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await service.start_new_ride(hold_db, "HU0", hold_id=hold.hold_id)
+    assert exc_info.value.status_code == 409
+    assert await _status(hold_db, "V001") == VehicleStatus.reserved
+
+
+@pytest.mark.asyncio
+async def test_expired_hold_is_replaced_on_next_reservation(hold_db, monkeypatch):
+    service = RideService()
+    first = await service.reserve_vehicle(hold_db, "HU0", lon=34.1, lat=32.1)
+    assert first.vehicle_id == "V003"
+
+    monkeypatch.setattr(
+        "src.models.vehicle_hold.VehicleHold.is_expired", lambda self, now: True
+    )
+    second = await service.reserve_vehicle(hold_db, "HU0", lon=34.0, lat=32.0)
+
+    assert second.hold_id != first.hold_id
+    assert second.vehicle_id == "V001"
+    assert await _status(hold_db, "V003") == VehicleStatus.available
+    assert await _hold_count(hold_db) == 1
+
+
+@pytest.mark.asyncio
+async def test_sweeper_releases_expired_holds_in_batches(hold_db):
+    service = RideService()
+    await service.reserve_vehicle(hold_db, "HU0", lon=34.0, lat=32.0)
+    await service.reserve_vehicle(hold_db, "HU1", lon=34.0, lat=32.0)
+    sweeper = HoldSweeper(acquire=None, batch_size=1)
+
+    assert await sweeper.sweep_once(hold_db) == 0
+    later = datetime.now(timezone.utc) + VEHICLE_HOLD_TTL + timedelta(seconds=1)
+    assert await sweeper.sweep_once(hold_db, now=later) == 2
+
+    assert await _hold_count(hold_db) == 0
+    assert await _status(hold_db, "V001") == VehicleStatus.available
+    assert await _status(hold_db, "V003") == VehicleStatus.available
+
+
+@pytest.mark.asyncio
+async def test_sweeper_task_runs_until_stopped(hold_db):
+    sweeps = 0
+
+    class CountingService(RideService):
+        async def release_expired_holds(self, db, limit, now=None):
+            nonlocal sweeps
+            sweeps += 1
+            return 0
+
+    @asynccontextmanager
+    async def acquire():
+        yield hold_db
+
+    sweeper = HoldSweeper(acquire, interval=0.001, service=CountingService())
+    sweeper.start()
+    await asyncio.sleep(0.05)
+    await sweeper.stop()
+
+    assert sweeps > 0
+    stopped_at = sweeps
+    await asyncio.sleep(0.01)
+    assert sweeps == stopped_at
@@ -0,0 +1,70 @@
+"""Tests for the dataset builder and baseline comparison of the benchmark suite."""
+
+from __future__ import annotations
+
+import aiosqlite
+import pytest
+
+from benchmarks.suite import build_database, compare, percentiles
+from db.station_stats import find_station_stats_drift
+
+
+def _result(name: str, p50: float, p95: float, scale: int = 1) -> dict:
+    return {"name": name, "scale": scale, "p50_ms": p50, "p95_ms": p95}
+
+
+def test_percentiles_use_nearest_rank():
+    stats = percentiles([float(ms) for ms in range(100, 0, -1)])
+
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert (stats["min_ms"], stats["max_ms"], stats["iterations"]) == (1.0, 100.0, 100)
+
+
+def test_compare_flags_regressions_beyond_both_thresholds():
+    baseline = [
+        _result("slower", 1.0, 2.0),
+        _result("noise", 0.01, 0.02),
+        _result("faster", 4.0, 8.0),
+        _result("gone", 1.0, 1.0),
+    ]
+    current = [
+        _result("slower", 1.1, 3.0),
+        # 3x slower, but by less than min_delta_ms
+        _result("noise", 0.03, 0.06),
+        _result("faster", 2.0, 4.0),
+        _result("added", 1.0, 1.0),
+    ]
+
+    statuses = {
+        entry["name"]: entry["status"]
+        for entry in compare(current, baseline, threshold=0.2, min_delta_ms=0.05)
+    }
+
+    assert statuses == {
+        "slower": "regression",
+        "noise": "ok",
+        "faster": "improvement",
+        "added": "new",
+        "gone": "missing",
+    }
+
+
+@pytest.mark.asyncio
+async def test_scaled_database_copies_stations_and_vehicles(tmp_path):
+    path = tmp_path / "bench.db"
+    sizes = await build_database(path, scale=2, seed=1)
+
+    async with aiosqlite.connect(path) as db:
+        counts = {}
+        for table in ("stations", "vehicles", "users"):
+            cursor = await db.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = (await cursor.fetchone())[0]
+        drift = await find_station_stats_drift(db)
+
+    assert counts == {
+        "stations": sizes["stations"],
+        "vehicles": sizes["vehicles"],
+        "users": sizes["users"],
+    }
+    assert sizes["stations"] == 2_000
+    assert drift == []
@@ -0,0 +1,204 @@
+"""Tests for the aiosqlite connection pool."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.db_pool import ConnectionPool, PoolClosedError, PoolTimeoutError
+
+
+@pytest_asyncio.fixture
+async def pool(tmp_path):
+    pool = ConnectionPool(
+        tmp_path / "pool.db", min_size=1, max_size=2, acquire_timeout=0.2
+    )
+    await pool.open()
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_open_creates_min_size_connections(pool):
+    stats = pool.stats()
+    assert stats["size"] == 1
+    assert stats["idle"] == 1
+    assert stats["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pragmas_applied_once_per_connection(pool):
+    async with pool.acquire() as db:
+        cursor = await db.execute("PRAGMA journal_mode;")
+        assert (await cursor.fetchone())[0] == "wal"
+        await cursor.close()
+        cursor = await db.execute("PRAGMA foreign_keys;")
+        assert (await cursor.fetchone())[0] == 1
+        await cursor.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_is_reused(pool):
+    async with pool.acquire() as first:
+        pass
+    async with pool.acquire() as second:
+        pass
+
+    assert first is second
+    assert pool.stats()["size"] == 1
+    assert pool.stats()["acquires_total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_grows_up_to_max_size_then_times_out(pool):
+    async with pool.acquire():
+        async with pool.acquire():
+            assert pool.stats()["size"] == 2
+            assert pool.stats()["saturation"] == 1.0
+
+            with pytest.raises(PoolTimeoutError):
+                async with pool.acquire():
+                    pass
+
+    assert pool.stats()["timeouts_total"] == 1
+    assert pool.stats()["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_receives_released_connection(pool):
+    pool.acquire_timeout = 2.0
+    released = asyncio.Event()
+
+    async def holder():
+        async with pool.acquire():
+            async with pool.acquire():
+                await released.wait()
+
+    task = asyncio.create_task(holder())
+    await asyncio.sleep(0.01)
+
+    async def waiter():
+        async with pool.acquire() as db:
+            return db
+
+    waiting = asyncio.create_task(waiter())
+    await asyncio.sleep(0.01)
+    assert pool.stats()["waiting"] == 1
+
+    released.set()
+    await task
+    assert await waiting is not None
+    assert pool.stats()["waits_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dangling_transaction_rolled_back_on_release(pool):
+    async with pool.acquire() as db:
+        await db.execute("CREATE TABLE t (x INTEGER)")
+        await db.commit()
+        await db.execute("INSERT INTO t VALUES (1)")
+        assert db.in_transaction
+
+    async with pool.acquire() as db:
+        assert not db.in_transaction
+        cursor = await db.execute("SELECT COUNT(*) FROM t")
+        assert (await cursor.fetchone())[0] == 0
+        await cursor.close()
+
+
+@pytest.mark.asyncio
+async def test_health_check_replaces_broken_connection(pool):
+    pool.health_check_interval = 0
+    async with pool.acquire() as db:
+        broken = db
+    # Simulate a connection that died while idle
+    await broken.close()
+
+    async with pool.acquire() as db:
+        assert db is not broken
+        cursor = await db.execute("SELECT 1")
+        assert (await cursor.fetchone())[0] == 1
+        await cursor.close()
+
+    assert pool.stats()["health_check_failures_total"] == 1
+    assert pool.stats()["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_acquire_after_close_fails(pool):
+    await pool.close()
+
+    with pytest.raises(PoolClosedError):
+        async with pool.acquire():
+            pass
+
+
+def test_invalid_bounds_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ConnectionPool(tmp_path / "x.db", min_size=3, max_size=2)
+
+
+@pytest.mark.asyncio
+async def test_read_only_pool_rejects_writes(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "lanes.db"
+    writer = ConnectionPool(path, max_size=1)
+    reader = ConnectionPool(path, max_size=2, read_only=True)
+    async with writer.acquire() as db:
+        await db.execute("CREATE TABLE t (x INTEGER)")
+        await db.commit()
+
+    async with reader.acquire() as db:
+        with pytest.raises(sqlite3.OperationalError):
+            await db.execute("INSERT INTO t VALUES (1)")
+
+    assert reader.stats()["read_only"] is True
+    await writer.close()
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_readers_do_not_block_behind_open_write_transaction(tmp_path):
+    path = tmp_path / "lanes.db"
+    writer = ConnectionPool(path, max_size=1)
+    reader = ConnectionPool(path, max_size=2, read_only=True, acquire_timeout=0.5)
+    async with writer.acquire() as db:
+        await db.execute("CREATE TABLE t (x INTEGER)")
+        await db.execute("INSERT INTO t VALUES (1)")
+        await db.commit()
+
+    async with writer.acquire() as wdb:
+        await wdb.execute("BEGIN IMMEDIATE")
+        await wdb.execute("INSERT INTO t VALUES (2)")
+
+        # WAL readers see the last committed snapshot without waiting
+        async with reader.acquire() as rdb:
+            cursor = await rdb.execute("SELECT COUNT(*) FROM t")
+            assert (await cursor.fetchone())[0] == 1
+            await cursor.close()
+
+        await wdb.commit()
+
+    await writer.close()
+    await reader.close()
+
+
+def test_endpoints_routed_to_read_or_writer_lane():
+    from fastapi.routing import APIRoute
+
+    from src.db import get_db, get_read_db
+    from src.main import app
+
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        calls = {dep.call for dep in route.dependant.dependencies}
+        if not calls & {get_db, get_read_db}:
+            continue
+        if route.methods == {"GET"}:
+            assert calls & {get_db, get_read_db} == {get_read_db}, route.path
+        else:
+            assert calls & {get_db, get_read_db} == {get_db}, route.path
@@ -0,0 +1,108 @@
+"""Tests for the Prometheus request metrics middleware and /metrics endpoint."""
+
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.metrics import MetricsRegistry, PrometheusMiddleware
+
+
+def _app(registry: MetricsRegistry) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(PrometheusMiddleware, registry=registry)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return {"item_id": item_id, "in_flight": registry.in_flight}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def test_requests_are_labelled_by_route_template_and_status():
+    registry = MetricsRegistry()
+    client = TestClient(_app(registry))
+
+    assert client.get("/items/1").json()["in_flight"] == 1
+    client.get("/items/2")
+    client.get("/items/0")
+    client.get("/does/not/exist")
+
+    counts = {key: data["count"] for key, data in registry.snapshot().items()}
+    assert counts == {
+        ("GET", "/items/{item_id}", 200): 2,
+        ("GET", "/items/{item_id}", 404): 1,
+        ("GET", "unmatched", 404): 1,
+    }
+    assert registry.in_flight == 0
+
+
+def test_unhandled_exception_is_counted_as_500():
+    registry = MetricsRegistry()
+    client = TestClient(_app(registry), raise_server_exceptions=False)
+
+    assert client.get("/boom").status_code == 500
+    assert ("GET", "/boom", 500) in registry.snapshot()
+    assert registry.in_flight == 0
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry(buckets=(0.1, 0.5))
+    for seconds in (0.05, 0.1, 0.3, 2.0):
+        registry.observe("GET", "/x", 200, seconds)
+
+    text = registry.render()
+
+    labels = 'method="GET",route="/x",status="200"'
+    assert f"http_requests_total{{{labels}}} 4" in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.1"}} 2' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.5"}} 3' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4' in text
+    assert f"http_request_duration_seconds_count{{{labels}}} 4" in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert "http_requests_in_flight 0" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.observe("GET", 'a"b\\c', 200, 0.0)
+
+    assert 'route="a\\"b\\\\c"' in registry.render()
+
+
+@pytest.fixture
+def app_registry():
+    from src.metrics import get_metrics_registry
+
+    registry = get_metrics_registry()
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+def test_metrics_endpoint_exposes_application_requests(app_registry):
+    from src.main import app
+
+    client = TestClient(app)
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_requests_total{method="GET",route="/health",status="200"} 1'
+        in response.text
+    )
+    # The scrape itself is in flight while the page is rendered
+    assert "http_requests_in_flight 1" in response.text
+    # Nearest-station cache hit ratio and staleness follow the request metrics
+    assert "nearest_cache_hit_ratio 0.0" in response.text
+    assert "nearest_cache_served_age_seconds_count 0" in response.text
@@ -0,0 +1,69 @@
+"""Tests for the versioned schema migrations."""
+
+from __future__ import annotations
+
+import aiosqlite
+import pytest
+
+from db.migrations import (
+    LATEST_VERSION,
+    MIGRATIONS,
+    apply_migrations,
+    get_schema_version,
+)
+from db.schema import CREATE_SQL
+
+
+@pytest.mark.asyncio
+async def test_migrations_apply_once_and_record_versions():
+    db = await aiosqlite.connect(":memory:")
+    try:
+        applied = await apply_migrations(db)
+        assert applied == [m.version for m in MIGRATIONS]
+        assert await get_schema_version(db) == LATEST_VERSION
+
+        # Re-running is a no-op
+        assert await apply_migrations(db) == []
+        cursor = await db.execute("SELECT COUNT(*) FROM schema_version")
+        assert (await cursor.fetchone())[0] == len(MIGRATIONS)
+        await cursor.close()
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_hot_path_indexes_exist(test_db):
+    cursor = await test_db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND (name LIKE 'idx_%' OR name LIKE 'uq_%')"
+    )
+    names = {row[0] for row in await cursor.fetchall()}
+    await cursor.close()
+
+    assert {
+        "idx_vehicles_station_status",
+        "idx_vehicles_status",
+        "uq_rides_open_user",
+        "uq_rides_open_vehicle",
+    } <= names
+
+
+@pytest.mark.asyncio
+async def test_rtree_backfills_existing_stations():
+    db = await aiosqlite.connect(":memory:")
+    try:
+        await db.executescript(CREATE_SQL)
+        await db.execute(
+            "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (7, 'S', 32.5, 34.5, 5)"
+        )
+        await db.commit()
+
+        await apply_migrations(db)
+
+        cursor = await db.execute(
+            "SELECT station_id, min_lat, max_lon FROM stations_rtree"
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        assert [(r[0], r[1], r[2]) for r in rows] == [(7, 32.5, 34.5)]
+    finally:
+        await db.close()
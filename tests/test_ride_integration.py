@@ -242,8 +242,8 @@ async def test_complete_ride_end_flow_with_mocked_db(test_db):
         )
     )
 
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=mock_stations[0]
     )
     # Mock stations repo for capacity check
     service.stations_repo = AsyncMock()
@@ -260,10 +260,11 @@ async def test_complete_ride_end_flow_with_mocked_db(test_db):
 
 
 @pytest.mark.asyncio
-async def test_ride_end_selects_station_with_capacity(test_db):
+async def test_ride_end_selects_station_with_capacity(test_db, seed_station_layout):
     """Ensure only stations with available capacity are considered."""
-    from unittest.mock import AsyncMock, Mock
+    from unittest.mock import AsyncMock
     from src.services.rides_service import RideService
+    from src.services.stations_service import StationsService
     from src.repositories.users_repository import UsersRepository
 
     service = RideService()
@@ -329,15 +330,13 @@ async def test_ride_end_selects_station_with_capacity(test_db):
         )
     )
 
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
-    )
+    await seed_station_layout(mock_stations)
+    service.stations_service = StationsService()
     # Mock stations repo for capacity check
     service.stations_repo = AsyncMock()
     service.stations_repo.check_and_reserve_capacity = AsyncMock(return_value=True)
 
-    mock_db = Mock()
-    result = await service.end_ride(mock_db, "RIDE_001", lon=34.4, lat=32.4)
+    result = await service.end_ride(test_db, "RIDE_001", lon=34.4, lat=32.4)
 
     # Should select S2 (only station with available capacity)
     assert result["end_station_id"] == 2
@@ -401,8 +400,8 @@ async def test_vehicle_dock_state_transitions(test_db):
         )
     )
     service.rides_repo.complete_ride = AsyncMock(return_value=True)
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=mock_stations[0]
     )
     # Mock stations repo for capacity check
     service.stations_repo = AsyncMock()
@@ -467,8 +466,8 @@ async def test_multiple_concurrent_rides_ending(test_db):
             "current_capacity": 15,
         }
     ]
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=mock_stations[0]
     )
     # Mock stations repo for capacity check
     service.stations_repo = AsyncMock()
@@ -534,8 +533,8 @@ async def test_payment_logic_normal_ride(test_db):
             "current_capacity": 5,
         }
     ]
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
+    service.stations_service.get_nearest_station_with_free_dock = AsyncMock(
+        return_value=mock_stations[0]
     )
     # Mock stations repo for capacity check
     service.stations_repo = AsyncMock()
@@ -549,10 +548,11 @@ async def test_payment_logic_normal_ride(test_db):
 
 
 @pytest.mark.asyncio
-async def test_nearest_station_calculation(test_db):
+async def test_nearest_station_calculation(test_db, seed_station_layout):
     """Test that nearest station by euclidean distance is correctly selected."""
-    from unittest.mock import AsyncMock, Mock
+    from unittest.mock import AsyncMock
     from src.services.rides_service import RideService
+    from src.services.stations_service import StationsService
     from src.repositories.users_repository import UsersRepository
 
     service = RideService()
@@ -622,15 +622,13 @@ async def test_nearest_station_calculation(test_db):
         },
     ]
 
-    service.stations_service.get_stations_with_capacity = AsyncMock(
-        return_value=mock_stations
-    )
+    await seed_station_layout(mock_stations)
+    service.stations_service = StationsService()
     # Mock stations repo for capacity check
     service.stations_repo = AsyncMock()
     service.stations_repo.check_and_reserve_capacity = AsyncMock(return_value=True)
 
-    mock_db = Mock()
-    result = await service.end_ride(mock_db, "RIDE_001", lon=34.1, lat=32.1)
+    result = await service.end_ride(test_db, "RIDE_001", lon=34.1, lat=32.1)
 
     # S1 and S3 are equally close (first one should be selected)
     assert result["end_station_id"] in [1, 3]
@@ -0,0 +1,135 @@
+"""Tests for the slow query log and its EXPLAIN QUERY PLAN capture."""
+
+from __future__ import annotations
+
+import json
+import threading
+from logging.handlers import RotatingFileHandler
+
+import pytest
+
+from src.repositories.rides_repository import RidesRepository
+from src.repositories.stations_repository import StationsRepository
+from src.repositories.vehicles_repository import VehiclesRepository
+from src.slow_query_log import SlowQueryLog, parameter_shape
+from src.sql_profiler import ProfiledConnection, RequestProfile
+
+# Any positive threshold this small makes every statement "slow"
+EVERYTHING_IS_SLOW_MS = 1e-9
+
+
+def _entries(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_slow_repository_queries_are_logged_with_their_plan(test_db, tmp_path):
+    await test_db.execute(
+        "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES ('U1', 'A', 'B', 'a@b.c', 'tok')"
+    )
+    await test_db.execute(
+        "INSERT INTO rides (ride_id, user_id, vehicle_id, start_station_id, start_time) VALUES ('R1', 'U1', 'V001', 1, '2024-01-01T10:00:00')"
+    )
+    await test_db.commit()
+    # Load the active ride index up front; only its version check is then logged
+    await RidesRepository().rebuild_active_ride_index(test_db)
+    log_path = tmp_path / "slow.log"
+    slow_log = SlowQueryLog(
+        threshold_ms=EVERYTHING_IS_SLOW_MS, path=log_path, max_per_minute=100
+    )
+    db = ProfiledConnection(test_db, RequestProfile(), slow_log)
+
+    await VehiclesRepository().get_by_id(db, "V001")
+    await StationsRepository().list_with_capacity(db)
+    await RidesRepository().get_active_users(db)
+    slow_log.close()
+
+    by_table = {
+        entry["sql"].split(" FROM ")[1].split()[0]: entry
+        for entry in _entries(log_path)
+    }
+    vehicle = by_table["vehicles"]
+    assert vehicle["parameters"] == ["str"]
+    assert vehicle["rows"] == 1
+    assert vehicle["duration_ms"] > 0
+    assert any("SEARCH v USING" in line for line in vehicle["plan"])
+    assert "WHERE v.vehicle_id = ?" in vehicle["statement"]
+
+    stations = by_table["stations"]
+    assert stations["parameters"] == []
+    assert stations["rows"] == 2
+    assert any(line.startswith("SCAN s") for line in stations["plan"])
+
+    assert by_table["open_rides_version"]["rows"] == 1
+    assert by_table["users"]["rows"] == 1
+    assert slow_log.stats()["captured"] == 4
+
+
+@pytest.mark.asyncio
+async def test_fast_statements_are_not_logged(test_db):
+    slow_log = SlowQueryLog(threshold_ms=60_000, path=None)
+    db = ProfiledConnection(test_db, RequestProfile(), slow_log)
+
+    await StationsRepository().list_with_capacity(db)
+
+    assert slow_log.stats()["captured"] == 0
+
+
+def test_capture_is_rate_limited_per_shape_and_overall():
+    slow_log = SlowQueryLog(
+        threshold_ms=1, path=None, max_per_minute=2, shape_cooldown=30
+    )
+
+    # Same shape inside its cooldown is suppressed
+    assert slow_log.admit("SELECT a", now=1000.0)
+    assert not slow_log.admit("SELECT a", now=1010.0)
+    # The bucket allows two captures per minute across all shapes
+    assert slow_log.admit("SELECT b", now=1010.0)
+    assert not slow_log.admit("SELECT c", now=1011.0)
+    # Tokens refill at max_per_minute / 60 per second
+    assert slow_log.admit("SELECT c", now=1041.0)
+    assert slow_log.admit("SELECT a", now=1100.0)
+    assert slow_log.suppressed == 2
+
+
+def test_log_file_rotates(tmp_path):
+    log_path = tmp_path / "slow.log"
+    slow_log = SlowQueryLog(path=log_path, max_bytes=200, backup_count=2)
+
+    for i in range(20):
+        slow_log.write({"statement": f"SELECT {i}", "padding": "x" * 100})
+    slow_log.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "slow.log",
+        "slow.log.1",
+        "slow.log.2",
+    ]
+    assert _entries(log_path)[-1]["statement"] == "SELECT 19"
+
+
+def test_file_is_written_off_the_calling_thread(tmp_path, monkeypatch):
+    writers = set()
+    emit = RotatingFileHandler.emit
+
+    def recording_emit(handler, record):
+        writers.add(threading.get_ident())
+        emit(handler, record)
+
+    monkeypatch.setattr(RotatingFileHandler, "emit", recording_emit)
+    slow_log = SlowQueryLog(path=tmp_path / "slow.log")
+
+    slow_log.write({"statement": "SELECT 1"})
+    slow_log.close()
+
+    assert writers and threading.get_ident() not in writers
+    assert _entries(tmp_path / "slow.log") == [{"statement": "SELECT 1"}]
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape(("V001", 3, None)) == ["str", "int", "NoneType"]
+    assert parameter_shape({"id": 1.5}) == {"id": "float"}
+    assert parameter_shape([("a", 1), ("b", 2)], many=True) == {
+        "rows": 2,
+        "first": ["str", "int"],
+    }
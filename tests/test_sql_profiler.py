@@ -0,0 +1,179 @@
+"""Tests for the per-request SQL statement profiler."""
+
+from __future__ import annotations
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.slow_query_log import get_slow_query_log
+from src.sql_profiler import (
+    ProfiledConnection,
+    RequestProfile,
+    SQLProfilerMiddleware,
+    StatementStats,
+    normalize_sql,
+    profile_connection,
+)
+
+
+def test_normalize_sql_folds_literals_lists_and_whitespace():
+    assert (
+        normalize_sql(
+            """
+            SELECT * FROM vehicles  -- all of them
+            WHERE station_id IN (?, ?,?) AND status = 'available' AND battery > 20;
+            """
+        )
+        == "SELECT * FROM vehicles WHERE station_id IN (...) AND status = ? AND battery > ?"
+    )
+    assert normalize_sql("SELECT s1.lat FROM stations s1") == (
+        "SELECT s1.lat FROM stations s1"
+    )
+
+
+@pytest.mark.asyncio
+async def test_profiled_connection_records_duration_and_rows(test_db):
+    profile = RequestProfile()
+    db = ProfiledConnection(test_db, profile)
+
+    cursor = await db.execute(
+        "SELECT vehicle_id FROM vehicles WHERE station_id = ?", (1,)
+    )
+    assert len(await cursor.fetchall()) == 2
+    await cursor.close()
+    async with db.execute("SELECT station_id FROM stations") as cursor:
+        assert [row[0] async for row in cursor] == [1, 2]
+    await db.execute("UPDATE vehicles SET rides_since_last_treated = 0")
+
+    assert [(r.shape, r.rows) for r in profile.records] == [
+        ("SELECT vehicle_id FROM vehicles WHERE station_id = ?", 2),
+        ("SELECT station_id FROM stations", 2),
+        ("UPDATE vehicles SET rides_since_last_treated = ?", 2),
+    ]
+    assert all(record.seconds > 0 for record in profile.records)
+    # Attributes other than execute go straight to the real connection
+    assert db.in_transaction
+
+
+@pytest.fixture
+def slow_log(monkeypatch):
+    """The process-wide slow query log, capturing every statement in memory."""
+    slow_log = get_slow_query_log()
+    monkeypatch.setattr(slow_log, "threshold", 1e-12)
+    monkeypatch.setattr(slow_log, "path", None)
+    monkeypatch.setattr(slow_log, "shape_cooldown", 0.0)
+    return slow_log
+
+
+@pytest.mark.asyncio
+async def test_connection_is_not_wrapped_outside_a_request_without_slow_log(
+    test_db, monkeypatch
+):
+    monkeypatch.setattr(get_slow_query_log(), "threshold", 0.0)
+    assert profile_connection(test_db) is test_db
+
+
+@pytest.mark.asyncio
+async def test_slow_log_works_outside_a_request(test_db, slow_log):
+    db = profile_connection(test_db)
+    captured = slow_log.captured
+
+    cursor = await db.execute("SELECT name FROM stations WHERE station_id = 1")
+    await cursor.fetchall()
+
+    assert isinstance(db, ProfiledConnection)
+    assert slow_log.captured == captured + 1
+    entry = slow_log.stats()["recent"][-1]
+    assert (entry["route"], entry["rows"]) == (None, 1)
+
+
+def _app(test_db, stats: StatementStats, enabled: bool = True) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        SQLProfilerMiddleware, stats=stats, repeat_threshold=3, enabled=enabled
+    )
+
+    async def get_db():
+        yield profile_connection(test_db)
+
+    @app.get("/stations/{station_id}")
+    async def get_station(station_id: int, db=Depends(get_db)):
+        cursor = await db.execute(
+            "SELECT name FROM stations WHERE station_id = ?", (station_id,)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        return {"name": row[0]}
+
+    @app.get("/vehicles")
+    async def list_vehicles(db=Depends(get_db)):
+        # One query per vehicle: the N+1 the profiler should flag
+        names = []
+        for vehicle_id in ("V001", "V002", "V001", "V002"):
+            cursor = await db.execute(
+                f"SELECT vehicle_type FROM vehicles WHERE vehicle_id = '{vehicle_id}'"
+            )
+            names.append((await cursor.fetchone())[0])
+            await cursor.close()
+        return names
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_query_totals_and_flags_repeats(test_db):
+    stats = StatementStats()
+    transport = ASGITransport(app=_app(test_db, stats))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        single = await client.get("/stations/1")
+        repeated = await client.get("/vehicles")
+
+    assert single.headers["x-db-query-count"] == "1"
+    assert float(single.headers["x-db-query-time-ms"]) > 0
+    assert "x-db-repeated-statements" not in single.headers
+
+    assert repeated.headers["x-db-query-count"] == "4"
+    assert repeated.headers["x-db-repeated-statements"] == "4"
+
+    report = stats.report(limit=1, order_by="calls")
+    assert report["requests"] == 2
+    [top] = report["statements"]
+    assert top["statement"] == "SELECT vehicle_type FROM vehicles WHERE vehicle_id = ?"
+    assert (top["calls"], top["rows"]) == (4, 4)
+    assert top["mean_ms"] == pytest.approx(top["total_ms"] / 4)
+    assert 0 < top["max_ms"] <= top["total_ms"]
+    assert report["repeated_statements"] == [
+        {
+            "method": "GET",
+            "route": "/vehicles",
+            "statement": "SELECT vehicle_type FROM vehicles WHERE vehicle_id = ?",
+            "count": 4,
+        }
+    ]
+
+
+def test_statement_stats_is_bounded_and_validates_order():
+    stats = StatementStats(max_statements=1)
+    profile = RequestProfile()
+    profile.record("SELECT 1", 0.002, 1)
+    profile.record("SELECT name FROM stations", 0.001, 3)
+    stats.add(profile)
+
+    assert [row["statement"] for row in stats.top()] == ["SELECT ?"]
+    assert stats.report()["dropped_statements"] == 1
+    with pytest.raises(ValueError):
+        stats.top(order_by="nonsense")
+
+
+@pytest.mark.asyncio
+async def test_slow_log_works_with_the_profiler_disabled(test_db, slow_log):
+    stats = StatementStats()
+    captured = slow_log.captured
+    transport = ASGITransport(app=_app(test_db, stats, enabled=False))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/stations/1")
+
+    assert "x-db-query-count" not in response.headers
+    assert stats.report()["requests"] == 0
+    assert slow_log.captured == captured + 1
@@ -0,0 +1,151 @@
+"""Tests for the trigger-maintained station_stats counters."""
+
+from __future__ import annotations
+
+import pytest
+
+from db.station_stats import find_station_stats_drift, rebuild_station_stats
+from src.repositories.stations_repository import StationsRepository
+from src.repositories.vehicles_repository import VehiclesRepository
+
+
+async def _stats(db, station_id: int) -> dict:
+    cursor = await db.execute(
+        "SELECT * FROM station_stats WHERE station_id = ?", (station_id,)
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    if not row:
+        return None
+    stats = dict(row)
+    # Not a counter: a random stamp that changes with the station's vehicles
+    stats.pop("vehicles_version")
+    return stats
+
+
+async def _vehicles_version(db, station_id: int) -> int:
+    cursor = await db.execute(
+        "SELECT vehicles_version FROM station_stats WHERE station_id = ?",
+        (station_id,),
+    )
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+@pytest.mark.asyncio
+async def test_counters_seeded_from_fixture(test_db):
+    assert await _stats(test_db, 1) == {
+        "station_id": 1,
+        "docked_count": 2,
+        "available_bicycle": 1,
+        "available_electric_bicycle": 0,
+        "available_scooter": 0,
+        "available_count": 1,
+        "reserved_count": 0,
+    }
+    assert (await _stats(test_db, 2))["docked_count"] == 0
+    assert await find_station_stats_drift(test_db) == []
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_vehicle_lifecycle(test_db):
+    vehicles = VehiclesRepository()
+
+    await vehicles.mark_vehicle_as_rented(test_db, "V001")
+    assert (await _stats(test_db, 1))["docked_count"] == 1
+    assert (await _stats(test_db, 1))["available_count"] == 0
+
+    await vehicles.dock_vehicle(test_db, "V001", 2)
+    stats = await _stats(test_db, 2)
+    assert stats["docked_count"] == 1
+    assert stats["available_bicycle"] == 1
+
+    await vehicles.treat_vehicle(test_db, "V002", 1)
+    assert (await _stats(test_db, 1))["available_scooter"] == 1
+
+    await vehicles.mark_vehicle_degraded_and_detach(test_db, "V002")
+    assert (await _stats(test_db, 1))["docked_count"] == 0
+
+    await test_db.execute("DELETE FROM vehicles WHERE vehicle_id = 'V001'")
+    assert (await _stats(test_db, 2))["docked_count"] == 0
+
+    assert await find_station_stats_drift(test_db) == []
+
+
+@pytest.mark.asyncio
+async def test_new_station_gets_a_counter_row(test_db):
+    await test_db.execute(
+        "INSERT INTO stations (station_id, name, lat, lon, max_capacity) VALUES (3, 'S3', 33.0, 35.0, 5)"
+    )
+    assert (await _stats(test_db, 3))["docked_count"] == 0
+
+    await test_db.execute("DELETE FROM stations WHERE station_id = 3")
+    assert await _stats(test_db, 3) is None
+
+
+@pytest.mark.asyncio
+async def test_capacity_queries_read_counters(test_db):
+    repo = StationsRepository()
+
+    capacities = {s["station_id"]: s for s in await repo.list_with_capacity(test_db)}
+    assert capacities[1]["current_capacity"] == 2
+    assert capacities[2]["current_capacity"] == 0
+
+    stations = await repo.get_stations_with_available_vehicles(test_db)
+    assert [s.station_id for s in stations] == [1]
+    assert await repo.filter_stations_with_available_vehicles(test_db, [1, 2]) == {1}
+
+
+@pytest.mark.asyncio
+async def test_drift_is_detected_and_repaired(test_db):
+    await test_db.execute(
+        "UPDATE station_stats SET docked_count = 7, available_scooter = 3 WHERE station_id = 2"
+    )
+    await test_db.execute("DELETE FROM station_stats WHERE station_id = 1")
+
+    drift = await find_station_stats_drift(test_db)
+
+    assert drift == [
+        {
+            "station_id": 1,
+            "mismatches": {
+                "docked_count": (None, 2),
+                "available_bicycle": (None, 1),
+                "available_electric_bicycle": (None, 0),
+                "available_scooter": (None, 0),
+                "reserved_count": (None, 0),
+            },
+        },
+        {
+            "station_id": 2,
+            "mismatches": {"docked_count": (7, 0), "available_scooter": (3, 0)},
+        },
+    ]
+
+    assert await rebuild_station_stats(test_db) == 2
+    assert await find_station_stats_drift(test_db) == []
+
+
+@pytest.mark.asyncio
+async def test_vehicles_version_changes_with_the_stations_vehicles(test_db):
+    before = {sid: await _vehicles_version(test_db, sid) for sid in (1, 2)}
+
+    await test_db.execute("UPDATE scooters SET battery = 50 WHERE vehicle_id = 'V002'")
+    after_battery = await _vehicles_version(test_db, 1)
+    assert after_battery != before[1]
+    assert await _vehicles_version(test_db, 2) == before[2]
+
+    await test_db.execute(
+        "UPDATE vehicles SET station_id = 2 WHERE vehicle_id = 'V001'"
+    )
+    assert await _vehicles_version(test_db, 1) != after_battery
+    assert await _vehicles_version(test_db, 2) != before[2]
+
+    await test_db.commit()
+    committed = await _vehicles_version(test_db, 2)
+    await test_db.execute(
+        "UPDATE vehicles SET status = 'degraded' WHERE vehicle_id = 'V001'"
+    )
+    await test_db.rollback()
+    assert await _vehicles_version(test_db, 2) == committed
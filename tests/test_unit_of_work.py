@@ -0,0 +1,127 @@
+"""Tests for the UnitOfWork transaction boundary."""
+
+from __future__ import annotations
+
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.rides_service import RideService
+from src.unit_of_work import UnitOfWork, after_commit
+
+
+async def _count(db, sql: str, params: tuple = ()) -> int:
+    cursor = await db.execute(sql, params)
+    row = await cursor.fetchone()
+    await cursor.close()
+    return row[0]
+
+
+async def _seed_user(db, user_id: str = "USER_UOW") -> None:
+    await db.execute(
+        "INSERT INTO users (user_id, first_name, last_name, email, payment_token) VALUES (?, ?, ?, ?, ?)",
+        (user_id, "Unit", "Work", "uow@example.com", "tok"),
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_commits_on_success(test_db):
+    async with UnitOfWork(test_db):
+        assert test_db.in_transaction
+        await test_db.execute(
+            "UPDATE vehicles SET status = 'rented' WHERE vehicle_id = 'V001'"
+        )
+
+    assert not test_db.in_transaction
+    assert (
+        await _count(test_db, "SELECT COUNT(*) FROM vehicles WHERE status = 'rented'")
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_rolls_back_on_error(test_db):
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(test_db):
+            await test_db.execute(
+                "UPDATE vehicles SET status = 'rented' WHERE vehicle_id = 'V001'"
+            )
+            raise RuntimeError("boom")
+
+    assert not test_db.in_transaction
+    assert (
+        await _count(test_db, "SELECT COUNT(*) FROM vehicles WHERE status = 'rented'")
+        == 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_after_commit_callbacks_wait_for_the_owner(test_db):
+    calls: list[str] = []
+
+    async with UnitOfWork(test_db):
+        async with UnitOfWork(test_db):
+            after_commit(test_db, lambda: calls.append("inner"))
+        assert calls == []
+    assert calls == ["inner"]
+
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(test_db):
+            after_commit(test_db, lambda: calls.append("rolled back"))
+            raise RuntimeError("boom")
+    after_commit(test_db, lambda: calls.append("no unit of work"))
+    assert calls == ["inner", "no unit of work"]
+
+
+@pytest.mark.asyncio
+async def test_nested_unit_of_work_joins_outer_transaction(test_db):
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(test_db):
+            async with UnitOfWork(test_db):
+                await test_db.execute(
+                    "UPDATE vehicles SET status = 'rented' WHERE vehicle_id = 'V001'"
+                )
+            # Inner block must not have committed
+            assert test_db.in_transaction
+            raise RuntimeError("boom")
+
+    assert (
+        await _count(test_db, "SELECT COUNT(*) FROM vehicles WHERE status = 'rented'")
+        == 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_start_ride_issues_single_commit(test_db):
+    await _seed_user(test_db)
+    statements: list[str] = []
+    await test_db.set_trace_callback(statements.append)
+
+    ride = await RideService().start_new_ride(test_db, "USER_UOW", lon=34.0, lat=32.0)
+
+    await test_db.set_trace_callback(None)
+    assert ride.vehicle_id == "V001"
+    assert [s for s in statements if s.strip().upper() == "COMMIT"] == ["COMMIT"]
+    assert statements[0].strip().upper() == "BEGIN IMMEDIATE"
+
+
+@pytest.mark.asyncio
+async def test_start_ride_failure_rolls_back_vehicle_rental(test_db):
+    await _seed_user(test_db)
+    service = RideService()
+    service.rides_repo.create_active_ride = AsyncMock(
+        side_effect=RuntimeError("insert failed")
+    )
+
+    with pytest.raises(Exception):
+        await service.start_new_ride(test_db, "USER_UOW", lon=34.0, lat=32.0)
+
+    # The vehicle rental written before the failure must not survive
+    assert (
+        await _count(
+            test_db,
+            "SELECT COUNT(*) FROM vehicles WHERE vehicle_id = 'V001' AND status = 'available'",
+        )
+        == 1
+    )
+    assert await _count(test_db, "SELECT COUNT(*) FROM rides") == 0